@@ -1,25 +1,56 @@
 from datetime import datetime, timedelta
-from flask import Flask, render_template, request, redirect, url_for, flash, session, make_response
+from flask import (
+    Flask, render_template, request, redirect, url_for, flash, session,
+    make_response, jsonify, send_file, Response, stream_with_context, g
+)
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
-from database.db_helper import init_db
+from database.db_helper import (
+    ensure_schema, bind_user, unbind, migrate_to_shards,
+    replica_enabled, pin_reads_to_primary, unpin_reads
+)
 from controllers.habit_controller import (
     create_habit, get_all_habits, get_habit_by_id, 
     delete_habit, mark_habit_complete, get_habit_streak,
-    is_completed_today, get_habit_logs, get_completion_stats,
-    update_habit
+    is_completed_today, update_habit, get_habit_detail
 )
 from controllers.journal_controller import (
     create_or_update_journal_entry, get_journal_entry_by_date,
     get_all_journal_entries, search_journal_entries,
-    get_all_tags, delete_journal_entry
+    get_all_tags, delete_journal_entry, compress_journal_entries,
+    get_related_journal_entries, autocomplete_tags
 )
 from controllers.user_controller import (
     create_user, get_user_by_email, get_user_by_id, 
-    verify_password, get_all_users, delete_user
+    verify_password, delete_user, count_users,
+    get_users_page, iter_users_for_export
+)
+from controllers.heatmap_controller import get_heatmap, get_habit_owner
+from controllers.bulk_export_controller import (
+    start_bulk_export, get_bulk_export_status, get_bulk_export_path
+)
+from controllers.archive_controller import export_account_archive, import_account_archive
+from controllers.sync_controller import collect_changes, apply_changes
+from controllers.report_job_controller import (
+    submit_report_job, get_report_job, get_report_job_result
 )
-from controllers.report_controller import generate_report_data
+from controllers.prompt_builder import excerpt
+from controllers.health_controller import check_liveness, check_readiness
+from database.query_logger import read_slow_query_log
+from database.journal_index import similarity_available, rebuild_journal_index
+from database.log_partitions import (
+    partitioning_enabled as log_partitioning_enabled, ensure_log_partitions, archive_log_partitions
+)
+from database.daily_summary import get_activity_totals, rebuild_daily_summary
 from datetime import datetime, timedelta
 from functools import wraps
+import click
+import csv
+import gzip
+import io
+import json
+import tempfile
+import time
+import zlib
 import config
 
 app = Flask(__name__)
@@ -30,6 +61,7 @@ app.config['SESSION_COOKIE_HTTPONLY'] = True
 app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
 app.config['REMEMBER_COOKIE_DURATION'] = timedelta(days=30)
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=30)
+app.config['MAX_CONTENT_LENGTH'] = config.ARCHIVE_MAX_UPLOAD_MB * 1024 * 1024
 
 # Initialize Flask-Login
 login_manager = LoginManager()
@@ -37,8 +69,49 @@ login_manager.init_app(app)
 login_manager.login_view = 'login'
 login_manager.login_message = 'Please log in to access this page.'
 
-# Initialize database on first run
-init_db()
+# Polled every second - no schema check, session or user lookup for these
+HEALTH_ENDPOINTS = frozenset({'healthz', 'readyz'})
+
+# Schema checks run on the first request (once per process), not at import
+@app.before_request
+def prepare_database():
+    if request.endpoint not in HEALTH_ENDPOINTS:
+        ensure_schema()
+
+# Per-user data is read from the signed-in user's shard (when SQLite sharding is on)
+@app.before_request
+def bind_request_user():
+    if request.endpoint not in HEALTH_ENDPOINTS and current_user.is_authenticated:
+        g.shard_token = bind_user(current_user.id)
+
+# Read-your-writes: with a read replica, a user's reads stay on the primary
+# for READ_YOUR_WRITES_SECONDS after they changed something
+READ_ONLY_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+# GET routes that write (links rather than forms)
+WRITE_ENDPOINTS = frozenset({'delete_habit_route', 'delete_journal', 'admin_delete_user'})
+
+@app.before_request
+def pin_recent_writer():
+    if request.endpoint not in HEALTH_ENDPOINTS and session.get('read_primary_until', 0) > time.time():
+        g.read_token = pin_reads_to_primary()
+
+@app.after_request
+def remember_write(response):
+    if request.endpoint in HEALTH_ENDPOINTS:
+        return response
+    if (replica_enabled() and current_user.is_authenticated
+            and (request.method not in READ_ONLY_METHODS or request.endpoint in WRITE_ENDPOINTS)):
+        session['read_primary_until'] = time.time() + config.READ_YOUR_WRITES_SECONDS
+    return response
+
+@app.teardown_request
+def release_request_user(exc):
+    token = g.pop('shard_token', None)
+    if token is not None:
+        unbind(token)
+    token = g.pop('read_token', None)
+    if token is not None:
+        unpin_reads(token)
 
 @login_manager.user_loader
 def load_user(user_id):
@@ -54,6 +127,27 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+# ============================================
+# HEALTH CHECKS
+# ============================================
+
+def _health_response(body, status=200):
+    response = jsonify(body)
+    response.status_code = status
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@app.route('/healthz')
+def healthz():
+    """Liveness - the process is up and serving requests"""
+    return _health_response(check_liveness())
+
+@app.route('/readyz')
+def readyz():
+    """Readiness - database reachable, schema current, connection pool not saturated"""
+    ready, result = check_readiness()
+    return _health_response(result, 200 if ready else 503)
+
 # ============================================
 # AUTHENTICATION ROUTES
 # ============================================
@@ -148,7 +242,7 @@ def index():
             
         habits_data.append({
             'habit': habit,
-            'streak': get_habit_streak(habit.id),
+            'streak': get_habit_streak(habit.id, habit.get_schedule()),
             'completed_today': is_complete
         })
     
@@ -185,6 +279,8 @@ def add_habit():
     if request.method == 'POST':
         name = request.form.get('name')
         frequency = request.form.get('frequency')
+        if frequency == 'custom' and request.form.get('frequency_custom', '').strip():
+            frequency = request.form['frequency_custom'].strip()
         target_time = request.form.get('target_time')
         icon = request.form.get('icon')
         motivation = request.form.get('motivation')
@@ -205,17 +301,14 @@ def add_habit():
 @login_required
 def view_habit(habit_id):
     """View detailed habit information"""
-    habit = get_habit_by_id(habit_id)
-    if not habit:
+    detail = get_habit_detail(habit_id)
+    if not detail:
         flash('Habit not found', 'error')
         return redirect(url_for('index'))
     
-    logs = get_habit_logs(habit_id)
-    stats = get_completion_stats(habit_id)
-    streak = get_habit_streak(habit_id)
-    
     dark_mode = session.get('dark_mode', False)
-    return render_template('view_habit.html', habit=habit, logs=logs, stats=stats, streak=streak, dark_mode=dark_mode, app_name=config.APP_NAME)
+    return render_template('view_habit.html', habit=detail['habit'], logs=detail['logs'], total_logs=detail['total_logs'],
+                           stats=detail['stats'], streak=detail['streak'], dark_mode=dark_mode, app_name=config.APP_NAME)
 
 @app.route('/edit/<int:habit_id>', methods=['GET', 'POST'])
 @login_required
@@ -229,6 +322,8 @@ def edit_habit(habit_id):
     if request.method == 'POST':
         name = request.form.get('name')
         frequency = request.form.get('frequency')
+        if frequency == 'custom' and request.form.get('frequency_custom', '').strip():
+            frequency = request.form['frequency_custom'].strip()
         target_time = request.form.get('target_time')
         icon = request.form.get('icon')
         motivation = request.form.get('motivation')
@@ -296,7 +391,8 @@ def journal():
     all_tags = get_all_tags(current_user.id)
     dark_mode = session.get('dark_mode', False)
     
-    return render_template('journal.html', entries=entries, all_tags=all_tags, search_term=search_term, dark_mode=dark_mode, app_name=config.APP_NAME)
+    return render_template('journal.html', entries=entries, all_tags=all_tags, search_term=search_term, dark_mode=dark_mode,
+                           related_available=similarity_available(), app_name=config.APP_NAME)
 
 @app.route('/journal/save', methods=['POST'])
 @login_required
@@ -326,20 +422,182 @@ def delete_journal(entry_date):
     flash('Journal entry deleted', 'info')
     return redirect(url_for('journal'))
 
+@app.route('/api/journal/<entry_date>/related')
+@login_required
+def related_journal_entries(entry_date):
+    """Journal entries most similar to the one on entry_date"""
+    related = get_related_journal_entries(current_user.id, entry_date)
+    return jsonify({
+        'entry_date': entry_date,
+        'related': [
+            {'entry_date': str(entry.entry_date)[:10], 'score': score,
+             'excerpt': excerpt(entry.content, 40), 'tags': entry.get_tags_list()}
+            for entry, score in related
+        ]
+    })
+
+@app.route('/api/tags/autocomplete')
+@login_required
+def autocomplete_tags_route():
+    """Journal tags starting with ?q=, most used first"""
+    prefix = request.args.get('q', '')
+    limit = min(request.args.get('limit', config.TAG_AUTOCOMPLETE_LIMIT, type=int), 50)
+    return jsonify({'query': prefix, 'tags': autocomplete_tags(current_user.id, prefix, limit)})
+
+# ============================================
+# ACCOUNT ARCHIVE (export / import)
+# ============================================
+
+@app.route('/account/archive')
+@login_required
+def account_archive():
+    """Account data page - export or import an archive"""
+    dark_mode = session.get('dark_mode', False)
+    return render_template('account_archive.html', dark_mode=dark_mode, app_name=config.APP_NAME)
+
+@app.route('/account/archive/export')
+@login_required
+def export_account_archive_route():
+    """Download the whole account as a ZIP of NDJSON files"""
+    # Spooled to a temporary file on disk, never held in memory
+    archive_file = tempfile.TemporaryFile()
+    export_account_archive(current_user.id, archive_file)
+    archive_file.seek(0)
+    return send_file(
+        archive_file,
+        mimetype='application/zip',
+        as_attachment=True,
+        download_name=f"habit_recoder_account_{datetime.now().date()}.zip"
+    )
+
+@app.route('/account/archive/import', methods=['POST'])
+@login_required
+def import_account_archive_route():
+    """Import an uploaded account archive"""
+    upload = request.files.get('archive')
+    if not upload or not upload.filename:
+        flash('Please choose an archive to import', 'error')
+        return redirect(url_for('account_archive'))
+    
+    try:
+        counts = import_account_archive(current_user.id, upload.stream)
+        flash(f"Imported {counts['habits']} habits, {counts['logs']} completions and "
+              f"{counts['journal_entries']} journal entries (existing ones were kept)", 'success')
+    except ValueError as e:
+        flash(f'Could not import archive: {e}', 'error')
+    return redirect(url_for('account_archive'))
+
+# ============================================
+# DELTA SYNC API (used by the desktop app)
+# ============================================
+
+def _sync_response(payload, status=200):
+    """JSON response, gzip-compressed when the client accepts it"""
+    body = json.dumps(payload).encode('utf-8')
+    response = make_response(body, status)
+    response.headers['Content-Type'] = 'application/json'
+    if 'gzip' in request.headers.get('Accept-Encoding', ''):
+        response.set_data(gzip.compress(body))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+def _read_sync_body():
+    """Decode a (possibly gzip-compressed) JSON body, refusing oversized payloads"""
+    max_bytes = config.SYNC_MAX_BODY_MB * 1024 * 1024
+    body = request.get_data()
+    if request.headers.get('Content-Encoding') == 'gzip':
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        body = decompressor.decompress(body, max_bytes)
+        if decompressor.unconsumed_tail:
+            raise ValueError('Sync payload too large')
+    if len(body) > max_bytes:
+        raise ValueError('Sync payload too large')
+    return json.loads(body)
+
+@app.route('/api/sync/pull')
+@login_required
+def sync_pull():
+    """Changes after a cursor, excluding the ones the asking device pushed"""
+    since = request.args.get('since', 0, type=int)
+    limit = max(1, min(request.args.get('limit', config.SYNC_BATCH_SIZE, type=int), config.SYNC_BATCH_SIZE))
+    device = request.args.get('device', '')
+    return _sync_response(collect_changes(current_user.id, since, limit, exclude_origin=device))
+
+@app.route('/api/sync/push', methods=['POST'])
+@login_required
+def sync_push():
+    """Apply a batch of changes from a device"""
+    try:
+        payload = _read_sync_body()
+        changes = payload.get('changes') or []
+        if not isinstance(changes, list) or len(changes) > config.SYNC_BATCH_SIZE:
+            raise ValueError(f'Send at most {config.SYNC_BATCH_SIZE} changes per request')
+        result = apply_changes(current_user.id, changes, origin=str(payload.get('device') or 'unknown'))
+    except (ValueError, AttributeError, zlib.error) as e:
+        return _sync_response({'error': str(e)}, 400)
+    return _sync_response(result)
+
 # ============================================
 # REPORT GENERATION
 # ============================================
 
+def _report_period():
+    """Default report window - the last 30 days"""
+    end_date = datetime.now().date()
+    start_date = end_date - timedelta(days=30)
+    return start_date, end_date
+
+def _report_job_json(job):
+    data = {
+        'job_id': job['id'],
+        'status': job['status'],
+        'progress': job['progress'],
+        'period': f"{job['start_date']} to {job['end_date']}",
+        'status_url': url_for('report_job_status', job_id=job['id'])
+    }
+    if job['status'] == 'done':
+        data['download_url'] = url_for('download_report_job', job_id=job['id'])
+    if job['status'] == 'failed':
+        data['error'] = job['error']
+    return data
+
 @app.route('/generate_report')
 @login_required
 def generate_report():
-    """Generate and download text report"""
-    # Generate report for last 30 days
-    end_date = datetime.now().date()
-    start_date = end_date - timedelta(days=30)
+    """Start a report job and show its progress page"""
+    start_date, end_date = _report_period()
+    job = submit_report_job(current_user.id, start_date, end_date)
     
-    report_data = generate_report_data(current_user.id, start_date, end_date)  # Add current_user.id
-    report_text = format_report_as_text(report_data)
+    dark_mode = session.get('dark_mode', False)
+    return render_template('report_status.html', job=_report_job_json(job), dark_mode=dark_mode, app_name=config.APP_NAME)
+
+@app.route('/reports/jobs', methods=['POST'])
+@login_required
+def create_report_job():
+    """Queue a report job (identical active requests share one job)"""
+    start_date, end_date = _report_period()
+    job = submit_report_job(current_user.id, start_date, end_date)
+    return jsonify(_report_job_json(job)), 202
+
+@app.route('/reports/jobs/<job_id>')
+@login_required
+def report_job_status(job_id):
+    """Poll a report job's status and progress"""
+    job = get_report_job(job_id, current_user.id)
+    if not job:
+        return jsonify({'error': 'Report job not found or expired'}), 404
+    return jsonify(_report_job_json(job))
+
+@app.route('/reports/jobs/<job_id>/download')
+@login_required
+def download_report_job(job_id):
+    """Download a finished report until it expires"""
+    result = get_report_job_result(job_id, current_user.id)
+    if result is None:
+        flash('That report is not ready or has expired. Please generate a new one.', 'info')
+        return redirect(url_for('index'))
+    
+    end_date, report_text = result
     
     # Create text file response
     response = make_response(report_text)
@@ -348,6 +606,33 @@ def generate_report():
     
     return response
 
+# ============================================
+# HEATMAP API
+# ============================================
+
+def _heatmap_response(etag, heatmap_json):
+    response = make_response(heatmap_json)
+    response.headers['Content-Type'] = 'application/json'
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
+@app.route('/api/heatmap/<int(min=1, max=9999):year>')
+@login_required
+def heatmap(year):
+    """Year of daily completion intensity across all habits"""
+    etag, heatmap_json = get_heatmap(current_user.id, year)
+    return _heatmap_response(etag, heatmap_json)
+
+@app.route('/api/habits/<int:habit_id>/heatmap/<int(min=1, max=9999):year>')
+@login_required
+def habit_heatmap(habit_id, year):
+    """Year of daily completions for one habit"""
+    if get_habit_owner(habit_id) != current_user.id:
+        return jsonify({'error': 'Habit not found'}), 404
+    etag, heatmap_json = get_heatmap(current_user.id, year, habit_id)
+    return _heatmap_response(etag, heatmap_json)
+
 # ============================================
 # ADMIN ROUTES
 # ============================================
@@ -356,31 +641,100 @@ def generate_report():
 @login_required
 @admin_required
 def admin_users():
-    """Admin panel - view all users"""
-    users = get_all_users()
+    """Admin panel - view users one page at a time"""
+    before_id = request.args.get('before', type=int)
+    users, next_before_id = get_users_page(before_id)
+    user_counts = count_users()
+    today = datetime.now().date()
+    activity = get_activity_totals(today - timedelta(days=6), today)
     dark_mode = session.get('dark_mode', False)
-    return render_template('admin_users.html', users=users, dark_mode=dark_mode, app_name=config.APP_NAME)
+    return render_template('admin_users.html', users=users, user_counts=user_counts, next_before_id=next_before_id,
+                           is_first_page=before_id is None, activity=activity, dark_mode=dark_mode, app_name=config.APP_NAME)
 
 @app.route('/admin/export_users')
 @login_required
 @admin_required
 def admin_export_users():
-    """Export user emails as CSV"""
-    users = get_all_users()
-    
-    # Create CSV content
-    csv_lines = ['Email,Signed Up,Admin']
-    for user in users:
-        csv_lines.append(f'{user.email},{user.created_at},{"Yes" if user.is_admin else "No"}')
-    
-    csv_content = '\n'.join(csv_lines)
+    """Export user emails as CSV (streamed row batches, constant memory)"""
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(['Email', 'Signed Up', 'Admin'])
+        # Send the header right away, then roughly 8 KB at a time
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        
+        for email, created_at, is_admin in iter_users_for_export():
+            writer.writerow([email, created_at, 'Yes' if is_admin else 'No'])
+            if buffer.tell() >= 8192:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        
+        if buffer.tell():
+            yield buffer.getvalue()
     
-    response = make_response(csv_content)
-    response.headers['Content-Type'] = 'text/csv'
+    response = Response(stream_with_context(generate()), mimetype='text/csv')
     response.headers['Content-Disposition'] = f'attachment; filename=habit_recoder_users_{datetime.now().date()}.csv'
     
     return response
 
+@app.route('/admin/slow_queries')
+@login_required
+@admin_required
+def admin_slow_queries():
+    """Admin panel - browse the slow query log"""
+    limit = request.args.get('limit', 200, type=int)
+    entries = read_slow_query_log(limit=limit)
+    dark_mode = session.get('dark_mode', False)
+    return render_template('admin_slow_queries.html', entries=entries, threshold_ms=config.SLOW_QUERY_THRESHOLD_MS, dark_mode=dark_mode, app_name=config.APP_NAME)
+
+@app.route('/admin/bulk_export', methods=['POST'])
+@login_required
+@admin_required
+def admin_bulk_export():
+    """Start generating reports for every user into one ZIP"""
+    days = request.form.get('days', 30, type=int)
+    export_id = start_bulk_export(days=max(1, min(days, 366)))
+    return redirect(url_for('admin_bulk_export_page', export_id=export_id))
+
+@app.route('/admin/bulk_export/<export_id>')
+@login_required
+@admin_required
+def admin_bulk_export_page(export_id):
+    """Progress page for a bulk export"""
+    status = get_bulk_export_status(export_id)
+    if not status:
+        flash('Export not found', 'error')
+        return redirect(url_for('admin_users'))
+    dark_mode = session.get('dark_mode', False)
+    return render_template('admin_bulk_export.html', export=status, dark_mode=dark_mode, app_name=config.APP_NAME)
+
+@app.route('/admin/bulk_export/<export_id>/status')
+@login_required
+@admin_required
+def admin_bulk_export_status(export_id):
+    """Poll bulk export progress"""
+    status = get_bulk_export_status(export_id)
+    if not status:
+        return jsonify({'error': 'Export not found'}), 404
+    if status['status'] == 'done':
+        status['download_url'] = url_for('admin_bulk_export_download', export_id=export_id)
+    return jsonify(status)
+
+@app.route('/admin/bulk_export/<export_id>/download')
+@login_required
+@admin_required
+def admin_bulk_export_download(export_id):
+    """Download a finished bulk export"""
+    path = get_bulk_export_path(export_id)
+    if not path:
+        flash('Export not ready', 'error')
+        return redirect(url_for('admin_users'))
+    status = get_bulk_export_status(export_id)
+    return send_file(path, mimetype='application/zip', as_attachment=True, download_name=status['filename'])
+
 @app.route('/admin/delete_user/<int:user_id>')
 @login_required
 @admin_required
@@ -394,5 +748,67 @@ def admin_delete_user(user_id):
     
     return redirect(url_for('admin_users'))
 
+# ============================================
+# CLI COMMANDS
+# ============================================
+
+@app.cli.command('rebuild-daily-summary')
+@click.option('--user-id', type=int, default=None, help='Only rebuild this user')
+def rebuild_daily_summary_command(user_id):
+    """Recompute the user_daily_summary rollup from raw logs and journal entries"""
+    ensure_schema()
+    rows = rebuild_daily_summary(user_id)
+    click.echo(f"✅ Daily summary rebuilt: {rows} rows")
+
+@app.cli.command('shard-migrate')
+def shard_migrate_command():
+    """Copy per-user rows from the main SQLite database into the shard files"""
+    ensure_schema()
+    try:
+        counts = migrate_to_shards()
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    for table, rows in counts.items():
+        click.echo(f"✅ {table}: {rows} rows copied")
+    # The rollup is derived data - recompute it where the rows now live
+    rows = rebuild_daily_summary()
+    click.echo(f"✅ Daily summary rebuilt: {rows} rows")
+
+@app.cli.command('journal-compress')
+@click.option('--threshold', type=int, default=config.JOURNAL_COMPRESS_THRESHOLD, show_default=True,
+              help='Compress entries of at least this many bytes')
+def journal_compress_command(threshold):
+    """Compress existing journal entries over the size threshold"""
+    ensure_schema()
+    result = compress_journal_entries(threshold)
+    saved = result['bytes_before'] - result['bytes_after']
+    click.echo(f"✅ Compressed {result['compressed']} of {result['checked']} long entries, "
+               f"{result['bytes_before']} -> {result['bytes_after']} bytes ({saved} saved)")
+    if saved:
+        click.echo("ℹ️ The database file only shrinks after VACUUM")
+
+@app.cli.command('journal-index')
+@click.option('--user-id', type=int, default=None, help='Only rebuild this user')
+def journal_index_command(user_id):
+    """Rebuild the related-entries index of journal entries"""
+    if not similarity_available():
+        raise click.ClickException('Install numpy and scipy to use related journal entries')
+    ensure_schema()
+    entries = rebuild_journal_index(user_id)
+    click.echo(f"✅ Journal index rebuilt: {entries} entries")
+
+@app.cli.command('logs-maintain')
+@click.option('--archive-after-months', type=int, default=config.LOGS_ARCHIVE_AFTER_MONTHS, show_default=True,
+              help='Move log partitions older than this to cold storage')
+def logs_maintain_command(archive_after_months):
+    """Create upcoming logs partitions and archive old ones (PostgreSQL, LOGS_PARTITIONING)"""
+    if not log_partitioning_enabled():
+        raise click.ClickException('Set DATABASE_URL and LOGS_PARTITIONING=month|year to use log partitioning')
+    ensure_schema()
+    for name in ensure_log_partitions():
+        click.echo(f"✅ Created {name}")
+    result = archive_log_partitions(archive_after_months)
+    click.echo(f"✅ Archived {len(result['partitions'])} partitions, {result['rows']} rows in {result['payloads']} payloads")
+
 if __name__ == '__main__':
     app.run(debug=config.DEBUG)
\ No newline at end of file
@@ -1,60 +1,80 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, make_response
-from database.db_helper import init_db, get_connection
+from flask import Flask, render_template, request, redirect, url_for, flash, session, make_response, send_file, jsonify, g
+from database.db_helper import ensure_schema, get_main_connection, bind_user, unbind
 from datetime import datetime, timedelta
+import tempfile
+import threading
 import config
 
-print("🚀 Initializing Habit Re:coder Desktop...")
-
 # Create Flask app FIRST
 app = Flask(__name__)
 app.config['SECRET_KEY'] = config.SECRET_KEY
 
-# Initialize database
-print("📊 Initializing database...")
-init_db()
-
 # Desktop mode - single user (no login required)
 DESKTOP_USER_ID = 1
 
-print("📁 Importing controllers...")
-# Import controllers AFTER app is defined
+# The desktop user never logs in, so it gets a placeholder instead of a bcrypt hash
+DESKTOP_PASSWORD_HASH = '!desktop-no-login'
+
 from controllers.habit_controller import (
     create_habit, get_all_habits, get_habit_by_id, 
     delete_habit, mark_habit_complete, get_habit_streak,
-    is_completed_today, get_habit_logs, get_completion_stats,
-    update_habit
+    is_completed_today, update_habit, get_habit_detail
 )
 from controllers.journal_controller import (
     create_or_update_journal_entry, get_journal_entry_by_date,
     get_all_journal_entries, search_journal_entries,
-    get_all_tags, delete_journal_entry
+    get_all_tags, delete_journal_entry, get_related_journal_entries, autocomplete_tags
 )
 from controllers.report_controller import generate_report_data, format_report_as_text
+from controllers.prompt_builder import excerpt
+from database.journal_index import similarity_available
+from controllers.archive_controller import export_account_archive, import_account_archive
+from controllers.sync_controller import sync_with_server, get_sync_servers
+import urllib.error
+
+_desktop_ready = False
+_desktop_lock = threading.Lock()
+
+def setup_desktop():
+    """Initialize the schema and the desktop user once, on the first request"""
+    global _desktop_ready
+    if _desktop_ready:
+        return
+    
+    with _desktop_lock:
+        if _desktop_ready:
+            return
+        
+        ensure_schema()
+        
+        conn = get_main_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute('SELECT id FROM users WHERE id = ?', (DESKTOP_USER_ID,))
+            if not cursor.fetchone():
+                cursor.execute(
+                    'INSERT INTO users (id, email, password_hash, is_admin) VALUES (?, ?, ?, ?)',
+                    (DESKTOP_USER_ID, 'desktop@local', DESKTOP_PASSWORD_HASH, 0)
+                )
+                conn.commit()
+                print("✅ Desktop user created")
+        except Exception as e:
+            print(f"ℹ️ User already exists or error: {e}")
+        finally:
+            conn.close()
+        
+        _desktop_ready = True
+
+@app.before_request
+def prepare_desktop():
+    setup_desktop()
+    g.shard_token = bind_user(DESKTOP_USER_ID)
 
-print("✅ Controllers imported successfully")
-
-# Create desktop user
-print("👤 Setting up desktop user...")
-conn = get_connection()
-cursor = conn.cursor()
-try:
-    cursor.execute('SELECT id FROM users WHERE id = ?', (DESKTOP_USER_ID,))
-    if not cursor.fetchone():
-        from flask_bcrypt import Bcrypt
-        bcrypt = Bcrypt()
-        password_hash = bcrypt.generate_password_hash('desktop').decode('utf-8')
-        cursor.execute(
-            'INSERT INTO users (id, email, password_hash, is_admin) VALUES (?, ?, ?, ?)',
-            (DESKTOP_USER_ID, 'desktop@local', password_hash, 0)
-        )
-        conn.commit()
-        print("✅ Desktop user created")
-except Exception as e:
-    print(f"ℹ️ User already exists or error: {e}")
-finally:
-    conn.close()
-
-print("✅ Desktop app ready!")
+@app.teardown_request
+def release_desktop_user(exc):
+    token = g.pop('shard_token', None)
+    if token is not None:
+        unbind(token)
 
 # ============================================
 # SIMPLE SHUTDOWN HANDLER (SAFE)
@@ -131,7 +151,7 @@ def index():
                 
             habits_data.append({
                 'habit': habit,
-                'streak': get_habit_streak(habit.id),
+                'streak': get_habit_streak(habit.id, habit.get_schedule()),
                 'completed_today': is_complete
             })
         
@@ -165,6 +185,8 @@ def add_habit():
     if request.method == 'POST':
         name = request.form.get('name')
         frequency = request.form.get('frequency')
+        if frequency == 'custom' and request.form.get('frequency_custom', '').strip():
+            frequency = request.form['frequency_custom'].strip()
         target_time = request.form.get('target_time')
         icon = request.form.get('icon')
         motivation = request.form.get('motivation')
@@ -184,17 +206,14 @@ def add_habit():
 @app.route('/habit/<int:habit_id>')
 def view_habit(habit_id):
     """View detailed habit information"""
-    habit = get_habit_by_id(habit_id)
-    if not habit:
+    detail = get_habit_detail(habit_id)
+    if not detail:
         flash('Habit not found', 'error')
         return redirect(url_for('index'))
     
-    logs = get_habit_logs(habit_id)
-    stats = get_completion_stats(habit_id)
-    streak = get_habit_streak(habit_id)
-    
     dark_mode = session.get('dark_mode', False)
-    return render_template('view_habit.html', habit=habit, logs=logs, stats=stats, streak=streak, dark_mode=dark_mode, app_name=config.APP_NAME)
+    return render_template('view_habit.html', habit=detail['habit'], logs=detail['logs'], total_logs=detail['total_logs'],
+                           stats=detail['stats'], streak=detail['streak'], dark_mode=dark_mode, app_name=config.APP_NAME)
 
 @app.route('/edit/<int:habit_id>', methods=['GET', 'POST'])
 def edit_habit(habit_id):
@@ -207,6 +226,8 @@ def edit_habit(habit_id):
     if request.method == 'POST':
         name = request.form.get('name')
         frequency = request.form.get('frequency')
+        if frequency == 'custom' and request.form.get('frequency_custom', '').strip():
+            frequency = request.form['frequency_custom'].strip()
         target_time = request.form.get('target_time')
         icon = request.form.get('icon')
         motivation = request.form.get('motivation')
@@ -266,7 +287,8 @@ def journal():
     all_tags = get_all_tags(DESKTOP_USER_ID)
     dark_mode = session.get('dark_mode', False)
     
-    return render_template('journal.html', entries=entries, all_tags=all_tags, search_term=search_term, dark_mode=dark_mode, app_name=config.APP_NAME)
+    return render_template('journal.html', entries=entries, all_tags=all_tags, search_term=search_term, dark_mode=dark_mode,
+                           related_available=similarity_available(), app_name=config.APP_NAME)
 
 @app.route('/journal/save', methods=['POST'])
 def save_journal():
@@ -293,6 +315,94 @@ def delete_journal(entry_date):
     flash('Journal entry deleted', 'info')
     return redirect(url_for('journal'))
 
+@app.route('/api/journal/<entry_date>/related')
+def related_journal_entries(entry_date):
+    """Journal entries most similar to the one on entry_date"""
+    related = get_related_journal_entries(DESKTOP_USER_ID, entry_date)
+    return jsonify({
+        'entry_date': entry_date,
+        'related': [
+            {'entry_date': str(entry.entry_date)[:10], 'score': score,
+             'excerpt': excerpt(entry.content, 40), 'tags': entry.get_tags_list()}
+            for entry, score in related
+        ]
+    })
+
+@app.route('/api/tags/autocomplete')
+def autocomplete_tags_route():
+    """Journal tags starting with ?q=, most used first"""
+    prefix = request.args.get('q', '')
+    limit = min(request.args.get('limit', config.TAG_AUTOCOMPLETE_LIMIT, type=int), 50)
+    return jsonify({'query': prefix, 'tags': autocomplete_tags(DESKTOP_USER_ID, prefix, limit)})
+
+# ============================================
+# ACCOUNT ARCHIVE (export / import)
+# ============================================
+
+@app.route('/account/archive')
+def account_archive():
+    """Account data page - export or import an archive"""
+    dark_mode = session.get('dark_mode', False)
+    return render_template('account_archive.html', dark_mode=dark_mode, app_name=config.APP_NAME)
+
+@app.route('/account/archive/export')
+def export_account_archive_route():
+    """Download the whole account as a ZIP of NDJSON files"""
+    # Spooled to a temporary file on disk, never held in memory
+    archive_file = tempfile.TemporaryFile()
+    export_account_archive(DESKTOP_USER_ID, archive_file)
+    archive_file.seek(0)
+    return send_file(
+        archive_file,
+        mimetype='application/zip',
+        as_attachment=True,
+        download_name=f"habit_recoder_account_{datetime.now().date()}.zip"
+    )
+
+@app.route('/account/archive/import', methods=['POST'])
+def import_account_archive_route():
+    """Import an uploaded account archive"""
+    upload = request.files.get('archive')
+    if not upload or not upload.filename:
+        flash('Please choose an archive to import', 'error')
+        return redirect(url_for('account_archive'))
+    
+    try:
+        counts = import_account_archive(DESKTOP_USER_ID, upload.stream)
+        flash(f"Imported {counts['habits']} habits, {counts['logs']} completions and "
+              f"{counts['journal_entries']} journal entries (existing ones were kept)", 'success')
+    except ValueError as e:
+        flash(f'Could not import archive: {e}', 'error')
+    return redirect(url_for('account_archive'))
+
+# ============================================
+# SYNC WITH THE WEB VERSION
+# ============================================
+
+@app.route('/sync', methods=['GET', 'POST'])
+def sync():
+    """Sync local data with a Habit Re:coder web account"""
+    servers = get_sync_servers()
+    
+    if request.method == 'POST':
+        server_url = (request.form.get('server_url') or '').strip()
+        email = request.form.get('email')
+        password = request.form.get('password')
+        
+        if not server_url.startswith(('http://', 'https://')) or not email or not password:
+            flash('Please enter the server address (http://...), your email and password', 'error')
+        else:
+            try:
+                summary = sync_with_server(DESKTOP_USER_ID, server_url, email, password)
+                flash(f"Sync complete: {summary['pushed']} changes sent, {summary['pulled']} received", 'success')
+            except (urllib.error.URLError, OSError, RuntimeError, ValueError) as e:
+                print(f"❌ Sync failed: {e}")
+                flash(f'Sync failed: {e}', 'error')
+        return redirect(url_for('sync'))
+    
+    dark_mode = session.get('dark_mode', False)
+    return render_template('sync.html', servers=servers, dark_mode=dark_mode, app_name=config.APP_NAME)
+
 @app.route('/generate_report')
 def generate_report():
     """Generate and download text report"""
@@ -0,0 +1,88 @@
+"""
+Bulk export benchmark - report throughput vs number of worker processes
+
+Seeds a throwaway SQLite database with synthetic users, habits, logs and
+journal entries, then exports every user's report with 1, 2, 4, ... processes.
+
+Usage:
+    python benchmarks/bulk_export_benchmark.py [--users 200] [--habits 5] [--days 120]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+from datetime import date, timedelta
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def seed(users, habits, days):
+    from database.db_helper import ensure_schema, get_connection
+    from database.daily_summary import rebuild_daily_summary
+
+    ensure_schema()
+    conn = get_connection()
+    cursor = conn.cursor()
+    today = date.today()
+    created_at = f"{today - timedelta(days=days)} 08:00:00"
+    habit_id = 0
+    for user_id in range(1, users + 1):
+        cursor.execute(
+            'INSERT INTO users (id, email, password_hash) VALUES (?, ?, ?)',
+            (user_id, f"user{user_id}@example.com", '!')
+        )
+        for h in range(habits):
+            habit_id += 1
+            cursor.execute(
+                'INSERT INTO habits (id, user_id, name, frequency, created_at) VALUES (?, ?, ?, ?, ?)',
+                (habit_id, user_id, f"Habit {h + 1}", 'daily', created_at)
+            )
+            cursor.executemany(
+                'INSERT INTO logs (habit_id, completed_date, mood) VALUES (?, ?, ?)',
+                [(habit_id, today - timedelta(days=d), random.choice(['happy', 'neutral', 'stressed']))
+                 for d in range(days) if random.random() < 0.6]
+            )
+        cursor.executemany(
+            'INSERT INTO journal_entries (user_id, entry_date, content, tags) VALUES (?, ?, ?, ?)',
+            [(user_id, today - timedelta(days=d), 'Felt focused today. ' * 20, 'focus,work')
+             for d in range(0, days, 3)]
+        )
+    conn.commit()
+    conn.close()
+    rebuild_daily_summary()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--habits', type=int, default=5)
+    parser.add_argument('--days', type=int, default=120)
+    parser.add_argument('--max-processes', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        os.environ['HABIT_RECODER_DATA_DIR'] = data_dir
+        os.environ.pop('DATABASE_URL', None)
+        sys.path.insert(0, REPO_DIR)
+        from controllers.bulk_export_controller import export_reports_zip, get_export_users
+
+        seed(args.users, args.habits, args.days)
+        users = get_export_users()
+        end_date = date.today()
+        start_date = end_date - timedelta(days=30)
+
+        processes = 1
+        baseline = None
+        print(f"{'processes':>10}{'seconds':>10}{'reports/s':>12}{'speedup':>10}")
+        while processes <= args.max_processes:
+            result = export_reports_zip(users, os.path.join(data_dir, f"export_{processes}.zip"), start_date, end_date, processes)
+            baseline = baseline or result['reports_per_second']
+            speedup = result['reports_per_second'] / baseline if baseline else 0
+            print(f"{processes:>10}{result['seconds']:>10}{result['reports_per_second']:>12}{speedup:>9.2f}x")
+            processes *= 2
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Desktop launch benchmark - launch-to-interactive time for desktop_launcher.py
+
+Each run starts the launcher in a fresh process (no browser, any free port,
+throwaway data directory) and measures from process spawn until:
+  - listening:   the server prints its URL (socket bound and accepting)
+  - interactive: GET / returns 200
+
+Usage:
+    python benchmarks/desktop_launch_benchmark.py [--runs 5]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TIMEOUT = 30
+
+
+def run_once(data_dir):
+    env = dict(
+        os.environ,
+        HABIT_RECODER_DATA_DIR=data_dir,
+        HABIT_RECODER_NO_BROWSER='1',
+        HABIT_RECODER_PORT='0',
+    )
+    env.pop('DATABASE_URL', None)
+
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, '-u', 'desktop_launcher.py'],
+        cwd=REPO_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+    )
+    try:
+        url = None
+        for line in process.stdout:
+            if 'Serving on ' in line:
+                url = line.split('Serving on ', 1)[1].strip()
+                break
+        if url is None:
+            raise RuntimeError('launcher exited before serving')
+        listening = time.perf_counter()
+
+        deadline = time.monotonic() + TIMEOUT
+        while True:
+            try:
+                with urllib.request.urlopen(url + '/', timeout=5) as response:
+                    if response.status == 200:
+                        break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError('launcher never became interactive')
+                time.sleep(0.01)
+        interactive = time.perf_counter()
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+    return {
+        'listening_ms': (listening - started) * 1000,
+        'interactive_ms': (interactive - started) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    samples = []
+    for _ in range(args.runs):
+        with tempfile.TemporaryDirectory() as data_dir:
+            samples.append(run_once(data_dir))
+
+    for key in ('listening_ms', 'interactive_ms'):
+        values = [sample[key] for sample in samples]
+        print(f"{key:<16} median {statistics.median(values):7.1f}   min {min(values):7.1f}   max {max(values):7.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""
+Journal compression benchmark - stored size and read/write speed of journal entries
+
+Generates synthetic journal entries of mixed length (most short, some long
+daily write-ups), then reports:
+  - bytes stored per codec for the entries over the threshold
+    (plain text, zlib, zlib with the preset dictionary)
+  - compress/decompress throughput in MB of text per second
+  - a throwaway SQLite database with and without compression: file size
+    after VACUUM and the time of get_all_journal_entries()
+
+Usage:
+    python benchmarks/journal_compression_benchmark.py [--entries 2000] [--threshold 1024]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SENTENCES = [
+    "Today I felt a lot calmer than yesterday.",
+    "This morning I went for a run before work and it really helped.",
+    "I didn't sleep well, so the afternoon was hard.",
+    "Work was busy with the project deadline coming up on Friday.",
+    "I managed to read thirty pages before dinner.",
+    "I'm proud of myself for sticking with meditation this week.",
+    "Had coffee with a friend and talked about moving to a new city.",
+    "I want to spend less time on my phone in the evening.",
+    "Feeling stressed about money, but I made a plan for next month.",
+    "It was a good day overall, even though the meeting ran late.",
+    "I tried to drink more water and mostly remembered.",
+    "Tomorrow I need to start earlier and take a proper lunch break.",
+    "My family called tonight and it made me happy.",
+    "I skipped the workout again and I want to understand why.",
+    "Grateful for a quiet weekend and a long walk in the park.",
+]
+
+WORDS = (
+    "the a and to of I my was it in that for with but so this felt today work day time again "
+    "really still just more less about after before morning evening night week weekend friend "
+    "family partner colleague boss project meeting email deadline plan budget rent train bus "
+    "kitchen garden gym park book podcast music guitar painting cooking soup bread salad tea "
+    "tired restless calm proud annoyed hopeful nervous focused lazy curious grateful sore "
+    "walked cleaned cooked called finished started forgot noticed decided tried argued laughed "
+    "slowly finally honestly maybe probably almost never always sometimes usually quickly"
+).split()
+
+
+def make_sentence(rng):
+    if rng.random() < 0.4:
+        return rng.choice(SENTENCES)
+    words = [rng.choice(WORDS) for _ in range(rng.randint(5, 18))]
+    if rng.random() < 0.3:
+        words.insert(rng.randrange(len(words)), str(rng.randint(2, 90)))
+    return ' '.join(words).capitalize() + rng.choice(['.', '.', '.', '!', '?'])
+
+
+def make_entries(count, seed=7):
+    """Mostly short notes with a tail of long daily write-ups"""
+    rng = random.Random(seed)
+    entries = []
+    for _ in range(count):
+        sentences = rng.choice([2, 3, 5, 8, 12, 30, 60, 120])
+        entries.append(' '.join(make_sentence(rng) for _ in range(sentences)))
+    return entries
+
+
+def codec_sizes(entries, threshold):
+    from models.journal import compress_content, decompress_content
+
+    long_entries = [text for text in entries if len(text.encode('utf-8')) >= threshold]
+    plain = sum(len(text.encode('utf-8')) for text in long_entries)
+    print(f"{len(long_entries)} of {len(entries)} entries are at least {threshold} bytes")
+    print(f"{'codec':>16}{'bytes':>12}{'ratio':>8}{'compress MB/s':>15}{'decompress MB/s':>17}")
+    print(f"{'plain':>16}{plain:>12}{1:>8.2f}{'-':>15}{'-':>17}")
+
+    for label, use_dictionary in (('zlib', False), ('zlib + dict', True)):
+        started = time.perf_counter()
+        packed = [compress_content(text, threshold, use_dictionary) for text in long_entries]
+        compress_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for content, content_compressed in packed:
+            decompress_content(content, content_compressed)
+        decompress_seconds = time.perf_counter() - started
+
+        stored = sum(len(blob) if blob is not None else len(content.encode('utf-8')) for content, blob in packed)
+        mb = plain / 1e6
+        print(f"{label:>16}{stored:>12}{plain / stored:>8.2f}{mb / compress_seconds:>15.1f}{mb / decompress_seconds:>17.1f}")
+
+
+def database_sizes(entries, threshold, data_dir):
+    """Write every entry through the controller into a fresh database per threshold"""
+    import importlib
+    import config
+    import models.journal
+    import controllers.journal_controller as journal_controller
+    from database import db_helper
+
+    print(f"{'threshold':>10}{'file KB':>10}{'write s':>10}{'read all ms':>13}")
+    for setting in (0, threshold):
+        directory = os.path.join(data_dir, f"threshold_{setting}")
+        os.environ['HABIT_RECODER_DATA_DIR'] = directory
+        os.environ['JOURNAL_COMPRESS_THRESHOLD'] = str(setting)
+        for module in (config, db_helper, models.journal, journal_controller):
+            importlib.reload(module)
+
+        db_helper.ensure_schema()
+        conn = db_helper.get_connection()
+        conn.execute("INSERT INTO users (id, email, password_hash) VALUES (1, 'bench@example.com', '!')")
+        conn.commit()
+        conn.close()
+
+        today = date.today()
+        started = time.perf_counter()
+        for offset, text in enumerate(entries):
+            journal_controller.create_or_update_journal_entry(1, today - timedelta(days=offset), text, 'bench')
+        write_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        journal_controller.get_all_journal_entries(1)
+        read_ms = (time.perf_counter() - started) * 1000
+
+        conn = db_helper.get_connection()
+        conn.execute('VACUUM')
+        conn.close()
+        size_kb = os.path.getsize(config.DATABASE_PATH) / 1024
+        print(f"{setting or 'off':>10}{size_kb:>10.0f}{write_seconds:>10.2f}{read_ms:>13.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, default=2000)
+    parser.add_argument('--threshold', type=int, default=1024)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        os.environ['HABIT_RECODER_DATA_DIR'] = data_dir
+        os.environ.pop('DATABASE_URL', None)
+        sys.path.insert(0, REPO_DIR)
+
+        entries = make_entries(args.entries)
+        codec_sizes(entries, args.threshold)
+        print()
+        database_sizes(entries, args.threshold, data_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Startup benchmark - time-to-first-request for the web and desktop entry points
+
+Each run starts a fresh Python process against a throwaway data directory,
+imports the entry point and serves one request through the Flask test client.
+
+Usage:
+    python benchmarks/startup_benchmark.py [--runs 5] [--warm]
+
+--warm reuses one data directory so every run after the first sees an
+up-to-date schema (the common case for a restarted worker).
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENTRY_POINTS = {
+    'web': ('app', '/login'),
+    'desktop': ('app_desktop', '/'),
+}
+
+# Runs inside the child process; prints one JSON line with the timings
+PROBE = '''
+import json, time
+t0 = time.perf_counter()
+import {module} as entry
+t1 = time.perf_counter()
+response = entry.app.test_client().get({path!r})
+t2 = time.perf_counter()
+print(json.dumps({{
+    "status": response.status_code,
+    "import_ms": (t1 - t0) * 1000,
+    "first_request_ms": (t2 - t1) * 1000,
+    "total_ms": (t2 - t0) * 1000,
+}}))
+'''
+
+
+def run_once(module, path, data_dir):
+    """Start a fresh interpreter and return its timings"""
+    env = dict(os.environ, HABIT_RECODER_DATA_DIR=data_dir)
+    env.pop('DATABASE_URL', None)
+    result = subprocess.run(
+        [sys.executable, '-c', PROBE.format(module=module, path=path)],
+        cwd=REPO_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    # The last line is ours - anything above is app output
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def benchmark(name, runs, warm):
+    module, path = ENTRY_POINTS[name]
+    samples = []
+    with tempfile.TemporaryDirectory() as shared_dir:
+        for _ in range(runs):
+            if warm:
+                samples.append(run_once(module, path, shared_dir))
+            else:
+                with tempfile.TemporaryDirectory() as data_dir:
+                    samples.append(run_once(module, path, data_dir))
+
+    if warm and len(samples) > 1:
+        # The first warm run pays for schema creation
+        samples = samples[1:]
+
+    return {
+        key: round(statistics.median(sample[key] for sample in samples), 1)
+        for key in ('import_ms', 'first_request_ms', 'total_ms')
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--warm', action='store_true', help='reuse one data directory across runs')
+    args = parser.parse_args()
+
+    print(f"{'entry':<10}{'import':>12}{'1st request':>14}{'total':>12}   (median ms, {args.runs} runs)")
+    for name in ENTRY_POINTS:
+        result = benchmark(name, args.runs, args.warm)
+        print(f"{name:<10}{result['import_ms']:>12}{result['first_request_ms']:>14}{result['total_ms']:>12}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Write-behind benchmark - completion throughput under a burst, queue off vs on
+
+Seeds a throwaway SQLite database with one user and many habits, then has
+several threads mark them complete as fast as they can (a morning spike),
+once with direct commits and once through the write-behind queue, which
+group-commits clicks that arrive together. Both rows measure completions
+that are durably in the database.
+
+Usage:
+    python benchmarks/write_behind_benchmark.py [--completions 2000] [--threads 8]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def seed_habits(count, prefix):
+    from database.db_helper import get_connection
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.executemany(
+        'INSERT INTO habits (user_id, name, frequency, uid) VALUES (1, ?, ?, ?)',
+        [(f"{prefix} {i}", 'daily', f"{prefix}-{i}") for i in range(count)]
+    )
+    cursor.execute('SELECT id FROM habits WHERE name LIKE ? ORDER BY id', (f"{prefix} %",))
+    habit_ids = [row[0] for row in cursor.fetchall()]
+    conn.commit()
+    conn.close()
+    return habit_ids
+
+
+def burst(habit_ids, threads):
+    """Complete every habit from `threads` threads; returns (seconds, slowest click in ms)"""
+    from controllers.habit_controller import mark_habit_complete
+
+    slowest = [0.0]
+    lock = threading.Lock()
+
+    def worker(chunk):
+        for habit_id in chunk:
+            started = time.perf_counter()
+            mark_habit_complete(habit_id, 'happy')
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                slowest[0] = max(slowest[0], elapsed)
+
+    workers = [threading.Thread(target=worker, args=(habit_ids[i::threads],)) for i in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return time.perf_counter() - started, slowest[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--completions', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        os.environ['HABIT_RECODER_DATA_DIR'] = data_dir
+        os.environ.pop('DATABASE_URL', None)
+        sys.path.insert(0, REPO_DIR)
+        from database.db_helper import ensure_schema, get_connection
+        from database import write_behind
+
+        ensure_schema()
+        conn = get_connection()
+        conn.execute("INSERT INTO users (id, email, password_hash) VALUES (1, 'bench@example.com', '!')")
+        conn.commit()
+        conn.close()
+
+        print(f"{'mode':>14}{'seconds':>10}{'completions/s':>15}{'commits':>10}{'slowest ms':>12}")
+
+        habit_ids = seed_habits(args.completions, 'direct')
+        write_behind.configure_write_behind(False)
+        seconds, slowest = burst(habit_ids, args.threads)
+        print(f"{'direct':>14}{seconds:>10.2f}{args.completions / seconds:>15.0f}{args.completions:>10}{slowest:>12.1f}")
+
+        habit_ids = seed_habits(args.completions, 'queued')
+        write_behind.configure_write_behind(True)
+        started = time.perf_counter()
+        _, slowest = burst(habit_ids, args.threads)
+        write_behind.flush()
+        seconds = time.perf_counter() - started
+        stats = write_behind.get_write_behind_stats()
+        print(f"{'write-behind':>14}{seconds:>10.2f}{stats['completions'] / seconds:>15.0f}{stats['commits']:>10}{slowest:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -17,6 +17,7 @@ a = Analysis(
         'flask_bcrypt',
         'email_validator',
         'sqlite3',
+        'waitress',
     ],
     hookspath=[],
     hooksconfig={},
@@ -5,7 +5,10 @@ import sys
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 
 # FIXED: Database path - use persistent location for desktop app
-if getattr(sys, 'frozen', False):
+if os.environ.get('HABIT_RECODER_DATA_DIR'):
+    # Explicit override (benchmarks, load tests, multiple local instances)
+    APP_DATA_DIR = os.path.abspath(os.environ['HABIT_RECODER_DATA_DIR'])
+elif getattr(sys, 'frozen', False):
     # Running as compiled executable (.exe)
     if os.name == 'nt':  # Windows
         # Use AppData/Local for better persistence
@@ -18,15 +21,92 @@ else:
     # Running as script (development)
     APP_DATA_DIR = BASE_DIR
 
-# Create app data directory if it doesn't exist
-os.makedirs(APP_DATA_DIR, exist_ok=True)
-
 # Database configuration - FIXED: Use persistent location
+# The directory is created on first connection, not at import time
 DATABASE_PATH = os.path.join(APP_DATA_DIR, 'habit_tracker.db')
 
-print(f"🚀 DEBUG: Database will be stored at: {DATABASE_PATH}")
-print(f"🚀 DEBUG: App data directory: {APP_DATA_DIR}")
-print(f"🚀 DEBUG: Directory exists: {os.path.exists(APP_DATA_DIR)}")
+# Connection pooling - connections are reused within a process when DB_POOL_SIZE > 0
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '0'))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', '10'))  # seconds to wait for a free connection
+
+# Readiness probe (/readyz) - not ready once this share of pooled connections is in use
+READY_POOL_SATURATION = float(os.environ.get('READY_POOL_SATURATION', '0.9'))
+READY_CACHE_SECONDS = float(os.environ.get('READY_CACHE_SECONDS', '1'))  # probe results reused for this long
+
+# Read replica - read-only queries go here when set (a PostgreSQL URL, or sqlite:///path/to/copy.db
+# next to a SQLite primary); writes and anything that must see them stay on DATABASE_URL
+DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')
+READ_YOUR_WRITES_SECONDS = float(os.environ.get('READ_YOUR_WRITES_SECONDS', '5'))  # a user reads the primary this long after writing
+REPLICA_RETRY_SECONDS = float(os.environ.get('REPLICA_RETRY_SECONDS', '30'))  # primary only for this long after the replica fails
+REPLICA_CONNECT_TIMEOUT = int(os.environ.get('REPLICA_CONNECT_TIMEOUT', '2'))  # seconds
+
+# SQLite sharding - per-user data split over this many files (0 = one database)
+SQLITE_SHARDS = int(os.environ.get('SQLITE_SHARDS', '0'))
+SHARD_DIR = os.path.join(APP_DATA_DIR, 'shards')
+SHARD_HANDLE_CACHE = int(os.environ.get('SHARD_HANDLE_CACHE', '8'))  # open shard files per thread
+
+# PostgreSQL logs partitioning by completed_date ('' = one table, 'month' or 'year')
+LOGS_PARTITIONING = os.environ.get('LOGS_PARTITIONING', '').strip().lower()
+LOGS_PARTITIONS_AHEAD = int(os.environ.get('LOGS_PARTITIONS_AHEAD', '3'))  # future partitions kept ready
+LOGS_ARCHIVE_AFTER_MONTHS = int(os.environ.get('LOGS_ARCHIVE_AFTER_MONTHS', '24'))  # older partitions move to cold storage
+# Streak lookups read this many recent days first and only widen for longer streaks
+LOGS_HOT_WINDOW_DAYS = int(os.environ.get('LOGS_HOT_WINDOW_DAYS', '400'))
+
+# Rows fetched per round trip by iter_query() (server-side cursors on PostgreSQL)
+DB_ITERSIZE = int(os.environ.get('DB_ITERSIZE', '2000'))
+
+# Slow query logging - statements slower than the threshold are logged with their plan
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', '200'))  # 0 disables
+SLOW_QUERY_LOG_PATH = os.path.join(APP_DATA_DIR, 'logs', 'slow_queries.log')
+SLOW_QUERY_LOG_MAX_BYTES = int(os.environ.get('SLOW_QUERY_LOG_MAX_BYTES', str(1024 * 1024)))
+SLOW_QUERY_LOG_BACKUPS = int(os.environ.get('SLOW_QUERY_LOG_BACKUPS', '5'))
+
+# Background report jobs
+REPORT_JOB_WORKERS = int(os.environ.get('REPORT_JOB_WORKERS', '2'))
+REPORT_JOB_TTL_MINUTES = int(os.environ.get('REPORT_JOB_TTL_MINUTES', '30'))  # download window
+REPORT_JOB_STALE_MINUTES = int(os.environ.get('REPORT_JOB_STALE_MINUTES', '10'))  # give up on stuck jobs
+
+# Heatmap API - serialized years kept in memory per (user, year, habit, data version)
+HEATMAP_CACHE_SIZE = int(os.environ.get('HEATMAP_CACHE_SIZE', '512'))
+
+# Habit detail page - how many recent completions to show
+HABIT_DETAIL_LOG_LIMIT = int(os.environ.get('HABIT_DETAIL_LOG_LIMIT', '60'))
+
+# Journal entries at least this many UTF-8 bytes are stored compressed (0 = never)
+JOURNAL_COMPRESS_THRESHOLD = int(os.environ.get('JOURNAL_COMPRESS_THRESHOLD', '1024'))
+
+# Related journal entries - per-user TF-IDF index files (needs NumPy and SciPy)
+JOURNAL_INDEX_DIR = os.path.join(APP_DATA_DIR, 'journal_index')
+JOURNAL_INDEX_CACHE_SIZE = int(os.environ.get('JOURNAL_INDEX_CACHE_SIZE', '64'))  # indexes kept in memory
+JOURNAL_RELATED_LIMIT = int(os.environ.get('JOURNAL_RELATED_LIMIT', '5'))
+
+# Journal tag autocomplete
+TAG_AUTOCOMPLETE_LIMIT = int(os.environ.get('TAG_AUTOCOMPLETE_LIMIT', '8'))  # suggestions per request
+TAG_INDEX_CACHE_SIZE = int(os.environ.get('TAG_INDEX_CACHE_SIZE', '256'))  # users' tag indexes kept in memory
+
+# Reports - size budget of the AI prompt, in estimated tokens (0 = no limit)
+AI_PROMPT_MAX_TOKENS = int(os.environ.get('AI_PROMPT_MAX_TOKENS', '6000'))
+
+# Write-behind batching of habit completions (see database/write_behind.py)
+WRITE_BEHIND_ENABLED = os.environ.get('WRITE_BEHIND_ENABLED', 'False') == 'True'
+
+# Admin user list page size
+ADMIN_USERS_PER_PAGE = int(os.environ.get('ADMIN_USERS_PER_PAGE', '50'))
+
+# Admin bulk report export
+BULK_EXPORT_DIR = os.path.join(APP_DATA_DIR, 'exports')
+BULK_EXPORT_PROCESSES = int(os.environ.get('BULK_EXPORT_PROCESSES', '0'))  # 0 = one per CPU core
+BULK_EXPORT_TTL_HOURS = int(os.environ.get('BULK_EXPORT_TTL_HOURS', '24'))  # download window
+BULK_EXPORT_STALE_HOURS = int(os.environ.get('BULK_EXPORT_STALE_HOURS', '6'))  # give up on stuck exports
+
+# Account archive export/import
+ARCHIVE_IMPORT_BATCH_SIZE = int(os.environ.get('ARCHIVE_IMPORT_BATCH_SIZE', '1000'))
+ARCHIVE_MAX_UPLOAD_MB = int(os.environ.get('ARCHIVE_MAX_UPLOAD_MB', '200'))
+
+# Desktop <-> web delta sync
+SYNC_BATCH_SIZE = max(2, int(os.environ.get('SYNC_BATCH_SIZE', '500')))  # changes per request (a completion may bring its habit)
+SYNC_MAX_BODY_MB = int(os.environ.get('SYNC_MAX_BODY_MB', '20'))  # decompressed push size
+SYNC_TIMEOUT = int(os.environ.get('SYNC_TIMEOUT', '30'))  # seconds per request (client)
 
 # Flask configuration
 SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production-12345'
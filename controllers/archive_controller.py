@@ -0,0 +1,299 @@
+"""
+Account archives - move a whole account between the desktop and web editions
+
+An archive is a ZIP with one NDJSON file per table (one JSON object per line)
+plus manifest.json. Both directions stream: export writes rows into the ZIP
+as the cursor yields them, import reads the archive line by line and inserts
+in batches, so multi-year accounts never have to fit in memory.
+"""
+
+from database.db_helper import get_connection, iter_query
+from database import write_behind
+from database.daily_summary import rebuild_daily_summary
+from database.change_log import new_uid, log_key, record_change
+from database.log_partitions import partitioning_enabled, cold_logs
+from database.journal_index import drop_journal_index
+from models.journal import compress_content, decompress_content
+from models.schedule import compile_frequency
+from config import APP_NAME, ARCHIVE_IMPORT_BATCH_SIZE
+from datetime import datetime
+import io
+import json
+import zipfile
+import zlib
+
+ARCHIVE_FORMAT = 'habit-recoder-account'
+ARCHIVE_VERSION = 1
+
+HABIT_FIELDS = ('id', 'uid', 'name', 'frequency', 'target_time', 'icon', 'motivation', 'challenges', 'ai_notes', 'created_at')
+LOG_FIELDS = ('habit_id', 'completed_date', 'mood', 'note', 'created_at')
+JOURNAL_FIELDS = ('entry_date', 'content', 'tags', 'created_at', 'updated_at')
+
+_EXPORT_QUERIES = (
+    ('habits', HABIT_FIELDS, f"SELECT {', '.join(HABIT_FIELDS)} FROM habits WHERE user_id = ? ORDER BY id"),
+    ('logs', LOG_FIELDS,
+     'SELECT l.habit_id, l.completed_date, l.mood, l.note, l.created_at '
+     'FROM logs l JOIN habits h ON h.id = l.habit_id WHERE h.user_id = ? ORDER BY l.habit_id, l.completed_date'),
+    # content_compressed is read as an extra last column and folded into content
+    ('journal_entries', JOURNAL_FIELDS,
+     f"SELECT {', '.join(JOURNAL_FIELDS)}, content_compressed FROM journal_entries WHERE user_id = ? ORDER BY entry_date"),
+)
+
+# ============================================
+# EXPORT
+# ============================================
+
+def export_account_archive(user_id, fileobj):
+    """Write a user's habits, logs and journal into fileobj (path or seekable file) as a ZIP
+
+    Returns the row count per table.
+    """
+    write_behind.flush()
+    counts = {}
+    with zipfile.ZipFile(fileobj, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for table, fields, sql in _EXPORT_QUERIES:
+            count = 0
+            with archive.open(f"{table}.ndjson", 'w', force_zip64=True) as member:
+                for row in iter_query(sql, (user_id,)):
+                    record = {field: row[index] for index, field in enumerate(fields)}
+                    if table == 'journal_entries':
+                        record['content'] = decompress_content(record['content'], row[len(fields)])
+                    member.write(json.dumps(record, default=str, ensure_ascii=False).encode('utf-8') + b'\n')
+                    count += 1
+                if table == 'logs':
+                    count += _write_cold_logs(member, user_id)
+            counts[table] = count
+
+        # Written last so it can carry the counts
+        archive.writestr('manifest.json', json.dumps({
+            'format': ARCHIVE_FORMAT,
+            'version': ARCHIVE_VERSION,
+            'app': APP_NAME,
+            'exported_at': datetime.now().isoformat(timespec='seconds'),
+            'counts': counts
+        }, indent=2))
+
+    print(f"📦 Exported account {user_id}: {counts}")
+    return counts
+
+def _write_cold_logs(member, user_id):
+    """Append completions archived to cold storage (PostgreSQL log partitioning)"""
+    if not partitioning_enabled():
+        return 0
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT id FROM habits WHERE user_id = ? ORDER BY id', (user_id,))
+    count = 0
+    for habit_id in [row[0] for row in cursor.fetchall()]:
+        for record in cold_logs(cursor, habit_id):
+            record = {field: record.get(field) for field in LOG_FIELDS}
+            member.write(json.dumps(record, ensure_ascii=False).encode('utf-8') + b'\n')
+            count += 1
+    conn.close()
+    return count
+
+# ============================================
+# IMPORT
+# ============================================
+
+def _read_ndjson(archive, name):
+    """Yield the objects of one NDJSON member without reading it all"""
+    if name not in archive.namelist():
+        return
+    try:
+        with archive.open(name) as member:
+            for line_number, line in enumerate(io.TextIOWrapper(member, encoding='utf-8'), 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    raise ValueError(f"{name} line {line_number} is not valid JSON")
+                if not isinstance(record, dict):
+                    raise ValueError(f"{name} line {line_number} is not an object")
+                yield record
+    except (zipfile.BadZipFile, zlib.error, EOFError):
+        # Damaged data only shows up once the member is decompressed
+        raise ValueError(f"{name} is damaged - the archive is corrupt")
+
+def _read_manifest(archive):
+    try:
+        manifest = json.loads(archive.read('manifest.json'))
+    except (KeyError, ValueError):
+        raise ValueError('Not a Habit Re:Coder account archive (manifest.json missing)')
+    except (zipfile.BadZipFile, zlib.error, EOFError):
+        raise ValueError('manifest.json is damaged - the archive is corrupt')
+    if manifest.get('format') != ARCHIVE_FORMAT:
+        raise ValueError('Not a Habit Re:Coder account archive')
+    if manifest.get('version', 0) > ARCHIVE_VERSION:
+        raise ValueError('This archive was made by a newer version of the app')
+    return manifest
+
+def _insert_batches(conn, cursor, sql, rows, batch_size, key, find_existing, changes):
+    """executemany() in batches, committing each one; returns the number of rows inserted
+
+    Rows whose key(row) find_existing(cursor, batch) reports as already
+    stored (or that repeat a key earlier in the batch) are left out, so the
+    count and the change log only cover new rows. changes(row) gives the
+    change_log row (user_id, entity, entity_key) recorded with each inserted
+    row, so imported data reaches synced devices.
+    """
+    batch = []
+    total = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            total += _flush_batch(conn, cursor, sql, batch, key, find_existing, changes)
+            batch = []
+    if batch:
+        total += _flush_batch(conn, cursor, sql, batch, key, find_existing, changes)
+    return total
+
+def _flush_batch(conn, cursor, sql, batch, key, find_existing, changes):
+    seen = find_existing(cursor, batch)
+    new_rows = []
+    for row in batch:
+        if key(row) not in seen:
+            seen.add(key(row))
+            new_rows.append(row)
+    # ON CONFLICT still covers a row written by someone else meanwhile
+    cursor.executemany(sql, new_rows)
+    for row in new_rows:
+        record_change(cursor, *changes(row))
+    conn.commit()
+    return len(new_rows)
+
+def _log_row_key(row):
+    return (row[0], str(row[1])[:10])
+
+def _existing_logs(cursor, batch):
+    """Keys of the batch's completions that are already stored"""
+    habit_ids = sorted({row[0] for row in batch})
+    days = [str(row[1])[:10] for row in batch]
+    cursor.execute(
+        f"SELECT habit_id, completed_date FROM logs WHERE habit_id IN ({', '.join('?' * len(habit_ids))}) "
+        'AND completed_date BETWEEN ? AND ?',
+        (*habit_ids, min(days), max(days))
+    )
+    return {_log_row_key(row) for row in cursor.fetchall()}
+
+def _journal_row_key(row):
+    return str(row[1])[:10]
+
+def _existing_journal_entries(cursor, batch):
+    """Keys of the batch's journal entries that are already stored"""
+    days = [_journal_row_key(row) for row in batch]
+    cursor.execute(
+        'SELECT entry_date FROM journal_entries WHERE user_id = ? AND entry_date BETWEEN ? AND ?',
+        (batch[0][0], min(days), max(days))
+    )
+    return {str(row[0])[:10] for row in cursor.fetchall()}
+
+def _import_habits(conn, cursor, archive, user_id):
+    """Create the archive's habits
+
+    A habit with the same uid (or, for older archives, the same name and
+    creation time) as an existing one is reused, so importing the same
+    archive twice does not duplicate anything. Returns
+    ({archive habit id: (habit id, habit uid)}, habits created).
+    """
+    cursor.execute('SELECT id, uid, name, created_at FROM habits WHERE user_id = ?', (user_id,))
+    by_uid = {}
+    by_name = {}
+    for row in cursor.fetchall():
+        by_uid[row[1]] = (row[0], row[1])
+        by_name[(row[2], str(row[3]))] = (row[0], row[1])
+
+    habit_ids = {}
+    created = 0
+    for record in _read_ndjson(archive, 'habits.ndjson'):
+        if record.get('id') is None or not record.get('name') or not record.get('frequency'):
+            raise ValueError('habits.ndjson has a habit without id, name or frequency')
+        key = (record['name'], str(record.get('created_at')))
+        existing = by_uid.get(record.get('uid')) or by_name.get(key)
+        if existing:
+            habit_ids[record['id']] = existing
+            continue
+
+        uid = record.get('uid') or new_uid()
+        cursor.execute(
+            'INSERT INTO habits (user_id, uid, name, frequency, target_time, icon, motivation, challenges, ai_notes, created_at, schedule) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), ?)',
+            (user_id, uid, record['name'], record['frequency'], record.get('target_time'), record.get('icon'),
+             record.get('motivation'), record.get('challenges'), record.get('ai_notes'), record.get('created_at'),
+             compile_frequency(record['frequency']))
+        )
+        habit_ids[record['id']] = (cursor.lastrowid, uid)
+        record_change(cursor, user_id, 'habit', uid)
+        by_uid[uid] = by_name[key] = habit_ids[record['id']]
+        created += 1
+    conn.commit()
+    return habit_ids, created
+
+def import_account_archive(user_id, fileobj, batch_size=ARCHIVE_IMPORT_BATCH_SIZE):
+    """Import an account archive into a user's account
+
+    Rows that already exist (same habit, same log day, same journal day) are
+    skipped, so an interrupted import can simply be run again. Raises
+    ValueError for files that are not valid archives. Returns a dict of counts.
+    """
+    try:
+        archive = zipfile.ZipFile(fileobj)
+    except zipfile.BadZipFile:
+        raise ValueError('The file is not a ZIP archive')
+
+    with archive:
+        _read_manifest(archive)
+
+        conn = get_connection()
+        cursor = conn.cursor()
+        try:
+            habit_ids, habit_count = _import_habits(conn, cursor, archive, user_id)
+
+            # Completions are keyed by habit uid in the change log
+            uids = {habit_id: uid for habit_id, uid in habit_ids.values()}
+            logs = (
+                (habit_ids[record['habit_id']][0], record['completed_date'], record.get('mood'),
+                 record.get('note'), record.get('created_at'))
+                for record in _read_ndjson(archive, 'logs.ndjson')
+                if record.get('habit_id') in habit_ids and record.get('completed_date')
+            )
+            log_count = _insert_batches(
+                conn, cursor,
+                'INSERT INTO logs (habit_id, completed_date, mood, note, created_at) '
+                'VALUES (?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP)) '
+                'ON CONFLICT (habit_id, completed_date) DO NOTHING',
+                logs, batch_size, _log_row_key, _existing_logs,
+                lambda row: (user_id, 'log', log_key(uids[row[0]], row[1]))
+            )
+
+            entries = (
+                (user_id, record['entry_date'], *compress_content(str(record['content'])), record.get('tags'),
+                 record.get('created_at'), record.get('updated_at'))
+                for record in _read_ndjson(archive, 'journal_entries.ndjson')
+                if record.get('entry_date') and record.get('content') is not None
+            )
+            journal_count = _insert_batches(
+                conn, cursor,
+                'INSERT INTO journal_entries (user_id, entry_date, content, content_compressed, tags, created_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), COALESCE(?, CURRENT_TIMESTAMP)) '
+                'ON CONFLICT (user_id, entry_date) DO NOTHING',
+                entries, batch_size, _journal_row_key, _existing_journal_entries,
+                lambda row: (user_id, 'journal', str(row[1]))
+            )
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    # Imported rows bypass the per-write rollup and index hooks
+    if habit_count or log_count or journal_count:
+        rebuild_daily_summary(user_id)
+    if journal_count:
+        drop_journal_index(user_id)
+
+    counts = {'habits': habit_count, 'logs': log_count, 'journal_entries': journal_count}
+    print(f"📦 Imported archive into account {user_id}: {counts}")
+    return counts
@@ -0,0 +1,184 @@
+from database.db_helper import configure_pool, iter_query, use_user
+from config import BULK_EXPORT_DIR, BULK_EXPORT_PROCESSES, BULK_EXPORT_TTL_HOURS, BULK_EXPORT_STALE_HOURS
+from datetime import datetime, timedelta
+import json
+import multiprocessing
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+import zipfile
+
+# ============================================
+# WORKER PROCESSES
+# ============================================
+
+def _init_worker():
+    """Runs once in each worker process"""
+    # One persistent connection per process instead of one per query
+    configure_pool(1)
+    # generate_report_data is chatty - keep worker output out of the server log
+    sys.stdout = open(os.devnull, 'w')
+
+def _render_report(task):
+    """Build one user's text report (runs in a worker process)"""
+    from controllers.report_controller import generate_report_data, format_report_as_text
+
+    user_id, email, start_date, end_date = task
+    with use_user(user_id):
+        report_data = generate_report_data(user_id, start_date, end_date)
+    return user_id, email, format_report_as_text(report_data)
+
+def _report_filename(user_id, email):
+    safe_email = re.sub(r'[^A-Za-z0-9._-]+', '_', email or 'unknown')
+    return f"{user_id}_{safe_email}.txt"
+
+# ============================================
+# EXPORT
+# ============================================
+
+def get_export_users(user_ids=None):
+    """Get (id, email) for the users to export - everyone when user_ids is None"""
+    wanted = set(user_ids) if user_ids is not None else None
+    return [
+        (row[0], row[1]) for row in iter_query('SELECT id, email FROM users ORDER BY id', main=True)
+        if wanted is None or row[0] in wanted
+    ]
+
+def export_reports_zip(users, output_path, start_date, end_date, processes=None, progress_callback=None):
+    """Generate reports for (user_id, email) pairs on a process pool and stream them into a ZIP
+
+    Reports are written to the archive as soon as each one finishes, so memory
+    use does not grow with the number of users. progress_callback(done, total)
+    is called after every report.
+    """
+    processes = processes or BULK_EXPORT_PROCESSES or os.cpu_count() or 1
+    tasks = [(user_id, email, start_date, end_date) for user_id, email in users]
+    total = len(tasks)
+    started = time.perf_counter()
+
+    # spawn: forking a threaded web worker is not safe
+    context = multiprocessing.get_context('spawn')
+    partial_path = output_path + '.partial'
+    with zipfile.ZipFile(partial_path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        with context.Pool(processes=processes, initializer=_init_worker) as pool:
+            chunksize = max(1, min(32, total // (processes * 4) or 1))
+            for done, (user_id, email, report_text) in enumerate(pool.imap_unordered(_render_report, tasks, chunksize), 1):
+                archive.writestr(_report_filename(user_id, email), report_text)
+                if progress_callback:
+                    progress_callback(done, total)
+    os.replace(partial_path, output_path)
+
+    seconds = time.perf_counter() - started
+    return {
+        'reports': total,
+        'processes': processes,
+        'seconds': round(seconds, 2),
+        'reports_per_second': round(total / seconds, 1) if seconds else 0
+    }
+
+# ============================================
+# BACKGROUND EXPORTS (admin panel)
+# ============================================
+# Status lives in a JSON file next to the archive so any web worker can report it.
+
+def _export_paths(export_id):
+    if not re.fullmatch(r'[0-9a-f]{32}', export_id or ''):
+        raise ValueError('Invalid export id')
+    base = os.path.join(BULK_EXPORT_DIR, export_id)
+    return base + '.zip', base + '.json'
+
+def _write_status(export_id, status):
+    _, status_path = _export_paths(export_id)
+    temp_path = status_path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(status, f)
+    os.replace(temp_path, status_path)
+
+def get_bulk_export_status(export_id):
+    """Return the status dict of an export (None if unknown)"""
+    try:
+        _, status_path = _export_paths(export_id)
+        with open(status_path, encoding='utf-8') as f:
+            return json.load(f)
+    except (ValueError, OSError):
+        return None
+
+def get_bulk_export_path(export_id):
+    """Path of a finished export archive (None if not ready)"""
+    status = get_bulk_export_status(export_id)
+    if not status or status['status'] != 'done':
+        return None
+    zip_path, _ = _export_paths(export_id)
+    return zip_path if os.path.exists(zip_path) else None
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def _cleanup_exports():
+    """Delete expired archives and fail exports whose thread died (e.g. with its worker)"""
+    now = datetime.now()
+    stale_before = now - timedelta(hours=BULK_EXPORT_STALE_HOURS)
+    for name in os.listdir(BULK_EXPORT_DIR):
+        export_id, extension = os.path.splitext(name)
+        if extension != '.json':
+            continue
+        status = get_bulk_export_status(export_id)
+        if status is None:
+            continue
+        zip_path, status_path = _export_paths(export_id)
+        if status['status'] == 'running':
+            if datetime.fromisoformat(status['started_at']) < stale_before:
+                _remove_quietly(zip_path + '.partial')
+                status.update(status='failed', error='Export timed out', finished_at=now.isoformat(timespec='seconds'))
+                _write_status(export_id, status)
+        elif datetime.fromisoformat(status['finished_at']) < now - timedelta(hours=BULK_EXPORT_TTL_HOURS):
+            _remove_quietly(zip_path)
+            _remove_quietly(status_path)
+
+def start_bulk_export(days=30, user_ids=None, processes=None):
+    """Start a bulk export in a background thread and return its id"""
+    os.makedirs(BULK_EXPORT_DIR, exist_ok=True)
+    _cleanup_exports()
+    export_id = uuid.uuid4().hex
+    end_date = datetime.now().date()
+    start_date = end_date - timedelta(days=days)
+    users = get_export_users(user_ids)
+
+    status = {
+        'id': export_id,
+        'status': 'running',
+        'done': 0,
+        'total': len(users),
+        'period': f"{start_date} to {end_date}",
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'filename': f"habit_recoder_reports_{end_date}.zip"
+    }
+    _write_status(export_id, status)
+
+    def report_progress(done, total):
+        # Rewriting the status file for every report would dominate small exports
+        if done == total or done % max(1, total // 100) == 0:
+            status['done'] = done
+            _write_status(export_id, status)
+
+    def run():
+        zip_path, _ = _export_paths(export_id)
+        try:
+            result = export_reports_zip(users, zip_path, start_date, end_date, processes, report_progress)
+            status.update(result)
+            status['status'] = 'done'
+        except Exception as e:
+            print(f"❌ Bulk export {export_id} failed: {e}")
+            status['status'] = 'failed'
+            status['error'] = str(e)
+        status['finished_at'] = datetime.now().isoformat(timespec='seconds')
+        _write_status(export_id, status)
+
+    threading.Thread(target=run, name=f"bulk-export-{export_id[:8]}", daemon=True).start()
+    return export_id
@@ -1,6 +1,12 @@
-from database.db_helper import get_connection
+from database.db_helper import get_connection, get_read_connection, shard_indexes, use_shard
+from database.daily_summary import record_completion, record_habit_created, record_habit_deleted
+from database.change_log import new_uid, record_habit_change, record_log_change
+from database import write_behind
+from database.log_partitions import cold_logs, cold_log_count
 from models.habit import Habit
+from models.schedule import Schedule, compile_frequency
 from models.log import Log
+from config import HABIT_DETAIL_LOG_LIMIT, LOGS_HOT_WINDOW_DAYS
 from datetime import datetime, timedelta
 import sqlite3
 
@@ -9,11 +15,14 @@ def create_habit(user_id, name, frequency, target_time=None, icon=None, motivati
     conn = get_connection()
     cursor = conn.cursor()
     cursor.execute(
-        'INSERT INTO habits (user_id, name, frequency, target_time, icon, motivation, challenges, ai_notes) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
-        (user_id, name, frequency, target_time, icon, motivation, challenges, ai_notes)
+        'INSERT INTO habits (user_id, name, frequency, target_time, icon, motivation, challenges, ai_notes, uid, schedule) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        (user_id, name, frequency, target_time, icon, motivation, challenges, ai_notes, new_uid(), compile_frequency(frequency))
     )
-    conn.commit()
     habit_id = cursor.lastrowid
+    record_habit_created(cursor, user_id)
+    record_habit_change(cursor, habit_id)
+    conn.commit()
     conn.close()
     return habit_id
 
@@ -22,15 +31,16 @@ def update_habit(habit_id, name, frequency, target_time=None, icon=None, motivat
     conn = get_connection()
     cursor = conn.cursor()
     cursor.execute(
-        'UPDATE habits SET name=?, frequency=?, target_time=?, icon=?, motivation=?, challenges=?, ai_notes=? WHERE id=?',
-        (name, frequency, target_time, icon, motivation, challenges, ai_notes, habit_id)
+        'UPDATE habits SET name=?, frequency=?, target_time=?, icon=?, motivation=?, challenges=?, ai_notes=?, schedule=? WHERE id=?',
+        (name, frequency, target_time, icon, motivation, challenges, ai_notes, compile_frequency(frequency), habit_id)
     )
+    record_habit_change(cursor, habit_id)
     conn.commit()
     conn.close()
 
 def get_all_habits(user_id):
     """Get all habits for a specific user"""
-    conn = get_connection()
+    conn = get_read_connection()
     cursor = conn.cursor()
     cursor.execute('SELECT * FROM habits WHERE user_id = ? ORDER BY created_at DESC', (user_id,))
     rows = cursor.fetchall()
@@ -47,14 +57,15 @@ def get_all_habits(user_id):
             motivation=row['motivation'],
             challenges=row['challenges'],
             ai_notes=row['ai_notes'],
-            created_at=row['created_at']
+            created_at=row['created_at'],
+            schedule=row['schedule']
         )
         habits.append(habit)
     return habits
 
 def get_habit_by_id(habit_id):
     """Get a specific habit by ID"""
-    conn = get_connection()
+    conn = get_read_connection()
     cursor = conn.cursor()
     cursor.execute('SELECT * FROM habits WHERE id = ?', (habit_id,))
     row = cursor.fetchone()
@@ -70,14 +81,19 @@ def get_habit_by_id(habit_id):
             motivation=row['motivation'],
             challenges=row['challenges'],
             ai_notes=row['ai_notes'],
-            created_at=row['created_at']
+            created_at=row['created_at'],
+            schedule=row['schedule']
         )
     return None
 
 def delete_habit(habit_id):
     """Delete a habit"""
+    # Queued completions for it would otherwise fail on the foreign key
+    write_behind.flush()
     conn = get_connection()
     cursor = conn.cursor()
+    record_habit_deleted(cursor, habit_id)
+    record_habit_change(cursor, habit_id, op='delete')
     cursor.execute('DELETE FROM habits WHERE id = ?', (habit_id,))
     conn.commit()
     conn.close()
@@ -85,6 +101,12 @@ def delete_habit(habit_id):
 def mark_habit_complete(habit_id, mood=None, note=None):
     """Mark habit as complete for today"""
     today = datetime.now().date()
+    if write_behind.is_enabled():
+        # A cheap read first - an already completed day never joins the queue
+        if is_completed_today(habit_id):
+            return False
+        return write_behind.enqueue_completion(habit_id, today, mood, note)
+    
     conn = get_connection()
     cursor = conn.cursor()
     
@@ -93,6 +115,8 @@ def mark_habit_complete(habit_id, mood=None, note=None):
             'INSERT INTO logs (habit_id, completed_date, mood, note) VALUES (?, ?, ?, ?)',
             (habit_id, today, mood, note)
         )
+        record_completion(cursor, habit_id, today, mood)
+        record_log_change(cursor, habit_id, today)
         conn.commit()
         conn.close()
         return True
@@ -100,15 +124,29 @@ def mark_habit_complete(habit_id, mood=None, note=None):
         conn.close()
         return False
 
-def get_habit_logs(habit_id):
-    """Get all completion logs for a habit"""
-    conn = get_connection()
+def get_habit_logs(habit_id, start_date=None, end_date=None):
+    """Get a habit's completion logs, newest first - all of them or those in a date range
+    
+    A range keeps the query on the partitions that cover it (PostgreSQL
+    with LOGS_PARTITIONING); archived completions are included either way.
+    """
+    conditions = ['habit_id = ?']
+    params = [habit_id]
+    if start_date is not None:
+        conditions.append('completed_date >= ?')
+        params.append(start_date)
+    if end_date is not None:
+        conditions.append('completed_date <= ?')
+        params.append(end_date)
+    
+    conn = get_read_connection()
     cursor = conn.cursor()
     cursor.execute(
-        'SELECT * FROM logs WHERE habit_id = ? ORDER BY completed_date DESC',
-        (habit_id,)
+        f"SELECT * FROM logs WHERE {' AND '.join(conditions)} ORDER BY completed_date DESC",
+        params
     )
     rows = cursor.fetchall()
+    archived = cold_logs(cursor, habit_id, start_date, end_date)
     conn.close()
     
     logs = []
@@ -121,40 +159,83 @@ def get_habit_logs(habit_id):
             note=row['note']
         )
         logs.append(log)
+    live_days = {str(log.completed_date)[:10] for log in logs}
+    for record in reversed(archived):
+        # A late completion for an archived day stays in logs until the next archive pass
+        if str(record['completed_date'])[:10] in live_days:
+            continue
+        logs.append(Log(
+            id=None,
+            habit_id=habit_id,
+            completed_date=record['completed_date'],
+            mood=record['mood'],
+            note=record['note']
+        ))
     return logs
 
-def get_habit_streak(habit_id):
-    """Calculate current streak for a habit"""
-    conn = get_connection()
-    cursor = conn.cursor()
+def _to_date(value):
+    """Dates come back as strings from SQLite and as date/datetime from PostgreSQL"""
+    if isinstance(value, datetime):
+        return value.date()
+    if hasattr(value, 'year'):
+        return value
+    return datetime.strptime(str(value)[:10], '%Y-%m-%d').date()
+
+def _count_streak(cursor, habit_id, today, pending_dates=(), schedule=None):
+    """Count the current streak back from today - consecutive due days, or weeks for weekly targets
+    
+    Reads the last LOGS_HOT_WINDOW_DAYS first (the recent partitions on
+    PostgreSQL) and only reads the whole history, archived part included,
+    for a streak that runs past that window. pending_dates are completions
+    still waiting in the write-behind queue.
+    """
+    schedule = schedule or Schedule()
+    window_start = today - timedelta(days=LOGS_HOT_WINDOW_DAYS)
     cursor.execute(
-        'SELECT completed_date FROM logs WHERE habit_id = ? ORDER BY completed_date DESC',
-        (habit_id,)
+        'SELECT completed_date FROM logs WHERE habit_id = ? AND completed_date >= ?',
+        (habit_id, window_start)
     )
-    rows = cursor.fetchall()
-    conn.close()
-    
-    if not rows:
-        return 0
-    
-    streak = 0
-    today = datetime.now().date()
-    expected_date = today
-    
-    for row in rows:
-        log_date = datetime.strptime(row['completed_date'], '%Y-%m-%d').date()
-        if log_date == expected_date:
-            streak += 1
-            expected_date -= timedelta(days=1)
-        else:
-            break
+    dates = {_to_date(row[0]) for row in cursor.fetchall()} | set(pending_dates)
+    streak, stop = schedule.streak(sorted(dates, reverse=True), today)
+    if stop is None or stop >= window_start:
+        return streak
     
+    cursor.execute('SELECT completed_date FROM logs WHERE habit_id = ?', (habit_id,))
+    dates.update(_to_date(row[0]) for row in cursor.fetchall())
+    dates.update(_to_date(record['completed_date']) for record in cold_logs(cursor, habit_id))
+    streak, _ = schedule.streak(sorted(dates, reverse=True), today)
+    return streak
+
+def _load_schedule(cursor, habit_id):
+    cursor.execute('SELECT id, name, frequency, created_at, schedule FROM habits WHERE id = ?', (habit_id,))
+    row = cursor.fetchone()
+    if not row:
+        return Schedule()
+    return Habit(
+        id=row['id'],
+        name=row['name'],
+        frequency=row['frequency'],
+        created_at=row['created_at'],
+        schedule=row['schedule']
+    ).get_schedule()
+
+def get_habit_streak(habit_id, schedule=None):
+    """Calculate current streak for a habit (pass habit.get_schedule() to save a query)"""
+    conn = get_read_connection()
+    cursor = conn.cursor()
+    if schedule is None:
+        schedule = _load_schedule(cursor, habit_id)
+    streak = _count_streak(cursor, habit_id, datetime.now().date(), write_behind.pending(habit_id), schedule)
+    conn.close()
     return streak
 
 def is_completed_today(habit_id):
     """Check if habit is completed today"""
     today = datetime.now().date()
-    conn = get_connection()
+    if today in write_behind.pending(habit_id):
+        return True
+    
+    conn = get_read_connection()
     cursor = conn.cursor()
     cursor.execute(
         'SELECT * FROM logs WHERE habit_id = ? AND completed_date = ?',
@@ -164,24 +245,109 @@ def is_completed_today(habit_id):
     conn.close()
     return row is not None
 
+def get_habit_detail(habit_id, log_limit=HABIT_DETAIL_LOG_LIMIT):
+    """Get a habit, its most recent logs and its stats using one connection
+    
+    Returns None if the habit does not exist, otherwise a dict with
+    habit, logs (newest first, at most log_limit), total_logs, stats and streak.
+    """
+    # Full history below - write any queued completions first
+    write_behind.flush()
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute('SELECT * FROM habits WHERE id = ?', (habit_id,))
+    row = cursor.fetchone()
+    if not row:
+        conn.close()
+        return None
+    
+    habit = Habit(
+        id=row['id'],
+        name=row['name'],
+        frequency=row['frequency'],
+        target_time=row['target_time'],
+        icon=row['icon'],
+        motivation=row['motivation'],
+        challenges=row['challenges'],
+        ai_notes=row['ai_notes'],
+        created_at=row['created_at'],
+        schedule=row['schedule']
+    )
+    
+    cursor.execute('SELECT COUNT(*) FROM logs WHERE habit_id = ?', (habit_id,))
+    total_completions = cursor.fetchone()[0] + cold_log_count(cursor, habit_id)
+    
+    logs = []
+    if log_limit and total_completions:
+        cursor.execute(
+            'SELECT * FROM logs WHERE habit_id = ? ORDER BY completed_date DESC LIMIT ?',
+            (habit_id, log_limit)
+        )
+        for log_row in cursor.fetchall():
+            logs.append(Log(
+                id=log_row['id'],
+                habit_id=log_row['habit_id'],
+                completed_date=log_row['completed_date'],
+                mood=log_row['mood'],
+                note=log_row['note']
+            ))
+    
+    today = datetime.now().date()
+    schedule = habit.get_schedule()
+    streak = _count_streak(cursor, habit_id, today, schedule=schedule) if total_completions else 0
+    conn.close()
+    
+    completion_rate = 0
+    if total_completions:
+        expected = schedule.expected_between(_to_date(habit.created_at), today)
+        completion_rate = min(total_completions / expected * 100, 100) if expected > 0 else 0
+    
+    return {
+        'habit': habit,
+        'logs': logs,
+        'total_logs': total_completions,
+        'stats': {
+            'total_completions': total_completions,
+            'completion_rate': round(completion_rate, 1),
+            'current_streak': streak
+        },
+        'streak': streak
+    }
+
 def get_completion_stats(habit_id):
     """Get completion statistics for a habit"""
-    logs = get_habit_logs(habit_id)
-    total_completions = len(logs)
-    
-    if total_completions == 0:
+    detail = get_habit_detail(habit_id, log_limit=0)
+    if not detail:
         return {
             'total_completions': 0,
             'completion_rate': 0,
             'current_streak': 0
         }
-    
-    habit = get_habit_by_id(habit_id)
-    days_since_creation = (datetime.now().date() - datetime.strptime(habit.created_at, '%Y-%m-%d %H:%M:%S').date()).days + 1
-    completion_rate = (total_completions / days_since_creation) * 100 if days_since_creation > 0 else 0
-    
-    return {
-        'total_completions': total_completions,
-        'completion_rate': round(completion_rate, 1),
-        'current_streak': get_habit_streak(habit_id)
-    }
\ No newline at end of file
+    return detail['stats']
+
+def compile_habit_schedules(recompile=False):
+    """Fill in habits.schedule for habits saved before schedules existed; returns habits updated
+
+    recompile=True compiles every habit again and updates those whose
+    schedule changed (after a fix to compile_frequency).
+    """
+    updated = 0
+    for shard in shard_indexes():
+        with use_shard(shard):
+            conn = get_connection()
+            cursor = conn.cursor()
+            if recompile:
+                cursor.execute('SELECT id, frequency, schedule FROM habits')
+            else:
+                cursor.execute('SELECT id, frequency, schedule FROM habits WHERE schedule IS NULL')
+            updates = [
+                (compile_frequency(frequency), habit_id)
+                for habit_id, frequency, schedule in cursor.fetchall()
+                if schedule is None or compile_frequency(frequency) != schedule
+            ]
+            cursor.executemany('UPDATE habits SET schedule = ? WHERE id = ?', updates)
+            conn.commit()
+            conn.close()
+            updated += len(updates)
+    return updated
@@ -0,0 +1,78 @@
+"""
+Liveness and readiness checks for the load balancer and monitoring
+
+Liveness only says the process answers. Readiness probes what a request
+needs: the database answers, its schema is the one this code expects, and
+the connection pool has room. Probe results are reused for
+READY_CACHE_SECONDS, so any number of pollers cost one probe per interval
+per process.
+"""
+
+from database.db_helper import (
+    ensure_schema, get_main_connection, get_pool_stats, get_replica_status, get_schema_version, SCHEMA_VERSION
+)
+from config import READY_CACHE_SECONDS, READY_POOL_SATURATION
+import os
+import threading
+import time
+
+_started = time.monotonic()
+_lock = threading.Lock()
+_cached = None  # (monotonic time, result)
+
+def _ms(seconds):
+    return round(seconds * 1000, 2)
+
+def check_liveness():
+    return {'status': 'ok', 'pid': os.getpid(), 'uptime_s': round(time.monotonic() - _started)}
+
+def _probe():
+    checks = {}
+
+    stats = get_pool_stats()
+    if stats is None:
+        checks['pool'] = {'ok': True, 'enabled': False}
+    else:
+        checks['pool'] = {'ok': stats['saturation'] < READY_POOL_SATURATION, 'enabled': True, **stats}
+
+    if not checks['pool']['ok']:
+        # Waiting for a connection here would only add to the queue
+        checks['database'] = {'ok': False, 'error': 'skipped - connection pool saturated'}
+        return checks
+
+    started = time.perf_counter()
+    try:
+        ensure_schema()
+        conn = get_main_connection()
+        try:
+            version = get_schema_version(conn)
+        finally:
+            conn.close()
+    except Exception as e:
+        checks['database'] = {'ok': False, 'latency_ms': _ms(time.perf_counter() - started), 'error': str(e)}
+        return checks
+
+    checks['database'] = {'ok': True, 'latency_ms': _ms(time.perf_counter() - started)}
+    checks['schema'] = {'ok': version >= SCHEMA_VERSION, 'version': version, 'expected': SCHEMA_VERSION}
+    replica = get_replica_status()
+    if replica is not None:
+        # Informational - reads fall back to the primary while the replica is down
+        checks['replica'] = {'ok': True, **replica}
+    return checks
+
+def check_readiness():
+    """(ready, result) - result is the JSON body, with how long the probe took and how old it is"""
+    global _cached
+    with _lock:
+        now = time.monotonic()
+        if _cached is None or now - _cached[0] >= READY_CACHE_SECONDS:
+            started = time.perf_counter()
+            checks = _probe()
+            result = {
+                'status': 'ok' if all(check['ok'] for check in checks.values()) else 'unavailable',
+                'checks': checks,
+                'probe_ms': _ms(time.perf_counter() - started)
+            }
+            _cached = (now, result)
+        checked_at, result = _cached
+    return result['status'] == 'ok', dict(result, age_s=round(now - checked_at, 2))
@@ -0,0 +1,135 @@
+from database.db_helper import get_connection
+from database.daily_summary import get_data_version
+from database.log_partitions import archived_before, cold_logs
+from models.schedule import Schedule
+from config import HEATMAP_CACHE_SIZE
+from collections import Counter
+from datetime import date
+from functools import lru_cache
+import json
+import zlib
+
+def _year_range(year):
+    """First and last day of a year - 1 to 9999 only (datetime.date), which the routes enforce"""
+    return date(year, 1, 1), date(year, 12, 31)
+
+def _day(value):
+    """Dates come back as strings from SQLite and as date/datetime from PostgreSQL"""
+    return date.fromisoformat(str(value)[:10])
+
+def _level(completed, due):
+    """Bucket a day's completion ratio into 0-4 (GitHub-style intensity)"""
+    if completed <= 0:
+        return 0
+    ratio = completed / due if due > 0 else 1
+    if ratio >= 1:
+        return 4
+    if ratio >= 0.66:
+        return 3
+    if ratio >= 0.33:
+        return 2
+    return 1
+
+def get_habit_owner(habit_id):
+    """Return the user_id that owns a habit (None if it does not exist)"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT user_id FROM habits WHERE id = ?', (habit_id,))
+    row = cursor.fetchone()
+    conn.close()
+    return row[0] if row else None
+
+def _habit_schedules(user_id):
+    """(habit id, created date, compiled schedule) for each of a user's habits"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT id, created_at, schedule FROM habits WHERE user_id = ? ORDER BY id', (user_id,))
+    schedules = tuple((row[0], str(row[1])[:10], row[2] or 'daily') for row in cursor.fetchall())
+    conn.close()
+    return schedules
+
+def _completion_days(cursor, habit_ids, start_date, end_date):
+    """(habit id, day) of every completion in a range, archived ones included"""
+    if not habit_ids:
+        return []
+    # One range read over the (habit_id, completed_date) unique index
+    cursor.execute(
+        f"SELECT habit_id, completed_date FROM logs WHERE habit_id IN ({', '.join('?' * len(habit_ids))}) "
+        'AND completed_date BETWEEN ? AND ?',
+        (*habit_ids, start_date, end_date)
+    )
+    completions = [(row[0], _day(row[1])) for row in cursor.fetchall()]
+    cutoff = archived_before(cursor)
+    if cutoff is not None and start_date < _day(cutoff):
+        for habit_id in habit_ids:
+            completions += [(habit_id, _day(record['completed_date']))
+                            for record in cold_logs(cursor, habit_id, start_date, end_date)]
+    return completions
+
+def _due_counter(schedules, cursor, start_date, end_date):
+    """due(day) -> how many habits were due that day, by their schedules
+
+    A weekly target is not due on any particular day, so a weekly habit only
+    counts on the days it was done.
+    """
+    scheduled = []
+    weekly_ids = []
+    for habit_id, created, schedule in schedules:
+        parsed = Schedule.parse(schedule, _day(created))
+        if parsed.kind == 'weekly':
+            weekly_ids.append(habit_id)
+        else:
+            scheduled.append((parsed, _day(created)))
+    weekly_done = Counter(day for _, day in set(_completion_days(cursor, weekly_ids, start_date, end_date)))
+
+    def due(day):
+        return sum(1 for schedule, created in scheduled if created <= day and schedule.is_due(day)) + weekly_done[day]
+    return due
+
+@lru_cache(maxsize=HEATMAP_CACHE_SIZE)
+def _build_heatmap_json(user_id, year, habit_id, data_version, schedules):
+    """Build the serialized heatmap - cached per (user, year, habit, data version, schedules)"""
+    start_date, end_date = _year_range(year)
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    if habit_id is None:
+        # One indexed range read over the daily rollup; its habits_due counts
+        # every habit, so how many were due comes from their schedules instead
+        cursor.execute(
+            '''
+            SELECT summary_date, habits_completed FROM user_daily_summary
+            WHERE user_id = ? AND summary_date BETWEEN ? AND ? AND habits_completed > 0
+            ORDER BY summary_date
+            ''',
+            (user_id, start_date, end_date)
+        )
+        rows = cursor.fetchall()
+        due = _due_counter(schedules, cursor, start_date, end_date)
+        days = []
+        for day, completed in rows:
+            # Done on a day it was not due still counts as done
+            day_due = max(due(_day(day)), completed)
+            days.append([str(day)[:10], completed, day_due, _level(completed, day_due)])
+    else:
+        completed_days = sorted({day for _, day in _completion_days(cursor, [habit_id], start_date, end_date)})
+        days = [[str(day), 1, 1, 4] for day in completed_days]
+    conn.close()
+
+    return json.dumps({
+        'year': year,
+        'habit_id': habit_id,
+        'fields': ['date', 'completed', 'due', 'level'],
+        'days': days,
+        'active_days': len(days)
+    })
+
+def get_heatmap(user_id, year, habit_id=None):
+    """Return (etag, json_text) for a year of daily completion intensity"""
+    start_date, end_date = _year_range(year)
+    data_version = get_data_version(user_id, start_date, end_date)
+    # Editing a habit's frequency changes what was due without touching the rollup
+    schedules = _habit_schedules(user_id) if habit_id is None else ()
+    schedule_version = zlib.crc32(repr(schedules).encode('utf-8'))
+    etag = f"heatmap-{user_id}-{year}-{habit_id or 0}-{data_version}-{schedule_version:x}"
+    return etag, _build_heatmap_json(user_id, year, habit_id, data_version, schedules)
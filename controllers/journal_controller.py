@@ -1,112 +1,176 @@
-from database.db_helper import get_connection
-from models.journal import JournalEntry
+from database.db_helper import get_connection, get_read_connection, shard_indexes, use_shard
+from database.daily_summary import record_journal
+from database.change_log import record_journal_change
+from database.tag_index import write_versions, apply_tag_changes, complete_tags, list_tags
+from database.journal_index import (
+    index_journal_entry, unindex_journal_entry, drop_journal_index, related_entry_dates
+)
+from models.journal import JournalEntry, compress_content
+from config import JOURNAL_COMPRESS_THRESHOLD, JOURNAL_RELATED_LIMIT, TAG_AUTOCOMPLETE_LIMIT
 from datetime import datetime
 import sqlite3
 
+def _update_index(update, user_id, *args):
+    """Keep the related-entries index in step - a failure only costs a rebuild later"""
+    try:
+        update(user_id, *args)
+    except Exception as e:
+        print(f"⚠️ Journal index update failed ({e}), it will be rebuilt")
+        drop_journal_index(user_id)
+
 def create_or_update_journal_entry(user_id, entry_date, content, tags=None):
     """Create or update a journal entry for a specific user"""
+    stored_content, content_compressed = compress_content(content)
     conn = get_connection()
     cursor = conn.cursor()
+    cursor.execute('SELECT tags FROM journal_entries WHERE user_id = ? AND entry_date = ?', (user_id, entry_date))
+    existing = cursor.fetchone()
     
     try:
         cursor.execute(
-            'INSERT INTO journal_entries (user_id, entry_date, content, tags) VALUES (?, ?, ?, ?)',
-            (user_id, entry_date, content, tags)
+            'INSERT INTO journal_entries (user_id, entry_date, content, content_compressed, tags) VALUES (?, ?, ?, ?, ?)',
+            (user_id, entry_date, stored_content, content_compressed, tags)
         )
     except sqlite3.IntegrityError:
         # Entry exists, update it
         cursor.execute(
-            'UPDATE journal_entries SET content=?, tags=?, updated_at=? WHERE user_id=? AND entry_date=?',
-            (content, tags, datetime.now(), user_id, entry_date)
+            'UPDATE journal_entries SET content=?, content_compressed=?, tags=?, updated_at=? WHERE user_id=? AND entry_date=?',
+            (stored_content, content_compressed, tags, datetime.now(), user_id, entry_date)
         )
     
+    record_journal(cursor, user_id, entry_date, written=True)
+    record_journal_change(cursor, user_id, entry_date)
+    versions = write_versions(cursor, user_id)
     conn.commit()
     conn.close()
+    apply_tag_changes(user_id, existing['tags'] if existing else None, tags, versions)
+    _update_index(index_journal_entry, user_id, entry_date, content)
 
 def get_journal_entry_by_date(user_id, entry_date):
     """Get journal entry for a specific date and user"""
-    conn = get_connection()
+    conn = get_read_connection()
     cursor = conn.cursor()
     cursor.execute('SELECT * FROM journal_entries WHERE user_id = ? AND entry_date = ?', (user_id, entry_date))
     row = cursor.fetchone()
     conn.close()
     
     if row:
-        return JournalEntry(
-            id=row['id'],
-            entry_date=row['entry_date'],
-            content=row['content'],
-            tags=row['tags'],
-            created_at=row['created_at'],
-            updated_at=row['updated_at']
-        )
+        return JournalEntry.from_row(row)
     return None
 
 def get_all_journal_entries(user_id):
     """Get all journal entries for a specific user"""
-    conn = get_connection()
+    conn = get_read_connection()
     cursor = conn.cursor()
     cursor.execute('SELECT * FROM journal_entries WHERE user_id = ? ORDER BY entry_date DESC', (user_id,))
     rows = cursor.fetchall()
     conn.close()
     
-    entries = []
-    for row in rows:
-        entry = JournalEntry(
-            id=row['id'],
-            entry_date=row['entry_date'],
-            content=row['content'],
-            tags=row['tags'],
-            created_at=row['created_at'],
-            updated_at=row['updated_at']
-        )
-        entries.append(entry)
-    return entries
+    return [JournalEntry.from_row(row) for row in rows]
 
 def search_journal_entries(user_id, search_term):
     """Search journal entries for a specific user"""
-    conn = get_connection()
+    conn = get_read_connection()
     cursor = conn.cursor()
     cursor.execute(
-        'SELECT * FROM journal_entries WHERE user_id = ? AND (content LIKE ? OR tags LIKE ?) ORDER BY entry_date DESC',
+        'SELECT * FROM journal_entries WHERE user_id = ? AND (content LIKE ? OR tags LIKE ? OR content_compressed IS NOT NULL) '
+        'ORDER BY entry_date DESC',
         (user_id, f'%{search_term}%', f'%{search_term}%')
     )
     rows = cursor.fetchall()
     conn.close()
     
+    # Compressed entries cannot be matched in SQL - check their text here
+    needle = search_term.lower()
     entries = []
     for row in rows:
-        entry = JournalEntry(
-            id=row['id'],
-            entry_date=row['entry_date'],
-            content=row['content'],
-            tags=row['tags'],
-            created_at=row['created_at'],
-            updated_at=row['updated_at']
-        )
+        entry = JournalEntry.from_row(row)
+        if row['content_compressed'] is not None and needle not in entry.content.lower() and needle not in (entry.tags or '').lower():
+            continue
         entries.append(entry)
     return entries
 
 def get_all_tags(user_id):
     """Get all unique tags for a specific user"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT DISTINCT tags FROM journal_entries WHERE user_id = ? AND tags IS NOT NULL', (user_id,))
-    rows = cursor.fetchall()
-    conn.close()
-    
-    all_tags = set()
-    for row in rows:
-        if row['tags']:
-            tags = [tag.strip() for tag in row['tags'].split(',')]
-            all_tags.update(tags)
-    
-    return sorted(list(all_tags))
+    return list_tags(user_id)
+
+def autocomplete_tags(user_id, prefix, limit=TAG_AUTOCOMPLETE_LIMIT):
+    """The user's tags starting with prefix, most used first, as [{'tag', 'count'}]"""
+    return [{'tag': tag, 'count': count} for tag, count in complete_tags(user_id, prefix.strip(), limit)]
 
 def delete_journal_entry(user_id, entry_date):
     """Delete a journal entry for a specific user"""
     conn = get_connection()
     cursor = conn.cursor()
+    cursor.execute('SELECT tags FROM journal_entries WHERE user_id = ? AND entry_date = ?', (user_id, entry_date))
+    existing = cursor.fetchone()
     cursor.execute('DELETE FROM journal_entries WHERE user_id = ? AND entry_date = ?', (user_id, entry_date))
+    deleted = cursor.rowcount
+    if deleted:
+        record_journal(cursor, user_id, entry_date, written=False)
+        record_journal_change(cursor, user_id, entry_date, op='delete')
+        versions = write_versions(cursor, user_id)
     conn.commit()
-    conn.close()
\ No newline at end of file
+    conn.close()
+    if deleted:
+        apply_tag_changes(user_id, existing['tags'] if existing else None, None, versions)
+        _update_index(unindex_journal_entry, user_id, entry_date)
+
+def get_related_journal_entries(user_id, entry_date, limit=JOURNAL_RELATED_LIMIT):
+    """Entries most similar to the one on entry_date, as [(JournalEntry, score)] best first"""
+    related = related_entry_dates(user_id, entry_date, limit)
+    if not related:
+        return []
+    
+    conn = get_connection()
+    cursor = conn.cursor()
+    placeholders = ', '.join('?' for _ in related)
+    cursor.execute(
+        f'SELECT * FROM journal_entries WHERE user_id = ? AND entry_date IN ({placeholders})',
+        (user_id, *[day for day, _ in related])
+    )
+    by_date = {str(row['entry_date'])[:10]: JournalEntry.from_row(row) for row in cursor.fetchall()}
+    conn.close()
+    
+    return [(by_date[day], score) for day, score in related if day in by_date]
+
+def compress_journal_entries(threshold=JOURNAL_COMPRESS_THRESHOLD, batch_size=500):
+    """Compress stored entries that are over the threshold (migration for existing rows)
+    
+    Safe to re-run - entries already compressed are skipped. Returns counts
+    and the stored content size before/after.
+    """
+    result = {'checked': 0, 'compressed': 0, 'bytes_before': 0, 'bytes_after': 0}
+    if not threshold:
+        return result
+    
+    for shard in shard_indexes():
+        with use_shard(shard):
+            conn = get_connection()
+            cursor = conn.cursor()
+            last_id = 0
+            while True:
+                # A character is at most 4 UTF-8 bytes, so shorter text can never qualify
+                cursor.execute(
+                    'SELECT id, content FROM journal_entries '
+                    'WHERE id > ? AND content_compressed IS NULL AND LENGTH(content) >= ? ORDER BY id LIMIT ?',
+                    (last_id, threshold // 4, batch_size)
+                )
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                
+                updates = []
+                for entry_id, content in rows:
+                    result['checked'] += 1
+                    stored_content, content_compressed = compress_content(content, threshold)
+                    if content_compressed is not None:
+                        updates.append((stored_content, content_compressed, entry_id))
+                        result['bytes_before'] += len(content.encode('utf-8'))
+                        result['bytes_after'] += len(content_compressed)
+                cursor.executemany('UPDATE journal_entries SET content = ?, content_compressed = ? WHERE id = ?', updates)
+                conn.commit()
+                result['compressed'] += len(updates)
+            conn.close()
+    return result
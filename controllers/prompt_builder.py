@@ -0,0 +1,261 @@
+"""
+Size-bounded AI prompt for reports
+
+The prompt at the end of a report is pasted into a chat assistant, so it has
+to fit that assistant's context window. PromptBuilder collects the prompt as
+sections and fits them into a token budget (AI_PROMPT_MAX_TOKENS):
+
+  - sections keep the order they were added in, but the budget goes to the
+    lowest priority number first; required sections are always kept
+  - a section that does not fit whole is shortened if it knows how (journal
+    entries keep their highest-scoring sentences), otherwise left out
+  - whatever was shortened or left out is listed at the end of the prompt
+
+Tokens are estimated, not counted: about 4 UTF-8 bytes per token, which is
+close enough for English text under the common tokenizers and costs no more
+than an encode().
+"""
+
+from config import AI_PROMPT_MAX_TOKENS
+from collections import Counter
+import re
+
+_SENTENCE = re.compile(r'[^.!?\n]+[.!?]*')
+_WORD = re.compile(r"[a-z][a-z']+")
+
+# Words that say nothing about what an entry is about
+_STOPWORDS = frozenset(
+    "a about after again all also am an and any are as at be because been before being but by can "
+    "could did do does doing don't for from had has have having he her here him his how i i'm i've "
+    "if in into is it it's its just me more most my myself no not now of off on once only or other "
+    "our out over really same she should so some still such than that the their them then there "
+    "these they this those through to too under until up very was we were what when where which "
+    "while who why will with would you your".split()
+)
+
+# Smallest useful slice of a shortened journal entry (date line + a sentence or two)
+_MIN_ENTRY_TOKENS = 64
+
+def estimate_tokens(text):
+    """Approximate token count of text (~4 UTF-8 bytes per token)"""
+    return (len(text.encode('utf-8')) + 3) // 4
+
+def _cost(lines):
+    # +1 per line for the newline it is joined with
+    return sum(estimate_tokens(line) + 1 for line in lines)
+
+def _normalize(text):
+    return ' '.join(text.lower().split())
+
+def _sentences(text):
+    return [sentence for sentence in (match.strip() for match in _SENTENCE.findall(text)) if sentence]
+
+def excerpt(text, max_tokens):
+    """The opening sentences of text within max_tokens, marked with … if cut"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    kept = []
+    for sentence in _sentences(text):
+        cost = estimate_tokens(sentence) + 1
+        if cost > max_tokens:
+            break
+        kept.append(sentence)
+        max_tokens -= cost
+    if not kept:
+        return text[:max_tokens * 4].rstrip() + '…'
+    return ' '.join(kept) + ' …'
+
+class PromptBuilder:
+    def __init__(self, max_tokens=AI_PROMPT_MAX_TOKENS):
+        self.max_tokens = max_tokens  # 0 = no limit
+        self._sections = []
+
+    def add(self, name, lines, priority, required=False):
+        """Add a section; lower priority numbers are kept first"""
+        if lines:
+            self._sections.append({
+                'name': name, 'lines': list(lines), 'priority': priority,
+                'required': required, 'shrink': None
+            })
+
+    def add_journal(self, name, entries, priority, heading=()):
+        """Add journal entries ({'date', 'content', 'tags'}) under heading lines, oldest first
+
+        Entries with the same text as an earlier one are written once; when
+        the section has to shrink, entries keep their best sentences and the
+        oldest entries go first.
+        """
+        if not entries:
+            return
+        entries = sorted(entries, key=lambda entry: entry['date'])
+        journal = _Journal(entries, list(heading))
+        self._sections.append({
+            'name': name, 'lines': journal.full_lines(), 'priority': priority,
+            'required': False, 'shrink': journal.shrink
+        })
+
+    def build(self):
+        """The prompt lines, within max_tokens where possible"""
+        costs = [_cost(section['lines']) for section in self._sections]
+        if not self.max_tokens or sum(costs) <= self.max_tokens:
+            return [line for section in self._sections for line in section['lines']]
+
+        # Required sections are paid for first; the omitted summary needs room too
+        remaining = self.max_tokens - sum(cost for section, cost in zip(self._sections, costs) if section['required'])
+        remaining -= _cost(self._omitted_lines(['x' * 60] * 3))
+
+        chosen = {}
+        notes = []
+        order = sorted(range(len(self._sections)), key=lambda index: self._sections[index]['priority'])
+        for index in order:
+            section = self._sections[index]
+            if section['required']:
+                chosen[index] = section['lines']
+            elif costs[index] <= remaining:
+                chosen[index] = section['lines']
+                remaining -= costs[index]
+            elif section['shrink'] and remaining > 0:
+                lines, note = section['shrink'](remaining)
+                if lines:
+                    chosen[index] = lines
+                    remaining -= _cost(lines)
+                notes.append(f"{section['name']}: {note}")
+            else:
+                notes.append(f"{section['name']}: left out (~{costs[index]} tokens)")
+
+        lines = [line for index in range(len(self._sections)) if index in chosen for line in chosen[index]]
+        return lines + self._omitted_lines(notes)
+
+    def _omitted_lines(self, notes):
+        if not notes:
+            return []
+        return (
+            [f"NOT INCLUDED (prompt limited to ~{self.max_tokens} tokens):"]
+            + [f"- {note}" for note in notes]
+            + ['']
+        )
+
+class _Journal:
+    """Journal section content: full text, or an extractive summary within a budget"""
+
+    def __init__(self, entries, heading):
+        self.entries = entries
+        self.heading = heading
+        # Date of the earlier entry with the same text, per entry (None if first)
+        first_date = {}
+        self.duplicate_of = []
+        for entry in entries:
+            first = first_date.setdefault(_normalize(entry['content']), entry['date'])
+            self.duplicate_of.append(first if first != entry['date'] else None)
+
+    def _header(self, entry):
+        return [f"Date: {entry['date']}"]
+
+    def _footer(self, entry):
+        lines = []
+        if entry.get('tags') and entry['tags'].strip():
+            lines.append(f"Tags: {entry['tags']}")
+        return lines + ['']
+
+    def full_lines(self):
+        lines = []
+        for entry, duplicate_of in zip(self.entries, self.duplicate_of):
+            content = f"(same as {duplicate_of})" if duplicate_of else entry['content']
+            lines += self._header(entry) + [f"Content: {content}"] + self._footer(entry)
+        return self.heading + lines + ['']
+
+    def shrink(self, budget):
+        """(lines, note) for the entries within budget tokens"""
+        entries = [entry for entry, duplicate_of in zip(self.entries, self.duplicate_of) if not duplicate_of]
+        duplicates = len(self.entries) - len(entries)
+
+        # Keep the most recent entries that can each get a useful slice
+        keep = max(0, min(len(entries), (budget - _cost(self.heading)) // _MIN_ENTRY_TOKENS))
+        dropped = len(entries) - keep
+        entries = entries[dropped:]
+
+        frequencies = Counter(
+            word for entry in entries for word in _WORD.findall(entry['content'].lower())
+            if word not in _STOPWORDS
+        )
+        seen_sentences = set()
+        shortened = 0
+        lines = []
+        for entry, share in zip(entries, self._shares(entries, budget - _cost(self.heading) - 1)):
+            fixed = self._header(entry) + self._footer(entry)
+            full = [f"Content: {entry['content']}"]
+            if _cost(fixed + full) <= share:
+                content = full
+            else:
+                # "Content: " and the "…" between picked sentences take a few tokens too
+                content = [f"Content: {self._summarize(entry['content'], share - _cost(fixed) - 4, frequencies, seen_sentences)}"]
+                shortened += 1
+            lines += self._header(entry) + content + self._footer(entry)
+
+        parts = []
+        if shortened:
+            parts.append(f"{shortened} entries shortened to their key sentences")
+        if dropped and not lines:
+            parts.append(f"all {dropped} entries left out")
+        elif dropped:
+            parts.append(f"{dropped} oldest entries left out")
+        if duplicates:
+            parts.append(f"{duplicates} repeated entries skipped")
+        return (self.heading + lines + [''] if lines else []), ', '.join(parts) or 'shortened'
+
+    def _shares(self, entries, budget):
+        """Split budget across entries: short entries take what they need, long ones share the rest"""
+        costs = [_cost(self._header(entry) + [f"Content: {entry['content']}"] + self._footer(entry)) for entry in entries]
+        shares = [0] * len(entries)
+        pending = sorted(range(len(entries)), key=lambda index: costs[index])
+        while pending:
+            fair = budget // len(pending)
+            index = pending[0]
+            if costs[index] > fair:
+                for index in pending:
+                    shares[index] = fair
+                break
+            shares[index] = costs[index]
+            budget -= costs[index]
+            pending.pop(0)
+        return shares
+
+    def _summarize(self, content, budget, frequencies, seen_sentences):
+        """The highest-scoring sentences of content that fit in budget, in their original order"""
+        sentences = _sentences(content)
+        scored = []
+        for position, sentence in enumerate(sentences):
+            key = sentence.lower()
+            if key in seen_sentences:
+                continue  # already picked for an earlier entry
+            words = [word for word in _WORD.findall(key) if word not in _STOPWORDS]
+            score = sum(frequencies[word] for word in words) / (len(words) ** 0.5 or 1)
+            if position == 0:
+                score *= 1.5  # openings tend to say what the entry is about
+            scored.append((score, position, sentence))
+
+        picked = []
+        for score, position, sentence in sorted(scored, reverse=True):
+            cost = estimate_tokens(sentence) + 1
+            if cost <= budget:
+                picked.append((position, sentence))
+                seen_sentences.add(sentence.lower())
+                budget -= cost
+        if not picked:
+            if not scored:
+                return '…'
+            # Not even one whole sentence fits: cut the best one
+            sentence = max(scored)[2]
+            return sentence[:max(budget, 1) * 4].rstrip() + '…'
+
+        picked.sort()
+        text = []
+        previous = -1
+        for position, sentence in picked:
+            if position != previous + 1:
+                text.append('…')
+            text.append(sentence)
+            previous = position
+        if previous != len(sentences) - 1:
+            text.append('…')
+        return ' '.join(text)
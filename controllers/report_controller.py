@@ -3,20 +3,151 @@ from controllers.habit_controller import (
     get_completion_stats, is_completed_today
 )
 from controllers.journal_controller import get_all_journal_entries, get_all_tags
-from datetime import datetime, timedelta
+from controllers.prompt_builder import PromptBuilder, excerpt
+from database.daily_summary import get_daily_summaries
+from database.db_helper import iter_query
+from database import write_behind
+from config import AI_PROMPT_MAX_TOKENS
+from datetime import date, datetime, timedelta
 from collections import Counter
 
+# Periods compared against the one before them (see _period_windows)
+DEFAULT_COMPARISON_PERIODS = ('week', 'month', 'quarter', 'ytd')
+
+# Length of each entry in the report's "recent journal entries" list
+RECENT_ENTRY_PREVIEW_TOKENS = 80
+
 def debug_check():
     """Temporary debug function to check if everything is working"""
     print("=== DEBUG: report_controller is loaded correctly ===")
     print(f"generate_report_data function: {generate_report_data}")
     print(f"format_report_as_text function: {format_report_as_text}")
 
-def generate_report_data(user_id, start_date=None, end_date=None):
-    """Generate robust report data for AI analysis - handles empty data gracefully"""
+def _to_date(value):
+    """Dates come back as strings from SQLite and as date/datetime from PostgreSQL"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], '%Y-%m-%d').date()
+
+def _quarter_start(day):
+    return date(day.year, 3 * ((day.month - 1) // 3) + 1, 1)
+
+def _shift_year(day, years):
+    try:
+        return day.replace(year=day.year + years)
+    except ValueError:
+        # 29 February in a non-leap year
+        return day.replace(year=day.year + years, day=28)
+
+def _period_windows(period, today):
+    """Return (label, (current_start, current_end), (previous_start, previous_end))"""
+    if period == 'week':
+        start = today - timedelta(days=today.weekday())
+        return 'This week vs last week', (start, today), (start - timedelta(days=7), start - timedelta(days=1))
+    if period == 'month':
+        start = today.replace(day=1)
+        previous_end = start - timedelta(days=1)
+        return 'This month vs last month', (start, today), (previous_end.replace(day=1), previous_end)
+    if period == 'quarter':
+        start = _quarter_start(today)
+        previous_end = start - timedelta(days=1)
+        return 'This quarter vs last quarter', (start, today), (_quarter_start(previous_end), previous_end)
+    if period == 'ytd':
+        start = date(today.year, 1, 1)
+        return 'Year to date vs same period last year', (start, today), (_shift_year(start, -1), _shift_year(today, -1))
+    raise ValueError(f"Unknown comparison period: {period}")
+
+def _expected_occurrences(habit, habit_created, window):
+    """Times a habit was due in a window, counting from the day it was created"""
+    start, end = window
+    return habit.get_schedule().expected_between(max(start, habit_created), end)
+
+def _rate(completions, expected):
+    # Capped: a weekly target can be met more often than it asks for
+    return min(round(completions / expected * 100, 1), 100) if expected else 0
+
+def _streak_text(habit):
+    return f"{habit['current_streak']} {habit.get('streak_unit', 'day')}s"
+
+def build_period_comparisons(user_id, habits, today=None, periods=DEFAULT_COMPARISON_PERIODS):
+    """Compare several periods with the ones before them from a single pass over the logs"""
+    if not habits or not periods:
+        return []
+    
+    today = today or datetime.now().date()
+    windows = [(period, *_period_windows(period, today)) for period in periods]
+    earliest = min(previous[0] for _, _, _, previous in windows)
+    
+    # counts[(window_index, 'current'|'previous')][habit_id]
+    counts = {}
+    for index in range(len(windows)):
+        counts[(index, 'current')] = Counter()
+        counts[(index, 'previous')] = Counter()
+    
+    # One date-bounded query for every period
+    rows = iter_query(
+        '''
+        SELECT l.habit_id, l.completed_date FROM logs l JOIN habits h ON h.id = l.habit_id
+        WHERE h.user_id = ? AND l.completed_date BETWEEN ? AND ?
+        ''',
+        (user_id, earliest, today),
+        replica=True
+    )
+    for habit_id, completed_date in rows:
+        completed_on = _to_date(completed_date)
+        for index, (_, _, current, previous) in enumerate(windows):
+            if current[0] <= completed_on <= current[1]:
+                counts[(index, 'current')][habit_id] += 1
+            elif previous[0] <= completed_on <= previous[1]:
+                counts[(index, 'previous')][habit_id] += 1
+    
+    created = {habit.id: _to_date(habit.created_at) for habit in habits}
+    comparisons = []
+    for index, (period, label, current, previous) in enumerate(windows):
+        totals = {'current': [0, 0], 'previous': [0, 0]}
+        habit_rows = []
+        for habit in habits:
+            rates = {}
+            for side, window in (('current', current), ('previous', previous)):
+                completions = counts[(index, side)][habit.id]
+                expected = _expected_occurrences(habit, created[habit.id], window)
+                totals[side][0] += completions
+                totals[side][1] += expected
+                rates[side] = _rate(completions, expected) if expected else None
+            habit_rows.append({
+                'name': getattr(habit, 'name', 'Unnamed Habit'),
+                'icon': getattr(habit, 'icon', '') or '',
+                'current_rate': rates['current'],
+                'previous_rate': rates['previous'],
+                'delta': round(rates['current'] - rates['previous'], 1) if rates['current'] is not None and rates['previous'] is not None else None
+            })
+        
+        current_rate = _rate(*totals['current'])
+        previous_rate = _rate(*totals['previous'])
+        comparisons.append({
+            'period': period,
+            'label': label,
+            'current': {'start': str(current[0]), 'end': str(current[1]), 'completions': totals['current'][0], 'rate': current_rate},
+            'previous': {'start': str(previous[0]), 'end': str(previous[1]), 'completions': totals['previous'][0], 'rate': previous_rate},
+            'delta': round(current_rate - previous_rate, 1) if totals['previous'][1] else None,
+            'habits': habit_rows
+        })
+    
+    return comparisons
+
+def generate_report_data(user_id, start_date=None, end_date=None, progress_callback=None,
+                         compare_periods=DEFAULT_COMPARISON_PERIODS):
+    """Generate robust report data for AI analysis - handles empty data gracefully
+
+    progress_callback(done, total) is called after each habit is processed.
+    compare_periods selects the period-over-period comparisons (empty to skip).
+    """
     
     try:
         print(f"DEBUG: Starting report generation for user {user_id}")
+        write_behind.flush()
         
         if not end_date:
             end_date = datetime.now().date()
@@ -42,7 +173,8 @@ def generate_report_data(user_id, start_date=None, end_date=None):
             'patterns': {},
             'mood_analysis': {},
             'journal_insights': {},
-            'journal_entries': []  # ADDED: Ensure this key exists
+            'journal_entries': [],  # ADDED: Ensure this key exists
+            'comparisons': []
         }
 
              # If no habits, return minimal report WITH journal data
@@ -114,12 +246,13 @@ def generate_report_data(user_id, start_date=None, end_date=None):
         day_totals = {i: 0 for i in range(7)}
         mood_counts = {'happy': 0, 'neutral': 0, 'stressed': 0}
 
-        for habit in habits:
+        for habit_index, habit in enumerate(habits, 1):
+            schedule = habit.get_schedule()
             try:
                 print(f"DEBUG: Processing habit: {getattr(habit, 'name', 'Unnamed')}")
-                logs = get_habit_logs(habit.id) or []
+                logs = get_habit_logs(habit.id, start_date, end_date) or []
                 stats = get_completion_stats(habit.id) or {'total_completions': 0}
-                streak = get_habit_streak(habit.id) or 0
+                streak = get_habit_streak(habit.id, schedule) or 0
                 print(f"DEBUG: Habit {habit.id} - logs: {len(logs)}, streak: {streak}")
             except Exception as e:
                 print(f"DEBUG: Error processing habit {getattr(habit, 'id', 'unknown')}: {str(e)}")
@@ -138,31 +271,19 @@ def generate_report_data(user_id, start_date=None, end_date=None):
                     continue
 
             completions_in_period = len(filtered_logs)
-            days_in_period = max((end_date - start_date).days + 1, 1)
-            completion_rate = (completions_in_period / days_in_period * 100) if days_in_period else 0
-
-            # Count moods safely
-            for log in filtered_logs:
-                if hasattr(log, 'mood') and log.mood and log.mood in mood_counts:
-                    mood_counts[log.mood] += 1
-
-            # Day of week completions
-            for log in filtered_logs:
-                try:
-                    log_date = datetime.strptime(log.completed_date, '%Y-%m-%d').date()
-                    day_completions[log_date.weekday()] += 1
-                except:
-                    continue
+            # Only the days the habit was due on, from the day it was created
+            habit_start = max(start_date, _to_date(habit.created_at))
+            expected_in_period = schedule.expected_between(habit_start, end_date)
+            completion_rate = _rate(completions_in_period, expected_in_period)
 
-            # Day totals - FIXED: Count each day for each habit
-            current_date = start_date
-            while current_date <= end_date:
-                day_totals[current_date.weekday()] += 1  # Each day counts for each habit
-                current_date += timedelta(days=1)
+            # Day totals - how often the habit was due on each weekday
+            for weekday, due in enumerate(schedule.weekday_counts(habit_start, end_date)):
+                day_totals[weekday] += due
 
             total_completions += completions_in_period
-            total_possible += days_in_period
-            all_streaks.append(streak)
+            total_possible += expected_in_period
+            if schedule.streak_unit == 'day':
+                all_streaks.append(streak)  # weekly targets count weeks - not comparable
             
             try:
                 if is_completed_today(habit.id):
@@ -179,15 +300,36 @@ def generate_report_data(user_id, start_date=None, end_date=None):
                 'motivation': getattr(habit, 'motivation', '') or '',
                 'challenges': getattr(habit, 'challenges', '') or '',
                 'ai_notes': getattr(habit, 'ai_notes', '') or '',
-                'completions': f"{completions_in_period}/{days_in_period}",
-                'completion_rate': round(completion_rate, 1),
+                'schedule': schedule.describe(),
+                'completions': f"{completions_in_period}/{expected_in_period:g}",
+                'completion_rate': completion_rate,
                 'current_streak': streak,
+                'streak_unit': schedule.streak_unit,
                 'total_completions': stats.get('total_completions', 0)
             })
+            
+            if progress_callback:
+                progress_callback(habit_index, len(habits))
+
+        # Period-over-period comparisons (one pass over the user's date-bounded logs)
+        try:
+            report_data['comparisons'] = build_period_comparisons(user_id, habits, end_date, compare_periods)
+        except Exception as e:
+            print(f"DEBUG: Error building period comparisons: {e}")
+
+        # Moods and day of week completions come from the daily rollup (one row per active day)
+        try:
+            for summary in get_daily_summaries(user_id, start_date, end_date):
+                day_completions[summary['date'].weekday()] += summary['habits_completed']
+                mood_counts['happy'] += summary['mood_happy']
+                mood_counts['neutral'] += summary['mood_neutral']
+                mood_counts['stressed'] += summary['mood_stressed']
+        except Exception as e:
+            print(f"DEBUG: Error reading daily summaries: {e}")
 
         # Overall stats - FIXED: Safe calculations
         try:
-            overall_completion_rate = (total_completions / total_possible * 100) if total_possible else 0
+            overall_completion_rate = _rate(total_completions, total_possible)
         except:
             overall_completion_rate = 0
             
@@ -215,7 +357,7 @@ def generate_report_data(user_id, start_date=None, end_date=None):
         day_performance = {}
         for i in range(7):
             if day_totals[i] > 0:
-                day_performance[day_names[i]] = round((day_completions[i] / day_totals[i] * 100), 1)
+                day_performance[day_names[i]] = _rate(day_completions[i], day_totals[i])
             else:
                 day_performance[day_names[i]] = 0
         
@@ -330,11 +472,20 @@ def generate_report_data(user_id, start_date=None, end_date=None):
             'patterns': {},
             'mood_analysis': {},
             'journal_insights': {},
-            'journal_entries': []
+            'journal_entries': [],
+            'comparisons': []
         }
 
-def format_report_as_text(report_data):
-    """Convert report data dictionary into a safe, readable text with AI prompt"""
+def _format_delta(delta):
+    if delta is None:
+        return 'new'
+    return f"{delta:+.1f} pts"
+
+def format_report_as_text(report_data, max_tokens=AI_PROMPT_MAX_TOKENS):
+    """Convert report data dictionary into a safe, readable text with AI prompt
+
+    The AI prompt part is kept within max_tokens (estimated) - see prompt_builder.
+    """
     lines = []
     
     # Header
@@ -372,6 +523,24 @@ def format_report_as_text(report_data):
         lines.append("After a week of tracking, you'll get much richer insights.")
         lines.append("")
     
+    # Period comparisons
+    comparisons = report_data.get('comparisons') or []
+    if comparisons:
+        lines.append("📈 PERIOD COMPARISONS")
+        lines.append("─" * 70)
+        for comparison in comparisons:
+            current = comparison['current']
+            previous = comparison['previous']
+            lines.append(f"{comparison['label']}: {current['rate']}% vs {previous['rate']}% ({_format_delta(comparison['delta'])})")
+            lines.append(f"   {current['start']} to {current['end']}: {current['completions']} completions")
+            lines.append(f"   {previous['start']} to {previous['end']}: {previous['completions']} completions")
+            for habit in comparison['habits']:
+                if habit['current_rate'] is None:
+                    continue
+                previous_rate = f"{habit['previous_rate']}%" if habit['previous_rate'] is not None else 'n/a'
+                lines.append(f"   • {habit['icon']} {habit['name']}: {habit['current_rate']}% vs {previous_rate} ({_format_delta(habit['delta'])})")
+            lines.append("")
+    
     # Detailed Habit Breakdown
     if report_data['habits']:
         lines.append("📊 DETAILED HABIT BREAKDOWN")
@@ -379,10 +548,13 @@ def format_report_as_text(report_data):
         for idx, habit in enumerate(report_data['habits'], 1):
             lines.append("")
             lines.append(f"{idx}. {habit['icon']} {habit['name']}")
-            lines.append(f"   Frequency: {habit['frequency']}")
+            frequency = habit['frequency']
+            if habit.get('schedule') and habit['schedule'].lower() != str(frequency).lower():
+                frequency = f"{frequency} ({habit['schedule']})"
+            lines.append(f"   Frequency: {frequency}")
             lines.append(f"   Target Time: {habit['target_time']}")
             lines.append(f"   Completions: {habit['completions']} ({habit['completion_rate']}%)")
-            lines.append(f"   Current Streak: {habit['current_streak']} days")
+            lines.append(f"   Current Streak: {_streak_text(habit)}")
             lines.append(f"   Total All-Time Completions: {habit['total_completions']}")
             
             if habit['motivation']:
@@ -446,8 +618,8 @@ def format_report_as_text(report_data):
             
             for entry in sorted_entries:
                 lines.append(f"📅 {entry['date']}:")
-                # Show the full content (you can limit length if needed)
-                content = entry['content']
+                # Just the opening - the entries themselves are in the AI prompt below
+                content = excerpt(entry['content'], RECENT_ENTRY_PREVIEW_TOKENS)
                 # Split content into lines for better formatting
                 content_lines = content.split('\n')
                 for line in content_lines:
@@ -473,65 +645,73 @@ def format_report_as_text(report_data):
     lines.append("─" * 70)
     lines.append("")
     
-    # AI Prompt
-    lines.append("You are a transformational habit coach. Analyze this habit data and provide:")
-    lines.append("")
-    lines.append("1. KEY INSIGHTS: What patterns do you see?")
-    lines.append("2. STRENGTHS: What is working well?")
-    lines.append("3. IMPROVEMENTS: Where can I do better?")
-    lines.append("4. RECOMMENDATIONS: 3-5 specific, actionable steps")
-    lines.append("5. HABIT SUGGESTIONS: What complementary habits would help?")
-    lines.append("")
-    lines.append("MY DATA:")
-    lines.append("")
-    lines.append(f"Period: {report_data['period']}")
-    lines.append(f"Total Habits: {stats['total_habits']}")
-    lines.append(f"Completion Rate: {stats['overall_completion_rate']}%")
-    lines.append(f"Longest Streak: {stats['longest_streak']} days")
-    lines.append("")
+    # AI Prompt - sized to fit the assistant's context window (see prompt_builder)
+    prompt = PromptBuilder(max_tokens)
+    prompt.add('Instructions', [
+        "You are a transformational habit coach. Analyze this habit data and provide:",
+        "",
+        "1. KEY INSIGHTS: What patterns do you see?",
+        "2. STRENGTHS: What is working well?",
+        "3. IMPROVEMENTS: Where can I do better?",
+        "4. RECOMMENDATIONS: 3-5 specific, actionable steps",
+        "5. HABIT SUGGESTIONS: What complementary habits would help?",
+        "",
+        "MY DATA:",
+        "",
+        f"Period: {report_data['period']}",
+        f"Total Habits: {stats['total_habits']}",
+        f"Completion Rate: {stats['overall_completion_rate']}%",
+        f"Longest Streak: {stats['longest_streak']} days",
+        "",
+    ], priority=0, required=True)
     
     if report_data['habits']:
-        lines.append("HABITS I'M TRACKING:")
-        lines.append("")
+        habit_lines = ["HABITS I'M TRACKING:", ""]
         for idx, habit in enumerate(report_data['habits'], 1):
-            lines.append(f"{idx}. {habit['icon']} {habit['name']}")
-            lines.append(f"   Completion Rate: {habit['completion_rate']}%")
-            lines.append(f"   Current Streak: {habit['current_streak']} days")
+            habit_lines.append(f"{idx}. {habit['icon']} {habit['name']}")
+            habit_lines.append(f"   Completion Rate: {habit['completion_rate']}%")
+            habit_lines.append(f"   Current Streak: {_streak_text(habit)}")
             if habit['motivation']:
-                lines.append(f"   Why: \"{habit['motivation']}\"")
+                habit_lines.append(f"   Why: \"{habit['motivation']}\"")
             if habit['challenges']:
-                lines.append(f"   Challenges: \"{habit['challenges']}\"")
+                habit_lines.append(f"   Challenges: \"{habit['challenges']}\"")
             if habit['ai_notes']:
-                lines.append(f"   Questions: \"{habit['ai_notes']}\"")
-            lines.append("")
+                habit_lines.append(f"   Questions: \"{habit['ai_notes']}\"")
+            habit_lines.append("")
+        prompt.add('Habits', habit_lines, priority=1)
     
     if stats['total_completions'] >= 3:
-        lines.append("PATTERNS:")
-        lines.append(f"Best Days: {', '.join(report_data['patterns']['best_days'])}")
-        lines.append(f"Struggle Days: {', '.join(report_data['patterns']['worst_days'])}")
-        lines.append("")
+        prompt.add('Patterns', [
+            "PATTERNS:",
+            f"Best Days: {', '.join(report_data['patterns']['best_days'])}",
+            f"Struggle Days: {', '.join(report_data['patterns']['worst_days'])}",
+            "",
+        ], priority=2)
+    
+    if comparisons:
+        comparison_lines = ["PERIOD COMPARISONS:"]
+        for comparison in comparisons:
+            comparison_lines.append(f"{comparison['label']}: {comparison['current']['rate']}% vs {comparison['previous']['rate']}% ({_format_delta(comparison['delta'])})")
+            changes = [f"{habit['name']} {_format_delta(habit['delta'])}" for habit in comparison['habits'] if habit['delta'] is not None]
+            if changes:
+                comparison_lines.append(f"   By habit: {', '.join(changes)}")
+        comparison_lines.append("")
+        prompt.add('Period comparisons', comparison_lines, priority=3)
     
     if mood.get('happy', 0) + mood.get('neutral', 0) + mood.get('stressed', 0) > 0:
-        lines.append("MOOD TRENDS:")
-        lines.append(f"Happy: {mood['happy']}%, Neutral: {mood['neutral']}%, Stressed: {mood['stressed']}%")
-        lines.append("")
+        prompt.add('Mood trends', [
+            "MOOD TRENDS:",
+            f"Happy: {mood['happy']}%, Neutral: {mood['neutral']}%, Stressed: {mood['stressed']}%",
+            "",
+        ], priority=2)
     
-    # ADDED: Journal content in AI prompt
-    if 'journal_entries' in report_data and report_data['journal_entries']:
-        lines.append("MY JOURNAL ENTRIES:")
-        lines.append("")
-        # Sort by date (oldest first for context)
-        sorted_entries = sorted(report_data['journal_entries'], key=lambda x: x['date'])
-        for entry in sorted_entries:
-            lines.append(f"Date: {entry['date']}")
-            lines.append(f"Content: {entry['content']}")
-            if entry.get('tags') and entry['tags'].strip():
-                lines.append(f"Tags: {entry['tags']}")
-            lines.append("")  # Empty line between entries
-        lines.append("")
+    # Journal content goes last in the budget: it is the part that grows without bound
+    if report_data.get('journal_entries'):
+        prompt.add_journal('Journal entries', report_data['journal_entries'], priority=4,
+                           heading=["MY JOURNAL ENTRIES:", ""])
     
-    lines.append("Please provide specific, actionable insights based on this data.")
-    lines.append("")
+    prompt.add('Closing', ["Please provide specific, actionable insights based on this data.", ""], priority=0, required=True)
+    lines.extend(prompt.build())
     lines.append("═" * 70)
     lines.append("END OF PROMPT")
     lines.append("═" * 70)
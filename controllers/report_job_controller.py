@@ -0,0 +1,157 @@
+from database.db_helper import get_main_connection, use_user
+from controllers.report_controller import generate_report_data, format_report_as_text
+from config import REPORT_JOB_WORKERS, REPORT_JOB_TTL_MINUTES, REPORT_JOB_STALE_MINUTES
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import contextvars
+import threading
+import uuid
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def _get_executor():
+    """Create the worker pool on first use (after any gunicorn fork)"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=REPORT_JOB_WORKERS, thread_name_prefix='report-job')
+    return _executor
+
+def _job_from_row(row):
+    return {
+        'id': row['id'],
+        'user_id': row['user_id'],
+        'start_date': str(row['start_date']),
+        'end_date': str(row['end_date']),
+        'status': row['status'],
+        'progress': row['progress'] or 0,
+        'error': row['error'],
+        'created_at': row['created_at'],
+        'finished_at': row['finished_at'],
+        'expires_at': row['expires_at']
+    }
+
+def _find_active_job(cursor, user_id, start_date, end_date):
+    cursor.execute(
+        'SELECT * FROM report_jobs WHERE user_id = ? AND start_date = ? AND end_date = ? AND status IN (?, ?)',
+        (user_id, start_date, end_date, *ACTIVE_STATUSES)
+    )
+    return cursor.fetchone()
+
+def _cleanup_jobs(cursor):
+    """Drop expired artifacts and fail jobs whose worker died"""
+    now = datetime.now()
+    cursor.execute('DELETE FROM report_jobs WHERE expires_at IS NOT NULL AND expires_at < ?', (now,))
+    cursor.execute(
+        "UPDATE report_jobs SET status = 'failed', error = ?, finished_at = ?, expires_at = ? WHERE status IN (?, ?) AND created_at < ?",
+        ('Report job timed out', now, now + timedelta(minutes=REPORT_JOB_TTL_MINUTES),
+         *ACTIVE_STATUSES, now - timedelta(minutes=REPORT_JOB_STALE_MINUTES))
+    )
+
+def submit_report_job(user_id, start_date, end_date):
+    """Queue a report job, or return the active job for the same user and period"""
+    conn = get_main_connection()
+    cursor = conn.cursor()
+
+    try:
+        _cleanup_jobs(cursor)
+        conn.commit()
+
+        row = _find_active_job(cursor, user_id, start_date, end_date)
+        if row:
+            return _job_from_row(row)
+
+        job_id = uuid.uuid4().hex
+        try:
+            cursor.execute(
+                "INSERT INTO report_jobs (id, user_id, start_date, end_date, status, progress, created_at) VALUES (?, ?, ?, ?, 'queued', 0, ?)",
+                (job_id, user_id, start_date, end_date, datetime.now())
+            )
+            conn.commit()
+        except Exception:
+            # Another worker queued the same job first (idx_report_jobs_active)
+            conn.rollback()
+            row = _find_active_job(cursor, user_id, start_date, end_date)
+            if row:
+                return _job_from_row(row)
+            raise
+
+        cursor.execute('SELECT * FROM report_jobs WHERE id = ?', (job_id,))
+        job = _job_from_row(cursor.fetchone())
+    finally:
+        conn.close()
+
+    # The job reads like the request that queued it (on the primary right after a write)
+    _get_executor().submit(contextvars.copy_context().run, _run_report_job, job_id, user_id, start_date, end_date)
+    return job
+
+def _update_job(job_id, **fields):
+    conn = get_main_connection()
+    cursor = conn.cursor()
+    assignments = ', '.join(f'{column} = ?' for column in fields)
+    cursor.execute(f'UPDATE report_jobs SET {assignments} WHERE id = ?', (*fields.values(), job_id))
+    conn.commit()
+    conn.close()
+
+def _run_report_job(job_id, user_id, start_date, end_date):
+    """Worker body - build the report and store the text artifact"""
+    _update_job(job_id, status='running', progress=0)
+    last_progress = [0]
+
+    def report_progress(done, total):
+        # Only touch the database when the visible percentage changes
+        percent = int(done * 90 / total) if total else 90
+        if percent > last_progress[0]:
+            last_progress[0] = percent
+            _update_job(job_id, progress=percent)
+
+    try:
+        with use_user(user_id):
+            report_data = generate_report_data(user_id, start_date, end_date, progress_callback=report_progress)
+        report_text = format_report_as_text(report_data)
+        now = datetime.now()
+        _update_job(
+            job_id, status='done', progress=100, result=report_text,
+            finished_at=now, expires_at=now + timedelta(minutes=REPORT_JOB_TTL_MINUTES)
+        )
+    except Exception as e:
+        print(f"❌ Report job {job_id} failed: {e}")
+        now = datetime.now()
+        _update_job(
+            job_id, status='failed', error=str(e),
+            finished_at=now, expires_at=now + timedelta(minutes=REPORT_JOB_TTL_MINUTES)
+        )
+
+def get_report_job(job_id, user_id):
+    """Get a job's status for its owner (None if missing or expired)"""
+    conn = get_main_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        'SELECT * FROM report_jobs WHERE id = ? AND user_id = ? AND (expires_at IS NULL OR expires_at > ?)',
+        (job_id, user_id, datetime.now())
+    )
+    row = cursor.fetchone()
+    conn.close()
+
+    if not row:
+        return None
+    return _job_from_row(row)
+
+def get_report_job_result(job_id, user_id):
+    """Get a finished report for its owner as (end_date, text), or None if not ready or expired"""
+    conn = get_main_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT end_date, result FROM report_jobs WHERE id = ? AND user_id = ? AND status = 'done' AND expires_at > ?",
+        (job_id, user_id, datetime.now())
+    )
+    row = cursor.fetchone()
+    conn.close()
+
+    if not row:
+        return None
+    return str(row['end_date']), row['result']
@@ -0,0 +1,427 @@
+"""
+Delta sync between a desktop database and the web edition
+
+The server exposes two endpoints (see app.py):
+    GET  /api/sync/pull?since=<seq>&device=<id>  -> changes after a cursor
+    POST /api/sync/push                          -> apply a batch of changes
+Both carry gzip-compressed JSON. A change is
+    {"entity": "habit"|"log"|"journal", "key": ..., "op": "upsert"|"delete",
+     "changed_at": "<UTC timestamp>", "data": {...} or null}
+and always describes the current state of the row, so repeated or
+out-of-order delivery is harmless.
+
+Conflicts are last-writer-wins on changed_at. Exact ties go to the delete,
+then to the larger canonical JSON payload, so both sides pick the same
+winner without talking to each other.
+"""
+
+from database.db_helper import get_connection, get_main_connection
+from database import write_behind
+from database.change_log import ENTITIES, new_uid, now_stamp, record_change
+from database.daily_summary import (
+    record_completion, record_completion_removed, record_habit_created,
+    record_habit_deleted, record_journal
+)
+from database.journal_index import drop_journal_index
+from models.journal import compress_content, decompress_content
+from models.schedule import compile_frequency
+from config import SYNC_BATCH_SIZE, SYNC_TIMEOUT
+from datetime import datetime
+import gzip
+import http.cookiejar
+import json
+import urllib.parse
+import urllib.request
+
+HABIT_SYNC_FIELDS = ('name', 'frequency', 'target_time', 'icon', 'motivation', 'challenges', 'ai_notes', 'created_at')
+
+# Habits first so completions can find them
+_ENTITY_ORDER = {entity: index for index, entity in enumerate(ENTITIES)}
+
+def _text(value):
+    return None if value is None else str(value)
+
+# ============================================
+# READING CHANGES
+# ============================================
+
+def _read_state(cursor, user_id, entity, key):
+    """Current row for a change key as a sync payload (None if it no longer exists)"""
+    if entity == 'habit':
+        cursor.execute(
+            f"SELECT {', '.join(HABIT_SYNC_FIELDS)} FROM habits WHERE user_id = ? AND uid = ?",
+            (user_id, key)
+        )
+        row = cursor.fetchone()
+        return {field: _text(row[index]) for index, field in enumerate(HABIT_SYNC_FIELDS)} if row else None
+
+    if entity == 'log':
+        habit_uid, _, day = key.partition('/')
+        cursor.execute(
+            '''
+            SELECT l.mood, l.note FROM logs l JOIN habits h ON h.id = l.habit_id
+            WHERE h.user_id = ? AND h.uid = ? AND l.completed_date = ?
+            ''',
+            (user_id, habit_uid, day)
+        )
+        row = cursor.fetchone()
+        return {'habit_uid': habit_uid, 'completed_date': day, 'mood': row[0], 'note': row[1]} if row else None
+
+    cursor.execute('SELECT content, content_compressed, tags FROM journal_entries WHERE user_id = ? AND entry_date = ?', (user_id, key))
+    row = cursor.fetchone()
+    return {'entry_date': key, 'content': decompress_content(row[0], row[1]), 'tags': row[2]} if row else None
+
+def _latest_change(cursor, user_id, entity, key):
+    """(op, changed_at) of the newest change recorded for a key, or None"""
+    cursor.execute(
+        '''
+        SELECT op, changed_at FROM change_log
+        WHERE user_id = ? AND entity = ? AND entity_key = ?
+        ORDER BY changed_at DESC, seq DESC LIMIT 1
+        ''',
+        (user_id, entity, key)
+    )
+    row = cursor.fetchone()
+    return (row[0], row[1]) if row else None
+
+def _change(cursor, user_id, entity, key):
+    data = _read_state(cursor, user_id, entity, key)
+    latest = _latest_change(cursor, user_id, entity, key)
+    return {
+        'entity': entity,
+        'key': key,
+        'op': 'upsert' if data is not None else 'delete',
+        'changed_at': latest[1],
+        'data': data
+    }
+
+def _needs_habit(cursor, user_id, habit_uid, since, max_seq, exclude_origin):
+    """True if a habit has a change in the range that is not being sent yet"""
+    cursor.execute(
+        '''
+        SELECT 1 FROM change_log
+        WHERE user_id = ? AND entity = 'habit' AND entity_key = ? AND seq > ? AND seq <= ?
+          AND (origin IS NULL OR origin <> ?)
+        LIMIT 1
+        ''',
+        (user_id, habit_uid, since, max_seq, exclude_origin)
+    )
+    return cursor.fetchone() is not None
+
+def collect_changes(user_id, since=0, limit=SYNC_BATCH_SIZE, exclude_origin=''):
+    """Changes after cursor `since`, one per changed key, oldest first
+
+    Changes that came from exclude_origin (the device asking) are not sent back
+    to it. A completion whose habit changed again later in the range brings the
+    habit's current state along, so it never arrives before its habit; those
+    habits count against limit. Returns
+    {'changes': [...], 'cursor': <next since>, 'has_more': bool}.
+    """
+    # Room for at least one completion and its habit
+    limit = max(limit, 2)
+    write_behind.flush()
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    # Fix the upper bound first so changes written during the read are not skipped
+    cursor.execute('SELECT COALESCE(MAX(seq), 0) FROM change_log WHERE user_id = ?', (user_id,))
+    max_seq = cursor.fetchone()[0]
+
+    cursor.execute(
+        '''
+        SELECT entity, entity_key, MAX(seq) FROM change_log
+        WHERE user_id = ? AND seq > ? AND seq <= ? AND (origin IS NULL OR origin <> ?)
+        GROUP BY entity, entity_key
+        ORDER BY MAX(seq)
+        LIMIT ?
+        ''',
+        (user_id, since, max_seq, exclude_origin, limit)
+    )
+    keys = cursor.fetchall()
+
+    # Take keys in order while they and the habits their completions need still fit
+    taken = []
+    habits_in_batch = set()
+    habits_needed = []
+    for entity, key, seq in keys:
+        needed = None
+        if entity == 'habit' and key in habits_needed:
+            # Already coming along with a completion - it just moves to its own place
+            habits_needed.remove(key)
+        elif entity == 'log':
+            habit_uid = key.partition('/')[0]
+            if (habit_uid not in habits_in_batch and habit_uid not in habits_needed
+                    and _needs_habit(cursor, user_id, habit_uid, since, max_seq, exclude_origin)):
+                needed = habit_uid
+        if len(taken) + 1 + len(habits_needed) + (needed is not None) > limit:
+            break
+        if needed is not None:
+            habits_needed.append(needed)
+        if entity == 'habit':
+            habits_in_batch.add(key)
+        taken.append((entity, key, seq))
+
+    # Sent again at its own place later - repeated delivery is harmless
+    changes = [_change(cursor, user_id, 'habit', habit_uid) for habit_uid in habits_needed]
+    changes += [_change(cursor, user_id, entity, key) for entity, key, _ in taken]
+    conn.close()
+
+    has_more = len(keys) == limit or len(taken) < len(keys)
+    return {
+        'changes': changes,
+        'cursor': taken[-1][2] if has_more else max(max_seq, since),
+        'has_more': has_more
+    }
+
+# ============================================
+# APPLYING CHANGES
+# ============================================
+
+def _canonical(op, data):
+    return (op == 'delete', json.dumps(data, sort_keys=True))
+
+def _incoming_wins(cursor, user_id, change):
+    """Last-writer-wins with a deterministic tie-break"""
+    latest = _latest_change(cursor, user_id, change['entity'], change['key'])
+    if latest is None or change['changed_at'] > latest[1]:
+        return True
+    if change['changed_at'] < latest[1]:
+        return False
+    local_data = _read_state(cursor, user_id, change['entity'], change['key'])
+    local_op = 'upsert' if local_data is not None else 'delete'
+    return _canonical(change['op'], change['data']) > _canonical(local_op, local_data)
+
+def _habit_id(cursor, user_id, uid):
+    cursor.execute('SELECT id FROM habits WHERE user_id = ? AND uid = ?', (user_id, uid))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+def _apply_habit(cursor, user_id, change):
+    habit_id = _habit_id(cursor, user_id, change['key'])
+    if change['op'] == 'delete':
+        if habit_id is not None:
+            record_habit_deleted(cursor, habit_id)
+            cursor.execute('DELETE FROM habits WHERE id = ?', (habit_id,))
+        return True
+
+    data = change['data']
+    if not data.get('name') or not data.get('frequency'):
+        return False
+    values = [data.get(field) for field in HABIT_SYNC_FIELDS[:-1]]
+    if habit_id is not None:
+        cursor.execute(
+            'UPDATE habits SET name=?, frequency=?, target_time=?, icon=?, motivation=?, challenges=?, ai_notes=?, schedule=? WHERE id=?',
+            (*values, compile_frequency(data['frequency']), habit_id)
+        )
+    else:
+        created_at = data.get('created_at') or now_stamp()[:19]
+        cursor.execute(
+            'INSERT INTO habits (user_id, uid, name, frequency, target_time, icon, motivation, challenges, ai_notes, created_at, schedule) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (user_id, change['key'], *values, created_at, compile_frequency(data['frequency']))
+        )
+        record_habit_created(cursor, user_id, created_at[:10])
+    return True
+
+def _apply_log(cursor, user_id, change):
+    habit_uid, _, day = change['key'].partition('/')
+    habit_id = _habit_id(cursor, user_id, habit_uid)
+    if habit_id is None:
+        # The habit was deleted here (or never arrived) - nothing to attach to
+        return False
+
+    cursor.execute('SELECT mood FROM logs WHERE habit_id = ? AND completed_date = ?', (habit_id, day))
+    existing = cursor.fetchone()
+    if existing:
+        record_completion_removed(cursor, habit_id, day, existing[0])
+        cursor.execute('DELETE FROM logs WHERE habit_id = ? AND completed_date = ?', (habit_id, day))
+    if change['op'] == 'upsert':
+        mood = change['data'].get('mood')
+        cursor.execute(
+            'INSERT INTO logs (habit_id, completed_date, mood, note) VALUES (?, ?, ?, ?)',
+            (habit_id, day, mood, change['data'].get('note'))
+        )
+        record_completion(cursor, habit_id, day, mood)
+    return True
+
+def _apply_journal(cursor, user_id, change):
+    day = change['key']
+    if change['op'] == 'delete':
+        cursor.execute('DELETE FROM journal_entries WHERE user_id = ? AND entry_date = ?', (user_id, day))
+        if cursor.rowcount:
+            record_journal(cursor, user_id, day, written=False)
+        return True
+
+    data = change['data']
+    if data.get('content') is None:
+        return False
+    content, content_compressed = compress_content(data['content'])
+    cursor.execute(
+        '''
+        INSERT INTO journal_entries (user_id, entry_date, content, content_compressed, tags) VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (user_id, entry_date) DO UPDATE SET
+            content = excluded.content, content_compressed = excluded.content_compressed,
+            tags = excluded.tags, updated_at = CURRENT_TIMESTAMP
+        ''',
+        (user_id, day, content, content_compressed, data.get('tags'))
+    )
+    record_journal(cursor, user_id, day, written=True)
+    return True
+
+_APPLIERS = {'habit': _apply_habit, 'log': _apply_log, 'journal': _apply_journal}
+
+def _validate(change):
+    if not isinstance(change, dict):
+        raise ValueError('A change must be an object')
+    if change.get('entity') not in _APPLIERS or change.get('op') not in ('upsert', 'delete'):
+        raise ValueError('Unknown change entity or op')
+    if not isinstance(change.get('key'), str) or not isinstance(change.get('changed_at'), str):
+        raise ValueError('A change needs a text key and changed_at')
+    if change['op'] == 'upsert' and not isinstance(change.get('data'), dict):
+        raise ValueError('An upsert needs a data object')
+    if change['op'] == 'delete':
+        change['data'] = None
+
+def apply_changes(user_id, changes, origin):
+    """Apply a batch of changes in one transaction
+
+    Each applied change is recorded in the local change log with its original
+    changed_at and the given origin. Raises ValueError for malformed input.
+    Returns {'applied': n, 'skipped': n}.
+    """
+    for change in changes:
+        _validate(change)
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    applied = skipped = 0
+    journal_changed = False
+    try:
+        for change in sorted(changes, key=lambda c: (_ENTITY_ORDER[c['entity']], c['changed_at'])):
+            if not _incoming_wins(cursor, user_id, change):
+                skipped += 1
+                continue
+            if _APPLIERS[change['entity']](cursor, user_id, change):
+                record_change(cursor, user_id, change['entity'], change['key'], change['op'],
+                              origin=origin, changed_at=change['changed_at'])
+                applied += 1
+                journal_changed = journal_changed or change['entity'] == 'journal'
+            else:
+                skipped += 1
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    if journal_changed:
+        # Synced entries bypass the per-entry index updates
+        drop_journal_index(user_id)
+    return {'applied': applied, 'skipped': skipped}
+
+# ============================================
+# CLIENT (desktop -> web)
+# ============================================
+
+SERVER_ORIGIN = 'server'
+
+def _get_sync_state(server_url):
+    conn = get_main_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT device_id, pull_cursor, push_cursor FROM sync_state WHERE server_url = ?', (server_url,))
+    row = cursor.fetchone()
+    if not row:
+        row = (new_uid(), 0, 0)
+        cursor.execute(
+            'INSERT INTO sync_state (server_url, device_id, pull_cursor, push_cursor) VALUES (?, ?, 0, 0)',
+            (server_url, row[0])
+        )
+        conn.commit()
+    conn.close()
+    return {'device_id': row[0], 'pull_cursor': row[1], 'push_cursor': row[2]}
+
+def _save_sync_cursor(server_url, column, value):
+    conn = get_main_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        f'UPDATE sync_state SET {column} = ?, last_synced_at = ? WHERE server_url = ?',
+        (value, datetime.now(), server_url)
+    )
+    conn.commit()
+    conn.close()
+
+def get_sync_servers():
+    """Servers this database has synced with, most recent first"""
+    conn = get_main_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT server_url, last_synced_at FROM sync_state ORDER BY last_synced_at DESC')
+    rows = cursor.fetchall()
+    conn.close()
+    return [{'server_url': row[0], 'last_synced_at': row[1]} for row in rows]
+
+def _call(opener, url, payload=None):
+    """GET (payload None) or POST gzip JSON; returns the decoded JSON response"""
+    headers = {'Accept': 'application/json', 'Accept-Encoding': 'gzip'}
+    data = None
+    if payload is not None:
+        data = gzip.compress(json.dumps(payload).encode('utf-8'))
+        headers['Content-Type'] = 'application/json'
+        headers['Content-Encoding'] = 'gzip'
+
+    with opener.open(urllib.request.Request(url, data=data, headers=headers), timeout=SYNC_TIMEOUT) as response:
+        body = response.read()
+        if response.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        if 'application/json' not in response.headers.get('Content-Type', ''):
+            # Unauthenticated API calls are redirected to the login page
+            raise RuntimeError('Not signed in to the server - check the email and password')
+        return json.loads(body)
+
+def sync_with_server(user_id, server_url, email, password):
+    """Two-way sync of a local account with a web account
+
+    Pushes local changes first, then pulls remote ones, in batches of
+    SYNC_BATCH_SIZE. Cursors are saved after every batch, so an interrupted
+    sync resumes where it stopped. Returns a summary dict.
+    """
+    server_url = server_url.rstrip('/')
+    state = _get_sync_state(server_url)
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+    opener.open(
+        server_url + '/login',
+        data=urllib.parse.urlencode({'email': email, 'password': password}).encode('utf-8'),
+        timeout=SYNC_TIMEOUT
+    ).close()
+
+    summary = {'pushed': 0, 'pulled': 0, 'skipped': 0}
+
+    while True:
+        batch = collect_changes(user_id, state['push_cursor'], SYNC_BATCH_SIZE, exclude_origin=SERVER_ORIGIN)
+        if batch['changes']:
+            result = _call(opener, server_url + '/api/sync/push', {
+                'device': state['device_id'],
+                'changes': batch['changes']
+            })
+            summary['pushed'] += result['applied']
+            summary['skipped'] += result['skipped']
+        if batch['cursor'] != state['push_cursor']:
+            state['push_cursor'] = batch['cursor']
+            _save_sync_cursor(server_url, 'push_cursor', batch['cursor'])
+        if not batch['has_more']:
+            break
+
+    while True:
+        query = urllib.parse.urlencode({'since': state['pull_cursor'], 'device': state['device_id'], 'limit': SYNC_BATCH_SIZE})
+        batch = _call(opener, f"{server_url}/api/sync/pull?{query}")
+        if batch['changes']:
+            result = apply_changes(user_id, batch['changes'], origin=SERVER_ORIGIN)
+            summary['pulled'] += result['applied']
+            summary['skipped'] += result['skipped']
+        state['pull_cursor'] = batch['cursor']
+        _save_sync_cursor(server_url, 'pull_cursor', batch['cursor'])
+        if not batch['has_more']:
+            break
+
+    print(f"🔄 Synced with {server_url}: {summary}")
+    return summary
@@ -1,16 +1,30 @@
-from database.db_helper import get_connection
+from database.db_helper import (
+    get_connection, get_main_connection, get_read_connection, iter_query, sharding_enabled, use_user
+)
+from database.journal_index import drop_journal_index
 from models.user import User
-from flask_bcrypt import Bcrypt
-from config import ADMIN_EMAIL
+from config import ADMIN_EMAIL, ADMIN_USERS_PER_PAGE
 
-bcrypt = Bcrypt()
+_bcrypt = None
+
+def _get_bcrypt():
+    """Import bcrypt on first use - it is only needed at register/login time"""
+    global _bcrypt
+    if _bcrypt is None:
+        from flask_bcrypt import Bcrypt
+        _bcrypt = Bcrypt()
+    return _bcrypt
+
+def hash_password(password):
+    """Return a bcrypt hash for a password"""
+    return _get_bcrypt().generate_password_hash(password).decode('utf-8')
 
 def create_user(email, password):
     """Create a new user with hashed password"""
-    password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+    password_hash = hash_password(password)
     is_admin = (email == ADMIN_EMAIL)
     
-    conn = get_connection()
+    conn = get_main_connection()
     cursor = conn.cursor()
     
     try:
@@ -28,7 +42,7 @@ def create_user(email, password):
 
 def get_user_by_email(email):
     """Get user by email"""
-    conn = get_connection()
+    conn = get_main_connection()
     cursor = conn.cursor()
     cursor.execute('SELECT * FROM users WHERE email = ?', (email,))
     row = cursor.fetchone()
@@ -46,7 +60,7 @@ def get_user_by_email(email):
 
 def get_user_by_id(user_id):
     """Get user by ID"""
-    conn = get_connection()
+    conn = get_main_connection()
     cursor = conn.cursor()
     cursor.execute('SELECT * FROM users WHERE id = ?', (user_id,))
     row = cursor.fetchone()
@@ -64,11 +78,15 @@ def get_user_by_id(user_id):
 
 def verify_password(user, password):
     """Verify user password"""
-    return bcrypt.check_password_hash(user.password_hash, password)
+    try:
+        return _get_bcrypt().check_password_hash(user.password_hash, password)
+    except ValueError:
+        # Not a bcrypt hash (e.g. the password-less desktop user)
+        return False
 
 def get_all_users():
     """Get all users (admin only)"""
-    conn = get_connection()
+    conn = get_read_connection(main=True)
     cursor = conn.cursor()
     cursor.execute('SELECT * FROM users ORDER BY created_at DESC')
     rows = cursor.fetchall()
@@ -86,10 +104,63 @@ def get_all_users():
         users.append(user)
     return users
 
+def count_users():
+    """Get total and admin user counts (admin only)"""
+    conn = get_read_connection(main=True)
+    cursor = conn.cursor()
+    cursor.execute('SELECT COUNT(*), SUM(CASE WHEN is_admin THEN 1 ELSE 0 END) FROM users')
+    row = cursor.fetchone()
+    conn.close()
+    
+    total, admins = row[0], row[1] or 0
+    return {'total': total, 'admins': admins, 'regular': total - admins}
+
+def get_users_page(before_id=None, per_page=ADMIN_USERS_PER_PAGE):
+    """Get one page of users, newest first (admin only)
+    
+    Keyset pagination on id - pass the last id of a page as before_id to get
+    the next one. Only the listed columns are read (never password hashes).
+    Returns (users, next_before_id or None).
+    """
+    conn = get_read_connection(main=True)
+    cursor = conn.cursor()
+    if before_id is None:
+        cursor.execute('SELECT id, email, is_admin, created_at FROM users ORDER BY id DESC LIMIT ?', (per_page + 1,))
+    else:
+        cursor.execute(
+            'SELECT id, email, is_admin, created_at FROM users WHERE id < ? ORDER BY id DESC LIMIT ?',
+            (before_id, per_page + 1)
+        )
+    rows = cursor.fetchall()
+    conn.close()
+    
+    users = [
+        User(id=row[0], email=row[1], password_hash=None, is_admin=bool(row[2]), created_at=row[3])
+        for row in rows[:per_page]
+    ]
+    next_before_id = users[-1].id if len(rows) > per_page else None
+    return users, next_before_id
+
+def iter_users_for_export():
+    """Yield (email, created_at, is_admin) for every user without loading them all (admin only)"""
+    for row in iter_query('SELECT email, created_at, is_admin FROM users ORDER BY id', main=True, replica=True):
+        yield row[0], row[1], bool(row[2])
+
 def delete_user(user_id):
     """Delete a user (admin only)"""
-    conn = get_connection()
+    conn = get_main_connection()
     cursor = conn.cursor()
     cursor.execute('DELETE FROM users WHERE id = ?', (user_id,))
     conn.commit()
-    conn.close()
\ No newline at end of file
+    conn.close()
+    drop_journal_index(user_id)
+    
+    if sharding_enabled():
+        # No foreign key reaches the shard file - remove the user's rows there too
+        with use_user(user_id):
+            conn = get_connection()
+            cursor = conn.cursor()
+            for table in ('habits', 'journal_entries', 'user_daily_summary', 'change_log'):
+                cursor.execute(f'DELETE FROM {table} WHERE user_id = ?', (user_id,))
+            conn.commit()
+            conn.close()
\ No newline at end of file
@@ -0,0 +1,95 @@
+"""
+change_log - per-user feed of row changes, used by delta sync
+
+Every write to habits, logs and journal_entries appends one row here inside
+the same transaction: which entity changed (habit uid, "habit_uid/date" for
+a completion, the entry date for a journal entry), whether it was an upsert
+or a delete, and when. A sync pulls the distinct keys changed after its
+cursor (seq) and reads their current state, so its cost follows the number
+of changes, not the size of the history.
+
+changed_at is a UTC text timestamp - it is the clock for last-writer-wins,
+and text compares the same way on SQLite and PostgreSQL.
+"""
+
+from database.db_helper import get_connection
+from datetime import datetime, timezone
+import uuid
+
+ENTITIES = ('habit', 'log', 'journal')
+
+def now_stamp():
+    """Current UTC time as a sortable text timestamp"""
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S.%f')
+
+def new_uid():
+    """Stable habit id shared by every database the habit is synced to"""
+    return uuid.uuid4().hex
+
+def log_key(habit_uid, day):
+    return f"{habit_uid}/{day}"
+
+def record_change(cursor, user_id, entity, entity_key, op='upsert', origin=None, changed_at=None):
+    """Append a change (call in the same transaction as the write)"""
+    cursor.execute(
+        'INSERT INTO change_log (user_id, entity, entity_key, op, origin, changed_at) VALUES (?, ?, ?, ?, ?, ?)',
+        (user_id, entity, entity_key, op, origin, changed_at or now_stamp())
+    )
+
+def record_habit_change(cursor, habit_id, op='upsert'):
+    """A habit was created/updated (call after the write) or is about to be deleted"""
+    cursor.execute('SELECT user_id, uid FROM habits WHERE id = ?', (habit_id,))
+    row = cursor.fetchone()
+    if row and row[1]:
+        record_change(cursor, row[0], 'habit', row[1], op)
+
+def record_log_change(cursor, habit_id, day, op='upsert'):
+    """A completion was written or removed"""
+    cursor.execute('SELECT user_id, uid FROM habits WHERE id = ?', (habit_id,))
+    row = cursor.fetchone()
+    if row and row[1]:
+        record_change(cursor, row[0], 'log', log_key(row[1], day), op)
+
+def record_journal_change(cursor, user_id, entry_date, op='upsert'):
+    """A journal entry was saved or deleted"""
+    record_change(cursor, user_id, 'journal', str(entry_date), op)
+
+def seed_change_log():
+    """Give existing habits a uid and record every existing row once
+
+    Run when the change log is introduced, so the first sync of an existing
+    database sends its full history.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute('SELECT id FROM habits WHERE uid IS NULL')
+    habit_ids = [row[0] for row in cursor.fetchall()]
+    cursor.executemany('UPDATE habits SET uid = ? WHERE id = ?', [(new_uid(), habit_id) for habit_id in habit_ids])
+
+    cursor.execute(
+        '''
+        INSERT INTO change_log (user_id, entity, entity_key, op, changed_at)
+        SELECT user_id, 'habit', uid, 'upsert', CAST(created_at AS TEXT) FROM habits
+        '''
+    )
+    cursor.execute(
+        '''
+        INSERT INTO change_log (user_id, entity, entity_key, op, changed_at)
+        SELECT h.user_id, 'log', h.uid || '/' || CAST(l.completed_date AS TEXT), 'upsert', CAST(l.created_at AS TEXT)
+        FROM logs l JOIN habits h ON h.id = l.habit_id
+        '''
+    )
+    cursor.execute(
+        '''
+        INSERT INTO change_log (user_id, entity, entity_key, op, changed_at)
+        SELECT user_id, 'journal', CAST(entry_date AS TEXT), 'upsert', CAST(COALESCE(updated_at, created_at) AS TEXT)
+        FROM journal_entries
+        '''
+    )
+    cursor.execute('SELECT COUNT(*) FROM change_log')
+    count = cursor.fetchone()[0]
+
+    conn.commit()
+    conn.close()
+    return count
@@ -0,0 +1,273 @@
+"""
+user_daily_summary - one row per user per active day
+
+The rollup is maintained inside the same transaction as the write that
+changes it (completions, habit creation/deletion, journal saves), so it
+never drifts from the raw tables. rebuild_daily_summary() recomputes it
+from scratch for historical data.
+
+Every change bumps the row's version column, so the sum of versions over
+a date range identifies the data in it (used as a cache key/ETag).
+"""
+
+from database.db_helper import get_connection, get_read_connection, shard_indexes, use_shard, use_user
+from database.log_partitions import cold_logs, archived_before
+from datetime import datetime
+import time
+
+MOODS = ('happy', 'neutral', 'stressed')
+
+# Habits that existed on a given day (current habits created on or before it)
+_HABITS_DUE_SQL = 'SELECT COUNT(*) FROM habits WHERE user_id = ? AND DATE(created_at) <= ?'
+
+def _upsert(cursor, user_id, day, due_delta=0, completed_delta=0, mood=None, journal_written=None):
+    """Apply deltas to a user's row for a day, creating the row if needed"""
+    mood_deltas = [1 if mood == name and completed_delta > 0 else 0 for name in MOODS]
+    journal_value = 1 if journal_written else 0
+
+    journal_update = ''
+    if journal_written is not None:
+        journal_update = ', journal_written = excluded.journal_written'
+
+    cursor.execute(
+        f'''
+        INSERT INTO user_daily_summary
+            (user_id, summary_date, habits_due, habits_completed, mood_happy, mood_neutral, mood_stressed, journal_written, version)
+        VALUES (?, ?, ({_HABITS_DUE_SQL}), ?, ?, ?, ?, ?, 1)
+        ON CONFLICT (user_id, summary_date) DO UPDATE SET
+            version = user_daily_summary.version + 1,
+            habits_due = user_daily_summary.habits_due + ?,
+            habits_completed = user_daily_summary.habits_completed + excluded.habits_completed,
+            mood_happy = user_daily_summary.mood_happy + excluded.mood_happy,
+            mood_neutral = user_daily_summary.mood_neutral + excluded.mood_neutral,
+            mood_stressed = user_daily_summary.mood_stressed + excluded.mood_stressed
+            {journal_update}
+        ''',
+        (user_id, day, user_id, day, max(completed_delta, 0), *mood_deltas, journal_value, due_delta)
+    )
+
+def record_completion(cursor, habit_id, day, mood=None):
+    """A habit was completed on a day"""
+    cursor.execute('SELECT user_id FROM habits WHERE id = ?', (habit_id,))
+    row = cursor.fetchone()
+    if row:
+        _upsert(cursor, row[0], day, completed_delta=1, mood=mood)
+
+def record_completion_removed(cursor, habit_id, day, mood=None):
+    """A completion was removed or replaced (call before the DELETE/UPDATE)"""
+    mood_columns = {name: f"mood_{name} = mood_{name} - 1, " for name in MOODS}
+    cursor.execute(
+        f'''
+        UPDATE user_daily_summary SET {mood_columns.get(mood, '')}
+            habits_completed = habits_completed - 1, version = version + 1
+        WHERE user_id = (SELECT user_id FROM habits WHERE id = ?) AND summary_date = ?
+        ''',
+        (habit_id, day)
+    )
+
+def record_habit_created(cursor, user_id, day=None):
+    """A habit was created (call after the INSERT) - day is its creation date"""
+    day = day or datetime.now().date()
+    _upsert(cursor, user_id, day, due_delta=1)
+    # Only matters for habits created in the past (synced or imported ones)
+    cursor.execute(
+        'UPDATE user_daily_summary SET habits_due = habits_due + 1, version = version + 1 WHERE user_id = ? AND summary_date > ?',
+        (user_id, day)
+    )
+
+def record_habit_deleted(cursor, habit_id):
+    """A habit is about to be deleted (call before the DELETE - its logs go with it)"""
+    cursor.execute('SELECT user_id, DATE(created_at) FROM habits WHERE id = ?', (habit_id,))
+    row = cursor.fetchone()
+    if not row:
+        return
+    user_id, created_on = row[0], row[1]
+
+    cursor.execute(
+        '''
+        SELECT completed_date,
+               COUNT(*),
+               SUM(CASE WHEN mood = 'happy' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN mood = 'neutral' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN mood = 'stressed' THEN 1 ELSE 0 END)
+        FROM logs WHERE habit_id = ? GROUP BY completed_date
+        ''',
+        (habit_id,)
+    )
+    totals = {str(day): [count, happy, neutral, stressed] for day, count, happy, neutral, stressed in cursor.fetchall()}
+    # Archived completions go with the habit too (logs_cold cascades)
+    for record in cold_logs(cursor, habit_id):
+        counts = totals.setdefault(record['completed_date'], [0, 0, 0, 0])
+        counts[0] += 1
+        if record['mood'] in MOODS:
+            counts[MOODS.index(record['mood']) + 1] += 1
+    removals = [(*counts, user_id, day) for day, counts in totals.items()]
+    if removals:
+        cursor.executemany(
+            '''
+            UPDATE user_daily_summary SET
+                version = version + 1,
+                habits_completed = habits_completed - ?,
+                mood_happy = mood_happy - ?,
+                mood_neutral = mood_neutral - ?,
+                mood_stressed = mood_stressed - ?
+            WHERE user_id = ? AND summary_date = ?
+            ''',
+            removals
+        )
+
+    cursor.execute(
+        'UPDATE user_daily_summary SET habits_due = habits_due - 1, version = version + 1 WHERE user_id = ? AND summary_date >= ?',
+        (user_id, created_on)
+    )
+
+def record_journal(cursor, user_id, day, written=True):
+    """A journal entry was saved (written=True) or deleted (written=False)"""
+    _upsert(cursor, user_id, day, journal_written=written)
+
+def rebuild_daily_summary(user_id=None):
+    """Recompute the rollup from raw tables for one user, or for everyone"""
+    if user_id is not None:
+        with use_user(user_id):
+            return _rebuild(user_id)
+
+    row_count = 0
+    for shard in shard_indexes():
+        with use_shard(shard):
+            row_count += _rebuild(None)
+    return row_count
+
+def _rebuild(user_id):
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    user_filter = 'h.user_id = ?' if user_id is not None else '1 = 1'
+    journal_filter = 'user_id = ?' if user_id is not None else '1 = 1'
+    params = (user_id,) if user_id is not None else ()
+
+    # Archived completions are no longer in logs - keep the rows for those days as maintained
+    keep_before = archived_before(cursor)
+    if keep_before is not None:
+        user_filter += f" AND l.completed_date >= '{keep_before}'"
+
+    if user_id is not None:
+        cursor.execute(
+            'DELETE FROM user_daily_summary WHERE user_id = ?' + (f" AND summary_date >= '{keep_before}'" if keep_before else ''),
+            params
+        )
+    else:
+        cursor.execute('DELETE FROM user_daily_summary' + (f" WHERE summary_date >= '{keep_before}'" if keep_before else ''))
+
+    cursor.execute(
+        f'''
+        INSERT INTO user_daily_summary
+            (user_id, summary_date, habits_due, habits_completed, mood_happy, mood_neutral, mood_stressed, journal_written)
+        SELECT h.user_id, l.completed_date, 0, COUNT(*),
+               SUM(CASE WHEN l.mood = 'happy' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN l.mood = 'neutral' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN l.mood = 'stressed' THEN 1 ELSE 0 END),
+               0
+        FROM logs l JOIN habits h ON h.id = l.habit_id
+        WHERE {user_filter}
+        GROUP BY h.user_id, l.completed_date
+        ''',
+        params
+    )
+
+    # WHERE is required before ON CONFLICT in INSERT ... SELECT on SQLite
+    cursor.execute(
+        f'''
+        INSERT INTO user_daily_summary
+            (user_id, summary_date, habits_due, habits_completed, mood_happy, mood_neutral, mood_stressed, journal_written)
+        SELECT user_id, entry_date, 0, 0, 0, 0, 0, 1 FROM journal_entries
+        WHERE {journal_filter}
+        ON CONFLICT (user_id, summary_date) DO UPDATE SET journal_written = 1
+        ''',
+        params
+    )
+
+    # Rebuilt rows start from a fresh version so cache keys from before the rebuild never match
+    cursor.execute(
+        f'''
+        UPDATE user_daily_summary SET habits_due = (
+            SELECT COUNT(*) FROM habits h
+            WHERE h.user_id = user_daily_summary.user_id AND DATE(h.created_at) <= user_daily_summary.summary_date
+        ), version = ?
+        WHERE {journal_filter}
+        ''',
+        (int(time.time()), *params)
+    )
+
+    cursor.execute('SELECT COUNT(*) FROM user_daily_summary' + (' WHERE user_id = ?' if user_id is not None else ''), params)
+    row_count = cursor.fetchone()[0]
+
+    conn.commit()
+    conn.close()
+    return row_count
+
+def get_daily_summaries(user_id, start_date, end_date):
+    """Get a user's rollup rows in a date range (days without activity have no row)"""
+    conn = get_read_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        '''
+        SELECT summary_date, habits_due, habits_completed, mood_happy, mood_neutral, mood_stressed, journal_written
+        FROM user_daily_summary
+        WHERE user_id = ? AND summary_date BETWEEN ? AND ?
+        ORDER BY summary_date
+        ''',
+        (user_id, start_date, end_date)
+    )
+    rows = cursor.fetchall()
+    conn.close()
+
+    return [
+        {
+            'date': datetime.strptime(str(row[0]), '%Y-%m-%d').date(),
+            'habits_due': row[1],
+            'habits_completed': row[2],
+            'mood_happy': row[3],
+            'mood_neutral': row[4],
+            'mood_stressed': row[5],
+            'journal_written': bool(row[6])
+        }
+        for row in rows
+    ]
+
+def get_data_version(user_id, start_date, end_date):
+    """Cheap fingerprint of a user's rollup rows in a date range"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        'SELECT COUNT(*), COALESCE(SUM(version), 0) FROM user_daily_summary WHERE user_id = ? AND summary_date BETWEEN ? AND ?',
+        (user_id, start_date, end_date)
+    )
+    row = cursor.fetchone()
+    conn.close()
+    return f"{row[0]}.{row[1]}"
+
+def get_activity_totals(start_date, end_date):
+    """Site-wide totals for admin analytics over a date range (summed across shards)"""
+    totals = {'active_users': 0, 'completions': 0, 'journal_entries': 0}
+    for shard in shard_indexes():
+        with use_shard(shard):
+            conn = get_connection()
+            cursor = conn.cursor()
+            cursor.execute(
+                '''
+                SELECT COUNT(DISTINCT user_id),
+                       COALESCE(SUM(habits_completed), 0),
+                       COALESCE(SUM(journal_written), 0)
+                FROM user_daily_summary
+                WHERE summary_date BETWEEN ? AND ? AND (habits_completed > 0 OR journal_written > 0)
+                ''',
+                (start_date, end_date)
+            )
+            row = cursor.fetchone()
+            conn.close()
+
+        # Shards hold disjoint users, so per-shard distinct counts add up
+        totals['active_users'] += row[0]
+        totals['completions'] += row[1]
+        totals['journal_entries'] += row[2]
+    return totals
@@ -1,52 +1,730 @@
+import contextvars
+import itertools
 import sqlite3
 import os
-from config import DATABASE_PATH, ADMIN_EMAIL
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict
+from contextlib import contextmanager
+from config import (
+    DATABASE_PATH, ADMIN_EMAIL, DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_ITERSIZE,
+    SQLITE_SHARDS, SHARD_DIR, SHARD_HANDLE_CACHE,
+    DATABASE_REPLICA_URL, REPLICA_RETRY_SECONDS, REPLICA_CONNECT_TIMEOUT
+)
+from database.query_logger import instrument
 
-def get_connection():
-    """Create and return a database connection"""
-    # Check if running on Render (PostgreSQL)
+# Bump whenever init_db() learns a new table, column or index
+SCHEMA_VERSION = 9
+
+_schema_checked = False
+_schema_lock = threading.Lock()
+_database_dir_ready = False
+
+def _get_database_url():
+    """Return the PostgreSQL URL (fixed for psycopg2) or None for SQLite"""
     database_url = os.environ.get('DATABASE_URL')
+    # Fix Render's postgres:// URL
+    if database_url and database_url.startswith('postgres://'):
+        database_url = database_url.replace('postgres://', 'postgresql://', 1)
+    return database_url
+
+def _ensure_database_dir():
+    """Create the SQLite directory once per process"""
+    global _database_dir_ready
+    if not _database_dir_ready:
+        database_dir = os.path.dirname(DATABASE_PATH)
+        if not os.path.exists(database_dir):
+            os.makedirs(database_dir, exist_ok=True)
+            print(f"📁 Created database directory: {database_dir}")
+        _database_dir_ready = True
+
+def _open_connection(shared=False):
+    """Open a new database connection (shared=True allows use from other threads)"""
+    # Check if running on Render (PostgreSQL)
+    database_url = _get_database_url()
     
     if database_url:
-        # Using PostgreSQL on Render
+        # Using PostgreSQL on Render - imported lazily to keep cold start fast
         import psycopg2
-        from psycopg2.extras import RealDictCursor
-        
-        # Fix Render's postgres:// URL
-        if database_url.startswith('postgres://'):
-            database_url = database_url.replace('postgres://', 'postgresql://', 1)
         
         conn = psycopg2.connect(database_url)
-        return conn
+        return instrument(conn, 'postgres')
     else:
         # Using SQLite locally - FIXED: Ensure directory exists
-        database_dir = os.path.dirname(DATABASE_PATH)
-        if not os.path.exists(database_dir):
-            os.makedirs(database_dir, exist_ok=True)
-            print(f"📁 Created database directory: {database_dir}")
+        _ensure_database_dir()
         
-        conn = sqlite3.connect(DATABASE_PATH)
+        conn = sqlite3.connect(DATABASE_PATH, check_same_thread=not shared)
         conn.row_factory = sqlite3.Row
         
         # Enable foreign keys
         conn.execute("PRAGMA foreign_keys = ON")
         
-        print(f"🔗 Database connected: {DATABASE_PATH}")
-        print(f"🔗 Database file exists: {os.path.exists(DATABASE_PATH)}")
+        return instrument(conn, 'sqlite')
+
+# ============================================
+# CONNECTION POOL (per process, off unless DB_POOL_SIZE > 0)
+# ============================================
+
+class PooledConnection:
+    """Connection handed out by the pool - close() returns it instead of closing it"""
+    
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+    
+    def close(self):
+        if self._conn is not None:
+            self._pool.release(self._conn)
+            self._conn = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+class ConnectionPool:
+    """Small blocking pool; one per process (it resets itself after a fork)"""
+    
+    def __init__(self, size, timeout=DB_POOL_TIMEOUT, opener=_open_connection):
+        self.size = size
+        self.timeout = timeout
+        self._opener = opener
+        self.pid = os.getpid()
+        self._idle = []
+        self._in_use = 0
+        self._condition = threading.Condition()
+    
+    def acquire(self):
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._idle or self._in_use < self.size, timeout=self.timeout):
+                raise RuntimeError(f"Timed out waiting for a database connection (pool size {self.size})")
+            self._in_use += 1
+            if self._idle:
+                return PooledConnection(self, self._idle.pop())
+        try:
+            return PooledConnection(self, self._opener(shared=True))
+        except Exception:
+            with self._condition:
+                self._in_use -= 1
+                self._condition.notify()
+            raise
+    
+    def release(self, conn):
+        try:
+            # Never hand the next caller an open transaction
+            conn.rollback()
+            healthy = True
+        except Exception:
+            healthy = False
+        with self._condition:
+            self._in_use -= 1
+            if healthy:
+                self._idle.append(conn)
+            else:
+                _close_quietly(conn)
+            self._condition.notify()
+    
+    def close_all(self):
+        with self._condition:
+            for conn in self._idle:
+                _close_quietly(conn)
+            self._idle = []
+    
+    def stats(self):
+        with self._condition:
+            return {
+                'size': self.size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'saturation': round(self._in_use / self.size, 2) if self.size else 0
+            }
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+_pool = None
+_pool_size = DB_POOL_SIZE
+_pool_lock = threading.Lock()
+
+def configure_pool(size):
+    """Set the pool size for this process (0 disables pooling)"""
+    global _pool_size
+    with _pool_lock:
+        _pool_size = size
+        _discard_pool(close=True)
+
+def reset_pool():
+    """Drop pooled connections inherited from a parent process (call after fork)"""
+    with _pool_lock:
+        _discard_pool(close=False)
+
+def close_pool():
+    """Close this process's pooled connections (e.g. a server's master process before it forks)"""
+    with _pool_lock:
+        _discard_pool(close=True)
+
+def _discard_pool(close):
+    global _pool, _replica_pool
+    for pool in (_pool, _replica_pool):
+        if pool is not None and close:
+            pool.close_all()
+    _pool = _replica_pool = None
+
+def _get_pool():
+    global _pool
+    if _pool_size <= 0:
+        return None
+    if _pool is None or _pool.pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool.pid != os.getpid():
+                # Connections from before a fork belong to the parent - never reuse them
+                _pool = ConnectionPool(_pool_size)
+    return _pool
+
+def get_pool_stats():
+    """Pool usage for this process (None when pooling is off)"""
+    pool = _get_pool()
+    return pool.stats() if pool else None
+
+def get_main_connection():
+    """Connection to the main database (users, report jobs, sync state)"""
+    pool = _get_pool()
+    if pool is not None:
+        return pool.acquire()
+    return _open_connection()
+
+def get_connection():
+    """Create and return a database connection
+    
+    With SQLite sharding on and a user bound (see use_user), this is the
+    user's shard; otherwise it is the main database.
+    """
+    shard = _current_shard.get()
+    if shard is not None:
+        return _get_shard_cache().acquire(shard)
+    return get_main_connection()
+
+# ============================================
+# READ REPLICA (off unless DATABASE_REPLICA_URL is set)
+# ============================================
+# Read-only controller functions call get_read_connection(), which hands out
+# a replica connection except:
+#   - while reads are pinned to the primary (pin_reads_to_primary) - the web
+#     app pins a user for READ_YOUR_WRITES_SECONDS after they write, so the
+#     page after a save never shows a lagging replica
+#   - with a shard bound (the replica mirrors the main database only)
+#   - for REPLICA_RETRY_SECONDS after the replica failed to connect
+# A PostgreSQL primary takes a PostgreSQL replica; a SQLite primary takes a
+# copy of its file (sqlite:///path or a plain path), opened read-only.
+
+_read_primary = contextvars.ContextVar('read_primary', default=False)
+_replica_target = None
+_replica_target_checked = False
+_replica_pool = None
+_replica_down_until = 0
+
+def _get_replica_target():
+    """('postgres', url), ('sqlite', path) or None when there is no usable replica"""
+    global _replica_target, _replica_target_checked
+    if _replica_target_checked:
+        return _replica_target
+    
+    url = DATABASE_REPLICA_URL
+    target = None
+    if url:
+        if url.startswith('postgres://'):
+            url = url.replace('postgres://', 'postgresql://', 1)
+        if url.startswith('postgresql://'):
+            target = ('postgres', url)
+        else:
+            target = ('sqlite', url[len('sqlite:///'):] if url.startswith('sqlite:///') else url)
+        if (target[0] == 'postgres') != bool(_get_database_url()):
+            print("⚠️ DATABASE_REPLICA_URL is not the same kind of database as the primary - ignoring it")
+            target = None
+    
+    _replica_target = target
+    _replica_target_checked = True
+    return target
+
+def _open_replica_connection(shared=False):
+    """Open a read-only connection to the replica"""
+    kind, location = _get_replica_target()
+    
+    if kind == 'postgres':
+        import psycopg2
         
-        return conn
+        conn = psycopg2.connect(location, connect_timeout=REPLICA_CONNECT_TIMEOUT)
+        conn.set_session(readonly=True)
+        return instrument(conn, 'postgres')
+    
+    # mode=ro fails instead of creating an empty database when the file is missing
+    uri = 'file:' + urllib.parse.quote(os.path.abspath(location)) + '?mode=ro'
+    conn = sqlite3.connect(uri, uri=True, timeout=REPLICA_CONNECT_TIMEOUT, check_same_thread=not shared)
+    conn.row_factory = sqlite3.Row
+    # Opening is lazy - touch the schema so a missing or broken file fails here
+    conn.execute('SELECT 1 FROM sqlite_master LIMIT 1')
+    return instrument(conn, 'sqlite')
+
+def _get_replica_pool():
+    global _replica_pool
+    if _pool_size <= 0:
+        return None
+    if _replica_pool is None or _replica_pool.pid != os.getpid():
+        with _pool_lock:
+            if _replica_pool is None or _replica_pool.pid != os.getpid():
+                _replica_pool = ConnectionPool(_pool_size, opener=_open_replica_connection)
+    return _replica_pool
+
+def replica_enabled():
+    return _get_replica_target() is not None
+
+def get_replica_status():
+    """Replica state for this process (None when no replica is configured)"""
+    if not replica_enabled():
+        return None
+    retry_in = _replica_down_until - time.monotonic()
+    return {'available': retry_in <= 0, 'retry_in_s': max(0, round(retry_in, 1))}
+
+def pin_reads_to_primary():
+    """Send this context's reads to the primary; returns a token for unpin_reads()"""
+    return _read_primary.set(True)
+
+def unpin_reads(token):
+    _read_primary.reset(token)
+
+@contextmanager
+def reads_from_primary():
+    """Run a block with its reads on the primary (it must see writes just made)"""
+    token = pin_reads_to_primary()
+    try:
+        yield
+    finally:
+        unpin_reads(token)
+
+def get_read_connection(main=False):
+    """Connection for read-only queries - the replica when there is a usable one, else as get_connection()
+    
+    main=True reads the main database (users) even when a shard is bound.
+    """
+    global _replica_down_until
+    if not main and _current_shard.get() is not None:
+        return get_connection()
+    if _read_primary.get() or not replica_enabled() or time.monotonic() < _replica_down_until:
+        return get_main_connection()
+    
+    try:
+        pool = _get_replica_pool()
+        if pool is not None:
+            return pool.acquire()
+        return _open_replica_connection()
+    except Exception as e:
+        _replica_down_until = time.monotonic() + REPLICA_RETRY_SECONDS
+        print(f"⚠️ Read replica unavailable ({e}) - reading from the primary for {REPLICA_RETRY_SECONDS:g}s")
+        return get_main_connection()
+
+# ============================================
+# SQLITE SHARDS (off unless SQLITE_SHARDS > 0)
+# ============================================
+# The main database keeps users, report jobs and sync state. Each user's
+# habits, logs, journal, rollup and change log live in
+# SHARD_DIR/shard_<n>.db with n = user_id % SQLITE_SHARDS, so users in
+# different shards never wait on the same SQLite write lock. Requests, jobs
+# and workers bind their user with use_user(); admin code that spans users
+# loops over shard_indexes() with use_shard().
+
+_current_shard = contextvars.ContextVar('current_shard', default=None)
+_shard_local = threading.local()
+_shards_ready = set()
+_shards_lock = threading.Lock()
+
+def sharding_enabled():
+    """Sharding applies to SQLite only"""
+    return SQLITE_SHARDS > 0 and not _get_database_url()
+
+def shard_for_user(user_id):
+    """Shard index for a user (None when sharding is off)"""
+    if user_id is None or not sharding_enabled():
+        return None
+    return int(user_id) % SQLITE_SHARDS
+
+def shard_indexes():
+    """Every shard, for fan-out ([None] - just the main database - when sharding is off)"""
+    return list(range(SQLITE_SHARDS)) if sharding_enabled() else [None]
+
+def current_shard():
+    return _current_shard.get()
+
+def bind_user(user_id):
+    """Route this context's get_connection() calls to a user's shard; returns a token for unbind()"""
+    return _current_shard.set(shard_for_user(user_id))
+
+def unbind(token):
+    _current_shard.reset(token)
+
+@contextmanager
+def use_user(user_id):
+    """with use_user(user_id): ... - run code against a user's data"""
+    token = bind_user(user_id)
+    try:
+        yield
+    finally:
+        unbind(token)
+
+@contextmanager
+def use_shard(index):
+    """with use_shard(index): ... - run code against one shard (None = main database)"""
+    token = _current_shard.set(index)
+    try:
+        yield
+    finally:
+        _current_shard.reset(token)
+
+def _shard_path(index):
+    return os.path.join(SHARD_DIR, f"shard_{index:03d}.db")
+
+def _open_shard(index):
+    """Open a shard file, creating its tables the first time this process sees it"""
+    if index not in _shards_ready:
+        with _shards_lock:
+            if index not in _shards_ready:
+                os.makedirs(SHARD_DIR, exist_ok=True)
+                conn = sqlite3.connect(_shard_path(index))
+                _create_user_tables_sqlite(conn.cursor(), reference_users=False)
+                conn.commit()
+                conn.close()
+                _shards_ready.add(index)
+    
+    conn = sqlite3.connect(_shard_path(index))
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON")
+    return instrument(conn, 'sqlite')
+
+class ShardCache:
+    """Per-thread LRU of open shard connections (SQLite handles are thread-bound)"""
+    
+    def __init__(self, capacity=SHARD_HANDLE_CACHE):
+        self.capacity = max(1, capacity)
+        self.pid = os.getpid()
+        self._entries = OrderedDict()  # shard index -> [connection, in_use]
+    
+    def acquire(self, index):
+        entry = self._entries.get(index)
+        if entry is not None and entry[1]:
+            # Nested use of the same shard on this thread - a private handle,
+            # so its close() cannot roll back the outer caller's transaction
+            return _open_shard(index)
+        if entry is None:
+            entry = self._entries[index] = [_open_shard(index), False]
+        entry[1] = True
+        self._entries.move_to_end(index)
+        self._evict()
+        return PooledConnection(self, entry[0])
+    
+    def release(self, conn):
+        for index, entry in self._entries.items():
+            if entry[0] is conn:
+                break
+        else:
+            _close_quietly(conn)
+            return
+        try:
+            conn.rollback()
+            entry[1] = False
+        except Exception:
+            del self._entries[index]
+            _close_quietly(conn)
+        self._evict()
+    
+    def _evict(self):
+        for index in list(self._entries):
+            if len(self._entries) <= self.capacity:
+                break
+            conn, in_use = self._entries[index]
+            if not in_use:
+                del self._entries[index]
+                _close_quietly(conn)
+
+def _get_shard_cache():
+    cache = getattr(_shard_local, 'cache', None)
+    if cache is None or cache.pid != os.getpid():
+        # Handles inherited through a fork belong to the parent - never reuse them
+        cache = _shard_local.cache = ShardCache()
+    return cache
+
+SHARDED_TABLES = ('habits', 'logs', 'journal_entries', 'user_daily_summary', 'change_log')
+
+def migrate_to_shards():
+    """Copy per-user rows from the main database into the shard files
+    
+    Safe to re-run (existing rows are kept). Returns {table: rows copied}.
+    """
+    if not sharding_enabled():
+        raise RuntimeError('Set SQLITE_SHARDS to a positive number to use sharding')
+    
+    counts = {table: 0 for table in SHARDED_TABLES}
+    for index in range(SQLITE_SHARDS):
+        conn = _open_shard(index)
+        cursor = conn.cursor()
+        cursor.execute('ATTACH DATABASE ? AS main_db', (DATABASE_PATH,))
+        try:
+            for table in SHARDED_TABLES:
+                # Match columns by name - older main databases added some with ALTER TABLE
+                cursor.execute(f'PRAGMA main_db.table_info({table})')
+                main_columns = {row[1] for row in cursor.fetchall()}
+                cursor.execute(f'PRAGMA main.table_info({table})')
+                columns = ', '.join(row[1] for row in cursor.fetchall() if row[1] in main_columns)
+                
+                if table == 'logs':
+                    where = f'habit_id IN (SELECT id FROM main_db.habits WHERE user_id % {SQLITE_SHARDS} = ?)'
+                else:
+                    where = f'user_id % {SQLITE_SHARDS} = ?'
+                cursor.execute(
+                    f'INSERT OR IGNORE INTO main.{table} ({columns}) SELECT {columns} FROM main_db.{table} WHERE {where}',
+                    (index,)
+                )
+                counts[table] += cursor.rowcount
+            conn.commit()
+        finally:
+            conn.rollback()
+            cursor.execute('DETACH DATABASE main_db')
+            conn.close()
+    return counts
+
+_cursor_names = itertools.count(1)
+
+def iter_query(sql, params=(), itersize=DB_ITERSIZE, main=False, replica=False):
+    """Yield the rows of a query without loading the whole result into memory
+    
+    PostgreSQL uses a named (server-side) cursor that fetches itersize rows per
+    round trip; SQLite reads the result with fetchmany(itersize). Rows support
+    both row[0] and row['column'] like the rest of the code base. The
+    connection stays open until the generator is exhausted or closed.
+    main=True reads the main database (users) even when a shard is bound;
+    replica=True reads through get_read_connection().
+    """
+    if replica:
+        conn = get_read_connection(main)
+    else:
+        conn = get_main_connection() if main else get_connection()
+    cursor = None
+    try:
+        if _get_database_url():
+            from psycopg2.extras import DictCursor
+            
+            cursor = conn.cursor(name=f"iter_query_{next(_cursor_names)}", cursor_factory=DictCursor)
+            cursor.itersize = itersize
+            cursor.execute(sql, params)
+            for row in cursor:
+                yield row
+        else:
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(itersize)
+                if not rows:
+                    break
+                yield from rows
+    finally:
+        if cursor is not None:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+        conn.close()
+
+def get_schema_version(conn):
+    """Return the schema version recorded in the database (0 if never initialized)"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute('SELECT version FROM schema_version')
+        row = cursor.fetchone()
+        return row[0] if row else 0
+    except Exception:
+        # Table missing - a fresh or pre-versioning database
+        conn.rollback()
+        return 0
+
+def _record_schema_version(cursor):
+    """Store SCHEMA_VERSION in the schema_version table"""
+    cursor.execute('CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)')
+    cursor.execute('DELETE FROM schema_version')
+    cursor.execute(f'INSERT INTO schema_version (version) VALUES ({SCHEMA_VERSION})')
+
+def _add_column(cursor, table, column, definition, is_postgres):
+    """ALTER TABLE ... ADD COLUMN for databases created before the column existed"""
+    if is_postgres:
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {definition}')
+        return
+    cursor.execute(f'PRAGMA table_info({table})')
+    if column not in [row[1] for row in cursor.fetchall()]:
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+def ensure_schema():
+    """Run init_db() once per process, and only if the stored schema version is behind"""
+    global _schema_checked
+    if _schema_checked:
+        return
+    
+    with _schema_lock:
+        if _schema_checked:
+            return
+        
+        conn = get_main_connection()
+        try:
+            current_version = get_schema_version(conn)
+        finally:
+            conn.close()
+        
+        if current_version < SCHEMA_VERSION:
+            print(f"📊 Schema version {current_version} -> {SCHEMA_VERSION}, initializing database...")
+            init_db()
+            _backfill(current_version)
+        else:
+            # Partitioning is switched on by config, and new periods keep arriving
+            from database.log_partitions import ensure_log_partitions
+            ensure_log_partitions()
+        
+        _schema_checked = True
+
+def _backfill(from_version):
+    """Populate derived tables and migrate existing rows for schema changes after from_version"""
+    if from_version < 3:
+        from database.daily_summary import rebuild_daily_summary
+        rows = rebuild_daily_summary()
+        print(f"📊 Daily summary rebuilt: {rows} rows")
+    if from_version < 5:
+        from database.change_log import seed_change_log
+        changes = seed_change_log()
+        print(f"🔄 Change log seeded: {changes} changes")
+    if from_version < 6:
+        from controllers.journal_controller import compress_journal_entries
+        result = compress_journal_entries()
+        print(f"📓 Journal entries compressed: {result['compressed']} of {result['checked']}")
+    if from_version < 7:
+        from controllers.habit_controller import compile_habit_schedules
+        habits = compile_habit_schedules()
+        print(f"📅 Habit schedules compiled: {habits} habits")
+    if 7 <= from_version < 9:
+        # Versions 7-8 read "monthly" as Mondays, "every 2 weeks" as twice a
+        # week and "daily except Sunday" as Sundays only
+        from controllers.habit_controller import compile_habit_schedules
+        habits = compile_habit_schedules(recompile=True)
+        print(f"📅 Habit schedules recompiled: {habits} habits")
+
+def _create_user_tables_sqlite(cursor, reference_users=True):
+    """Create the per-user tables on SQLite
+    
+    Shard files (see SQLITE SHARDS above) have no users table, so they are
+    created with reference_users=False.
+    """
+    users_fk = ''
+    if reference_users:
+        users_fk = ",\n            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE"
+    
+    # Create habits table with user_id
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS habits (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            frequency TEXT NOT NULL,
+            target_time TEXT,
+            icon TEXT,
+            motivation TEXT,
+            challenges TEXT,
+            ai_notes TEXT,
+            uid TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP{users_fk}
+        )
+    ''')
+    
+    # Create logs table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            habit_id INTEGER NOT NULL,
+            completed_date DATE NOT NULL,
+            mood TEXT,
+            note TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (habit_id) REFERENCES habits(id) ON DELETE CASCADE,
+            UNIQUE(habit_id, completed_date)
+        )
+    ''')
+    
+    # Create journal entries table with user_id
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS journal_entries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            entry_date DATE NOT NULL,
+            content TEXT NOT NULL,
+            content_compressed BLOB,
+            tags TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP{users_fk},
+            UNIQUE(user_id, entry_date)
+        )
+    ''')
+    # Long entries are stored compressed (see models/journal.py)
+    _add_column(cursor, 'journal_entries', 'content_compressed', 'BLOB', is_postgres=False)
+    
+    # Create daily rollup table (maintained alongside completions, habits and journal writes)
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS user_daily_summary (
+            user_id INTEGER NOT NULL,
+            summary_date DATE NOT NULL,
+            habits_due INTEGER NOT NULL DEFAULT 0,
+            habits_completed INTEGER NOT NULL DEFAULT 0,
+            mood_happy INTEGER NOT NULL DEFAULT 0,
+            mood_neutral INTEGER NOT NULL DEFAULT 0,
+            mood_stressed INTEGER NOT NULL DEFAULT 0,
+            journal_written INTEGER NOT NULL DEFAULT 0,
+            version INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, summary_date){users_fk}
+        )
+    ''')
+    
+    # Date-range scans across users (admin analytics)
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_daily_summary_date ON user_daily_summary (summary_date)')
+    _add_column(cursor, 'user_daily_summary', 'version', 'INTEGER NOT NULL DEFAULT 0', is_postgres=False)
+    
+    # Delta sync: stable habit ids, a per-user change feed and the client's sync cursors
+    _add_column(cursor, 'habits', 'uid', 'TEXT', is_postgres=False)
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_habits_uid ON habits (user_id, uid)')
+    
+    # Compiled frequency (models/schedule.py)
+    _add_column(cursor, 'habits', 'schedule', 'TEXT', is_postgres=False)
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            entity TEXT NOT NULL,
+            entity_key TEXT NOT NULL,
+            op TEXT NOT NULL,
+            origin TEXT,
+            changed_at TEXT NOT NULL{users_fk}
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_change_log_user_seq ON change_log (user_id, seq)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_change_log_key ON change_log (user_id, entity, entity_key)')
 
 def init_db():
     """Initialize database with tables"""
-    database_url = os.environ.get('DATABASE_URL')
+    database_url = _get_database_url()
     
     if database_url:
         # PostgreSQL initialization (for web version)
         import psycopg2
         
-        if database_url.startswith('postgres://'):
-            database_url = database_url.replace('postgres://', 'postgresql://', 1)
-        
         conn = psycopg2.connect(database_url)
         cursor = conn.cursor()
         
@@ -73,24 +751,29 @@ def init_db():
                 motivation TEXT,
                 challenges TEXT,
                 ai_notes TEXT,
+                uid TEXT,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
             )
         ''')
         
-        # Create logs table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS logs (
-                id SERIAL PRIMARY KEY,
-                habit_id INTEGER NOT NULL,
-                completed_date DATE NOT NULL,
-                mood TEXT,
-                note TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (habit_id) REFERENCES habits(id) ON DELETE CASCADE,
-                UNIQUE(habit_id, completed_date)
-            )
-        ''')
+        # Create logs table (range-partitioned by completed_date with LOGS_PARTITIONING)
+        from database.log_partitions import partitioning_enabled, prepare_log_partitions
+        if partitioning_enabled():
+            prepare_log_partitions(cursor)
+        else:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS logs (
+                    id SERIAL PRIMARY KEY,
+                    habit_id INTEGER NOT NULL,
+                    completed_date DATE NOT NULL,
+                    mood TEXT,
+                    note TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (habit_id) REFERENCES habits(id) ON DELETE CASCADE,
+                    UNIQUE(habit_id, completed_date)
+                )
+            ''')
         
         # Create journal entries table
         cursor.execute('''
@@ -99,6 +782,7 @@ def init_db():
                 user_id INTEGER NOT NULL,
                 entry_date DATE NOT NULL,
                 content TEXT NOT NULL,
+                content_compressed BYTEA,
                 tags TEXT,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -106,6 +790,86 @@ def init_db():
                 UNIQUE(user_id, entry_date)
             )
         ''')
+        # Long entries are stored compressed (see models/journal.py)
+        _add_column(cursor, 'journal_entries', 'content_compressed', 'BYTEA', is_postgres=True)
+        
+        # Create daily rollup table (maintained alongside completions, habits and journal writes)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS user_daily_summary (
+                user_id INTEGER NOT NULL,
+                summary_date DATE NOT NULL,
+                habits_due INTEGER NOT NULL DEFAULT 0,
+                habits_completed INTEGER NOT NULL DEFAULT 0,
+                mood_happy INTEGER NOT NULL DEFAULT 0,
+                mood_neutral INTEGER NOT NULL DEFAULT 0,
+                mood_stressed INTEGER NOT NULL DEFAULT 0,
+                journal_written INTEGER NOT NULL DEFAULT 0,
+                version INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, summary_date),
+                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+            )
+        ''')
+        
+        # Date-range scans across users (admin analytics)
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_daily_summary_date ON user_daily_summary (summary_date)')
+        _add_column(cursor, 'user_daily_summary', 'version', 'INTEGER NOT NULL DEFAULT 0', is_postgres=True)
+        
+        # Create report jobs table (background report generation)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS report_jobs (
+                id TEXT PRIMARY KEY,
+                user_id INTEGER NOT NULL,
+                start_date DATE NOT NULL,
+                end_date DATE NOT NULL,
+                status TEXT NOT NULL,
+                progress INTEGER DEFAULT 0,
+                error TEXT,
+                result TEXT,
+                created_at TIMESTAMP NOT NULL,
+                finished_at TIMESTAMP,
+                expires_at TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+            )
+        ''')
+        
+        # At most one active job per user and period - concurrent requests share it
+        cursor.execute('''
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_report_jobs_active
+            ON report_jobs (user_id, start_date, end_date)
+            WHERE status IN ('queued', 'running')
+        ''')
+        
+        # Delta sync: stable habit ids, a per-user change feed and the client's sync cursors
+        _add_column(cursor, 'habits', 'uid', 'TEXT', is_postgres=True)
+        cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_habits_uid ON habits (user_id, uid)')
+        
+        # Compiled frequency (models/schedule.py)
+        _add_column(cursor, 'habits', 'schedule', 'TEXT', is_postgres=True)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS change_log (
+                seq BIGSERIAL PRIMARY KEY,
+                user_id INTEGER NOT NULL,
+                entity TEXT NOT NULL,
+                entity_key TEXT NOT NULL,
+                op TEXT NOT NULL,
+                origin TEXT,
+                changed_at TEXT NOT NULL,
+                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_change_log_user_seq ON change_log (user_id, seq)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_change_log_key ON change_log (user_id, entity, entity_key)')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sync_state (
+                server_url TEXT PRIMARY KEY,
+                device_id TEXT NOT NULL,
+                pull_cursor INTEGER NOT NULL DEFAULT 0,
+                push_cursor INTEGER NOT NULL DEFAULT 0,
+                last_synced_at TIMESTAMP
+            )
+        ''')
+        
+        _record_schema_version(cursor)
         
         conn.commit()
         conn.close()
@@ -114,10 +878,7 @@ def init_db():
     else:
         # SQLite initialization (local development/desktop) - FIXED
         # Ensure directory exists first
-        database_dir = os.path.dirname(DATABASE_PATH)
-        if not os.path.exists(database_dir):
-            os.makedirs(database_dir, exist_ok=True)
-            print(f"📁 Created database directory: {database_dir}")
+        _ensure_database_dir()
         
         conn = sqlite3.connect(DATABASE_PATH)
         cursor = conn.cursor()
@@ -136,52 +897,47 @@ def init_db():
             )
         ''')
         
-        # Create habits table with user_id
+        # Per-user tables (habits, logs, journal, rollup, change log)
+        _create_user_tables_sqlite(cursor)
+        
+        # Create report jobs table (background report generation)
         cursor.execute('''
-            CREATE TABLE IF NOT EXISTS habits (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
+            CREATE TABLE IF NOT EXISTS report_jobs (
+                id TEXT PRIMARY KEY,
                 user_id INTEGER NOT NULL,
-                name TEXT NOT NULL,
-                frequency TEXT NOT NULL,
-                target_time TEXT,
-                icon TEXT,
-                motivation TEXT,
-                challenges TEXT,
-                ai_notes TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                start_date DATE NOT NULL,
+                end_date DATE NOT NULL,
+                status TEXT NOT NULL,
+                progress INTEGER DEFAULT 0,
+                error TEXT,
+                result TEXT,
+                created_at TIMESTAMP NOT NULL,
+                finished_at TIMESTAMP,
+                expires_at TIMESTAMP,
                 FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
             )
         ''')
         
-        # Create logs table
+        # At most one active job per user and period - concurrent requests share it
         cursor.execute('''
-            CREATE TABLE IF NOT EXISTS logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                habit_id INTEGER NOT NULL,
-                completed_date DATE NOT NULL,
-                mood TEXT,
-                note TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (habit_id) REFERENCES habits(id) ON DELETE CASCADE,
-                UNIQUE(habit_id, completed_date)
-            )
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_report_jobs_active
+            ON report_jobs (user_id, start_date, end_date)
+            WHERE status IN ('queued', 'running')
         ''')
         
-        # Create journal entries table with user_id
+        # Delta sync: the client's sync cursors
         cursor.execute('''
-            CREATE TABLE IF NOT EXISTS journal_entries (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                entry_date DATE NOT NULL,
-                content TEXT NOT NULL,
-                tags TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
-                UNIQUE(user_id, entry_date)
+            CREATE TABLE IF NOT EXISTS sync_state (
+                server_url TEXT PRIMARY KEY,
+                device_id TEXT NOT NULL,
+                pull_cursor INTEGER NOT NULL DEFAULT 0,
+                push_cursor INTEGER NOT NULL DEFAULT 0,
+                last_synced_at TIMESTAMP
             )
         ''')
         
+        _record_schema_version(cursor)
+        
         conn.commit()
         
         # Verify tables were created
@@ -0,0 +1,278 @@
+"""
+Per-user TF-IDF index of journal entries for "related entries"
+
+Each user's index is one .npz file under JOURNAL_INDEX_DIR holding the
+vocabulary, the entry dates and a sparse matrix of term counts (one row per
+entry). Saving or deleting an entry re-tokenizes just that entry and rewrites
+the file; the weighted matrix (sublinear tf x smoothed idf, stop words
+weighted 0, rows L2-normalized) is assembled lazily from the counts, so an
+idf that shifts with every new entry never has to be written back. A query is one sparse matrix-vector product
+plus a partial sort: milliseconds for years of entries.
+
+The index is derived data: writes that bypass the journal controller (sync,
+archive import) drop it, and a missing or unreadable file is rebuilt from
+journal_entries on the next query. Needs NumPy and SciPy; without them the
+feature is off and every hook here is a no-op.
+"""
+
+from database.db_helper import get_connection, shard_indexes, use_shard, use_user
+from models.journal import decompress_content
+from config import JOURNAL_INDEX_DIR, JOURNAL_INDEX_CACHE_SIZE
+from collections import OrderedDict, Counter
+import os
+import re
+import threading
+
+_TOKEN = re.compile(r"[^\W\d_]{2,}")
+
+# Scores below this are noise (a shared uncommon word or two)
+MIN_SIMILARITY = 0.15
+
+# Weighted 0 - with smoothed idf they would otherwise make every pair of entries look alike
+STOP_WORDS = frozenset('''
+    about after again all also am an and any are as at be because been before being but by can could
+    did do does doing for from had has have having he her here hers him his how if in into is it its
+    just me more most my no nor not of off on once only or other our ours out over own same she should
+    so some such than that the their theirs them then there these they this those through to too under
+    until up very was we were what when where which while who whom why will with would you your yours
+'''.split())
+
+_available = None
+_lock = threading.Lock()  # one writer per process; files are replaced atomically
+_cache = OrderedDict()  # user_id -> (file mtime_ns, _Index), most recently used last
+
+def similarity_available():
+    """True if NumPy and SciPy can be imported"""
+    global _available
+    if _available is None:
+        try:
+            import numpy  # noqa: F401
+            import scipy.sparse  # noqa: F401
+            _available = True
+        except ImportError:
+            print("⚠️ NumPy/SciPy not installed - related journal entries are off")
+            _available = False
+    return _available
+
+def _day(value):
+    """Entry dates are strings on SQLite and date objects on PostgreSQL"""
+    return str(value)[:10]
+
+def _index_path(user_id):
+    return os.path.join(JOURNAL_INDEX_DIR, f'user_{user_id}.npz')
+
+def _term_counts(text):
+    return Counter(_TOKEN.findall(text.lower()))
+
+class _Index:
+    def __init__(self, terms=(), rows=None):
+        self.terms = list(terms)
+        self.vocabulary = {term: column for column, term in enumerate(self.terms)}
+        self.rows = rows if rows is not None else {}  # date -> (columns, counts)
+        self._weighted = None  # (dates, normalized tf-idf CSR) until the next change
+
+    def set(self, day, text):
+        import numpy as np
+
+        counts = _term_counts(text)
+        columns = []
+        for term in counts:
+            if term not in self.vocabulary:
+                self.vocabulary[term] = len(self.terms)
+                self.terms.append(term)
+            columns.append(self.vocabulary[term])
+        self.rows[day] = (np.array(columns, dtype=np.int32), np.array(list(counts.values()), dtype=np.float32))
+        self._weighted = None
+
+    def remove(self, day):
+        if self.rows.pop(day, None) is not None:
+            self._weighted = None
+
+    def _matrix(self):
+        """(dates, counts CSR) with rows in date order"""
+        import numpy as np
+        from scipy.sparse import csr_matrix
+
+        dates = sorted(self.rows)
+        lengths = [len(self.rows[day][0]) for day in dates]
+        indptr = np.zeros(len(dates) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        if dates:
+            indices = np.concatenate([self.rows[day][0] for day in dates])
+            data = np.concatenate([self.rows[day][1] for day in dates])
+        else:
+            indices = np.zeros(0, dtype=np.int32)
+            data = np.zeros(0, dtype=np.float32)
+        return dates, csr_matrix((data, indices, indptr), shape=(len(dates), len(self.terms)))
+
+    def weighted(self):
+        """(dates, tf-idf CSR with unit-length rows)"""
+        if self._weighted is None:
+            import numpy as np
+            from scipy.sparse import diags
+
+            dates, matrix = self._matrix()
+            # Smoothed idf: a word in every entry still counts a little, so two
+            # entries sharing their words are related even when they are the only two
+            document_frequency = np.bincount(matrix.indices, minlength=matrix.shape[1])
+            idf = (np.log((1 + len(dates)) / (1 + document_frequency)) + 1).astype(np.float32)
+            idf[[column for column, term in enumerate(self.terms) if term in STOP_WORDS]] = 0
+            matrix.data = 1 + np.log(matrix.data)  # sublinear tf
+            matrix = (matrix @ diags(idf)).tocsr()
+            norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+            norms[norms == 0] = 1
+            matrix = (diags(1 / norms) @ matrix).tocsr()
+            self._weighted = (dates, matrix)
+        return self._weighted
+
+    def related(self, day, limit):
+        """[(date, score)] of the entries most similar to day, best first"""
+        import numpy as np
+
+        dates, matrix = self.weighted()
+        try:
+            row = dates.index(day)
+        except ValueError:
+            return []
+        scores = (matrix @ matrix[row].T).toarray().ravel()
+        scores[row] = 0
+        count = min(limit, len(dates) - 1)
+        if count <= 0:
+            return []
+        top = np.argpartition(-scores, count - 1)[:count]
+        top = top[np.argsort(-scores[top])]
+        return [(dates[i], round(float(scores[i]), 3)) for i in top if scores[i] >= MIN_SIMILARITY]
+
+    def save(self, path):
+        import numpy as np
+
+        dates, matrix = self._matrix()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp.npz"
+        np.savez(
+            temp_path,
+            terms=np.array(self.terms, dtype=str),
+            dates=np.array(dates, dtype=str),
+            indptr=matrix.indptr, indices=matrix.indices, counts=matrix.data
+        )
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        import numpy as np
+
+        with np.load(path, allow_pickle=False) as data:
+            indptr, indices, counts = data['indptr'], data['indices'], data['counts']
+            rows = {
+                str(day): (indices[indptr[i]:indptr[i + 1]], counts[indptr[i]:indptr[i + 1]])
+                for i, day in enumerate(data['dates'])
+            }
+            return cls(data['terms'].tolist(), rows)
+
+def _build(user_id):
+    """Index every journal entry of a user from the database"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT entry_date, content, content_compressed FROM journal_entries WHERE user_id = ?', (user_id,))
+    rows = cursor.fetchall()
+    conn.close()
+
+    index = _Index()
+    for entry_date, content, content_compressed in rows:
+        index.set(_day(entry_date), decompress_content(content, content_compressed))
+    return index
+
+def _remember(user_id, path, index):
+    _cache[user_id] = (os.stat(path).st_mtime_ns, index)
+    _cache.move_to_end(user_id)
+    while len(_cache) > JOURNAL_INDEX_CACHE_SIZE:
+        _cache.popitem(last=False)
+
+def _get_index(user_id):
+    """The user's index - from memory if the file has not changed, else from disk or the database"""
+    path = _index_path(user_id)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        mtime = None
+
+    cached = _cache.get(user_id)
+    if cached and cached[0] == mtime:
+        _cache.move_to_end(user_id)
+        return cached[1]
+
+    index = None
+    if mtime is not None:
+        try:
+            index = _Index.load(path)
+        except Exception as e:
+            print(f"⚠️ Journal index for user {user_id} unreadable ({e}), rebuilding")
+    if index is None:
+        index = _build(user_id)
+        index.save(path)
+    _remember(user_id, path, index)
+    return index
+
+def index_journal_entry(user_id, entry_date, content):
+    """(Re)index one entry after it was saved"""
+    if not similarity_available():
+        return
+    with _lock:
+        index = _get_index(user_id)
+        index.set(_day(entry_date), content)
+        index.save(_index_path(user_id))
+        _remember(user_id, _index_path(user_id), index)
+
+def unindex_journal_entry(user_id, entry_date):
+    """Remove one entry after it was deleted"""
+    if not similarity_available():
+        return
+    with _lock:
+        index = _get_index(user_id)
+        index.remove(_day(entry_date))
+        index.save(_index_path(user_id))
+        _remember(user_id, _index_path(user_id), index)
+
+def drop_journal_index(user_id):
+    """Forget a user's index; it is rebuilt from the database when next needed"""
+    with _lock:
+        _cache.pop(user_id, None)
+        try:
+            os.remove(_index_path(user_id))
+        except FileNotFoundError:
+            pass
+
+def related_entry_dates(user_id, entry_date, limit):
+    """[(entry_date, score)] of the user's entries most similar to entry_date, best first"""
+    if not similarity_available():
+        return []
+    with _lock:
+        index = _get_index(user_id)
+        return index.related(_day(entry_date), limit)
+
+def _rebuild(user_id):
+    with _lock:
+        index = _build(user_id)
+        index.save(_index_path(user_id))
+        _remember(user_id, _index_path(user_id), index)
+        return len(index.rows)
+
+def rebuild_journal_index(user_id=None):
+    """Rebuild the index from the database for one user, or for everyone; returns entries indexed"""
+    if not similarity_available():
+        return 0
+    if user_id is not None:
+        with use_user(user_id):
+            return _rebuild(user_id)
+
+    entry_count = 0
+    for shard in shard_indexes():
+        with use_shard(shard):
+            conn = get_connection()
+            cursor = conn.cursor()
+            cursor.execute('SELECT DISTINCT user_id FROM journal_entries')
+            user_ids = [row[0] for row in cursor.fetchall()]
+            conn.close()
+            for shard_user_id in user_ids:
+                entry_count += _rebuild(shard_user_id)
+    return entry_count
@@ -0,0 +1,377 @@
+"""
+Time-partitioned logs on PostgreSQL (off unless LOGS_PARTITIONING is 'month' or 'year')
+
+logs is range-partitioned on completed_date: one partition per month
+(logs_p2026_10) or year (logs_p2026), plus logs_default for dates outside
+them. A database created before partitioning is converted in place - the
+old table becomes logs_default and its rows move out as partitions are
+created. ensure_log_partitions() keeps partitions ready up to
+LOGS_PARTITIONS_AHEAD periods ahead; it runs at every process start and
+from "flask logs-maintain".
+
+archive_log_partitions() moves partitions that ended more than
+LOGS_ARCHIVE_AFTER_MONTHS ago into logs_cold - one zlib-compressed NDJSON
+payload per habit and period - and drops them, so the live table and its
+indexes only cover recent history. Streak and report lookups bound
+completed_date so the planner only visits recent partitions; readers of the
+full history add cold_logs().
+
+Everything here runs on psycopg2 only, hence the %s placeholders.
+"""
+
+from database.db_helper import get_connection
+from database.postgres_helper import is_postgres
+from config import LOGS_PARTITIONING, LOGS_PARTITIONS_AHEAD, LOGS_ARCHIVE_AFTER_MONTHS
+from datetime import date, datetime
+import json
+import re
+import zlib
+
+GRANULARITIES = ('month', 'year')
+LOG_COLUMNS = 'id, habit_id, completed_date, mood, note, created_at'
+
+_PARTITION_NAME = re.compile(r'^logs_p(\d{4})(?:_(\d{2}))?$')
+_MAINTENANCE_LOCK = 41_0001  # pg_advisory_xact_lock key - one maintainer at a time
+
+def partitioning_enabled():
+    return LOGS_PARTITIONING in GRANULARITIES and is_postgres()
+
+def _to_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], '%Y-%m-%d').date()
+
+# ============================================
+# PERIODS
+# ============================================
+
+def _granularity():
+    return 'year' if LOGS_PARTITIONING == 'year' else 'month'
+
+def _period_start(day, granularity=LOGS_PARTITIONING):
+    return date(day.year, 1, 1) if granularity == 'year' else date(day.year, day.month, 1)
+
+def _add_periods(start, count, granularity=LOGS_PARTITIONING):
+    if granularity == 'year':
+        return date(start.year + count, 1, 1)
+    months = start.year * 12 + start.month - 1 + count
+    return date(months // 12, months % 12 + 1, 1)
+
+def _partition_name(start, granularity=LOGS_PARTITIONING):
+    if granularity == 'year':
+        return f"logs_p{start.year}"
+    return f"logs_p{start.year}_{start.month:02d}"
+
+def _partition_bounds(name):
+    """(start, end) for a partition name, or None for logs_default and foreign tables"""
+    match = _PARTITION_NAME.match(name)
+    if not match:
+        return None
+    year, month = int(match.group(1)), match.group(2)
+    if month is None:
+        return date(year, 1, 1), date(year + 1, 1, 1)
+    start = date(year, int(month), 1)
+    return start, _add_periods(start, 1, 'month')
+
+# ============================================
+# SCHEMA
+# ============================================
+
+def _relkind(cursor, table):
+    cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (table,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+def _partitions(cursor):
+    """Names of the partitions currently attached to logs"""
+    cursor.execute(
+        '''
+        SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass('logs')
+        '''
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+def create_partitioned_logs(cursor):
+    """Create logs as a partitioned table, converting an existing plain one
+
+    Called from init_db() and ensure_log_partitions() with the maintenance
+    lock held. Conversion renames the old table to logs_default and attaches
+    it, so no rows are copied up front.
+    """
+    kind = _relkind(cursor, 'logs')
+    if kind == 'p':
+        return
+
+    if kind == 'r':
+        print("📊 Converting logs to a partitioned table...")
+        cursor.execute('ALTER TABLE logs RENAME TO logs_default')
+        # The partitioned table's constraints take over these names
+        cursor.execute('ALTER TABLE logs_default DROP CONSTRAINT IF EXISTS logs_pkey')
+        cursor.execute('ALTER TABLE logs_default DROP CONSTRAINT IF EXISTS logs_habit_id_fkey')
+        cursor.execute('ALTER INDEX IF EXISTS logs_habit_id_completed_date_key RENAME TO logs_default_habit_id_completed_date_key')
+        cursor.execute('ALTER TABLE logs_default ALTER COLUMN id DROP DEFAULT')
+    else:
+        cursor.execute('CREATE SEQUENCE IF NOT EXISTS logs_id_seq')
+
+    # The partition key has to be part of every unique constraint
+    cursor.execute('''
+        CREATE TABLE logs (
+            id INTEGER NOT NULL DEFAULT nextval('logs_id_seq'),
+            habit_id INTEGER NOT NULL,
+            completed_date DATE NOT NULL,
+            mood TEXT,
+            note TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (id, completed_date),
+            FOREIGN KEY (habit_id) REFERENCES habits(id) ON DELETE CASCADE,
+            UNIQUE (habit_id, completed_date)
+        ) PARTITION BY RANGE (completed_date)
+    ''')
+    cursor.execute('ALTER SEQUENCE logs_id_seq OWNED BY logs.id')
+
+    if kind == 'r':
+        cursor.execute('ALTER TABLE logs ATTACH PARTITION logs_default DEFAULT')
+    else:
+        cursor.execute('CREATE TABLE logs_default PARTITION OF logs DEFAULT')
+
+def create_cold_storage(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS logs_cold (
+            id SERIAL PRIMARY KEY,
+            habit_id INTEGER NOT NULL,
+            period_start DATE NOT NULL,
+            period_end DATE NOT NULL,
+            row_count INTEGER NOT NULL,
+            payload BYTEA NOT NULL,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (habit_id) REFERENCES habits(id) ON DELETE CASCADE
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_logs_cold_habit ON logs_cold (habit_id, period_start)')
+
+def _create_partition(cursor, start):
+    """Create one partition, moving any rows logs_default already holds for its range"""
+    end = _add_periods(start, 1)
+    name = _partition_name(start)
+    cursor.execute(f'CREATE TABLE {name} (LIKE logs INCLUDING DEFAULTS)')
+    cursor.execute(
+        f'''
+        WITH moved AS (
+            DELETE FROM logs_default WHERE completed_date >= %s AND completed_date < %s
+            RETURNING {LOG_COLUMNS}
+        )
+        INSERT INTO {name} ({LOG_COLUMNS}) SELECT {LOG_COLUMNS} FROM moved
+        ''',
+        (start, end)
+    )
+    moved = cursor.rowcount
+    cursor.execute(f"ALTER TABLE logs ATTACH PARTITION {name} FOR VALUES FROM ('{start}') TO ('{end}')")
+    print(f"📊 Created logs partition {name}" + (f" ({moved} rows moved from logs_default)" if moved else ''))
+    return name
+
+def prepare_log_partitions(cursor, ahead=LOGS_PARTITIONS_AHEAD, today=None):
+    """Partitioned logs, cold storage and partitions up to `ahead` periods from now
+
+    Past periods with rows in logs_default (a converted table, late
+    imports) get their partition too, so only future dates beyond the
+    partitions stay there. Returns the names of the partitions created.
+    The caller commits.
+    """
+    cursor.execute('SELECT pg_advisory_xact_lock(%s)', (_MAINTENANCE_LOCK,))
+    create_partitioned_logs(cursor)
+    create_cold_storage(cursor)
+
+    today = today or date.today()
+    current = _period_start(today)
+    periods = [_add_periods(current, offset) for offset in range(ahead + 1)]
+    cursor.execute(
+        f"SELECT DISTINCT CAST(date_trunc('{_granularity()}', completed_date) AS DATE) FROM logs_default WHERE completed_date < %s",
+        (current,)
+    )
+    periods += [row[0] for row in cursor.fetchall()]
+
+    existing = set(_partitions(cursor))
+    created = []
+    for period in sorted(periods):
+        if _partition_name(period) not in existing:
+            created.append(_create_partition(cursor, period))
+    return created
+
+def ensure_log_partitions(ahead=LOGS_PARTITIONS_AHEAD, today=None):
+    """Run prepare_log_partitions() in its own transaction (no-op unless partitioning is on)"""
+    if not partitioning_enabled():
+        return []
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        created = prepare_log_partitions(cursor, ahead, today)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return created
+
+# ============================================
+# COLD STORAGE
+# ============================================
+
+def _pack(rows):
+    lines = [
+        json.dumps({'completed_date': str(row[0]), 'mood': row[1], 'note': row[2], 'created_at': str(row[3]) if row[3] else None},
+                   ensure_ascii=False)
+        for row in rows
+    ]
+    return zlib.compress('\n'.join(lines).encode('utf-8'), 9)
+
+def _unpack(payload):
+    return [json.loads(line) for line in zlib.decompress(bytes(payload)).decode('utf-8').split('\n') if line]
+
+def _store_cold(cursor, rows, granularity=LOGS_PARTITIONING):
+    """Write (habit_id, completed_date, mood, note, created_at) rows to logs_cold, one payload per habit and period
+
+    A late completion (sync, import) can reach logs_default for a period
+    that is already archived; it is merged into that period's payload, and
+    a day already archived keeps its archived record, so no day is stored
+    twice.
+    """
+    groups = {}
+    for row in rows:
+        start = _period_start(_to_date(row[1]), granularity)
+        groups.setdefault((row[0], start), []).append(row[1:])
+
+    for (habit_id, start), habit_rows in groups.items():
+        cursor.execute(
+            'SELECT id, payload FROM logs_cold WHERE habit_id = %s AND period_start = %s ORDER BY id FOR UPDATE',
+            (habit_id, start)
+        )
+        stored = cursor.fetchall()
+
+        by_day = {}
+        for _, payload in stored:
+            for record in _unpack(payload):
+                by_day.setdefault(str(record['completed_date']), (
+                    record['completed_date'], record.get('mood'), record.get('note'), record.get('created_at')
+                ))
+        for row in habit_rows:
+            by_day.setdefault(str(row[0]), row)
+        merged = [by_day[day] for day in sorted(by_day)]
+
+        if stored:
+            cursor.execute(
+                'UPDATE logs_cold SET row_count = %s, payload = %s, archived_at = CURRENT_TIMESTAMP WHERE id = %s',
+                (len(merged), _pack(merged), stored[0][0])
+            )
+            if len(stored) > 1:
+                # Payloads written twice for one period before this merge existed
+                cursor.execute('DELETE FROM logs_cold WHERE id = ANY(%s)', ([row[0] for row in stored[1:]],))
+        else:
+            cursor.execute(
+                'INSERT INTO logs_cold (habit_id, period_start, period_end, row_count, payload) VALUES (%s, %s, %s, %s, %s)',
+                (habit_id, start, _add_periods(start, 1, granularity), len(merged), _pack(merged))
+            )
+    return len(groups)
+
+def archive_log_partitions(after_months=LOGS_ARCHIVE_AFTER_MONTHS, today=None):
+    """Move log partitions that ended more than after_months ago into logs_cold
+
+    Old rows that landed in logs_default (imports, synced history) go too.
+    Each partition is detached, packed and dropped in one transaction.
+    Returns {'partitions': [...], 'rows': n, 'payloads': n}.
+    """
+    result = {'partitions': [], 'rows': 0, 'payloads': 0}
+    if not partitioning_enabled():
+        return result
+
+    today = today or date.today()
+    cutoff = _period_start(_add_periods(date(today.year, today.month, 1), -after_months, 'month'))
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('SELECT pg_advisory_xact_lock(%s)', (_MAINTENANCE_LOCK,))
+        expired = sorted(
+            name for name in _partitions(cursor)
+            if _partition_bounds(name) and _partition_bounds(name)[1] <= cutoff
+        )
+        conn.commit()
+
+        for name in expired:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', (_MAINTENANCE_LOCK,))
+            cursor.execute(f'ALTER TABLE logs DETACH PARTITION {name}')
+            cursor.execute(f'SELECT habit_id, completed_date, mood, note, created_at FROM {name}')
+            rows = cursor.fetchall()
+            result['payloads'] += _store_cold(cursor, rows)
+            cursor.execute(f'DROP TABLE {name}')
+            conn.commit()
+            result['partitions'].append(name)
+            result['rows'] += len(rows)
+            print(f"🧊 Archived {name}: {len(rows)} rows")
+
+        cursor.execute('SELECT pg_advisory_xact_lock(%s)', (_MAINTENANCE_LOCK,))
+        cursor.execute(
+            'DELETE FROM logs_default WHERE completed_date < %s RETURNING habit_id, completed_date, mood, note, created_at',
+            (cutoff,)
+        )
+        rows = cursor.fetchall()
+        if rows:
+            result['payloads'] += _store_cold(cursor, rows)
+            result['rows'] += len(rows)
+            print(f"🧊 Archived {len(rows)} old rows from logs_default")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return result
+
+def cold_logs(cursor, habit_id, start_date=None, end_date=None):
+    """A habit's archived completions (dicts, oldest first), optionally within a date range"""
+    if not partitioning_enabled():
+        return []
+
+    conditions = ['habit_id = %s']
+    params = [habit_id]
+    if start_date is not None:
+        conditions.append('period_end > %s')
+        params.append(start_date)
+    if end_date is not None:
+        conditions.append('period_start <= %s')
+        params.append(end_date)
+    cursor.execute(
+        f"SELECT payload FROM logs_cold WHERE {' AND '.join(conditions)} ORDER BY period_start",
+        params
+    )
+
+    records = []
+    seen = set()
+    for row in cursor.fetchall():
+        for record in _unpack(row[0]):
+            day = _to_date(record['completed_date'])
+            # A day can sit in two payloads written before _store_cold merged them
+            if day in seen:
+                continue
+            if (start_date is None or day >= _to_date(start_date)) and (end_date is None or day <= _to_date(end_date)):
+                seen.add(day)
+                records.append(dict(record, habit_id=habit_id))
+    return records
+
+def cold_log_count(cursor, habit_id):
+    """Number of a habit's archived completions"""
+    if not partitioning_enabled():
+        return 0
+    cursor.execute('SELECT COALESCE(SUM(row_count), 0) FROM logs_cold WHERE habit_id = %s', (habit_id,))
+    return cursor.fetchone()[0]
+
+def archived_before(cursor):
+    """Day before which completions may live in logs_cold (None if nothing is archived)"""
+    if not partitioning_enabled():
+        return None
+    cursor.execute('SELECT MAX(period_end) FROM logs_cold')
+    row = cursor.fetchone()
+    return row[0] if row else None
@@ -0,0 +1,244 @@
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+from config import (
+    SLOW_QUERY_THRESHOLD_MS, SLOW_QUERY_LOG_PATH,
+    SLOW_QUERY_LOG_MAX_BYTES, SLOW_QUERY_LOG_BACKUPS
+)
+
+_logger = None
+_logger_lock = threading.Lock()
+
+# Statement shapes we already captured a query plan for (per process)
+_explained_shapes = set()
+_explained_lock = threading.Lock()
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'\(\s*(?:\?|%s)(?:\s*,\s*(?:\?|%s))*\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+_EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+
+CONTROLLERS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'controllers')
+
+
+def normalize_sql(sql):
+    """Collapse a statement to its shape: literals become ?, whitespace is squashed"""
+    normalized = _STRING_LITERAL.sub('?', sql)
+    normalized = _NUMBER_LITERAL.sub('?', normalized)
+    normalized = _PLACEHOLDER_LIST.sub('(?)', normalized)
+    return _WHITESPACE.sub(' ', normalized).strip()
+
+
+def params_shape(params):
+    """Describe parameters by type only - never log the actual values"""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: type(value).__name__ for key, value in params.items()}
+    return [type(value).__name__ for value in params]
+
+
+def find_caller():
+    """Return 'module.function' of the nearest controller frame on the stack"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if filename.startswith(CONTROLLERS_DIR):
+            module = os.path.splitext(os.path.basename(filename))[0]
+            return f"{module}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+def _get_logger():
+    """Create the rotating slow query logger on first use"""
+    global _logger
+    if _logger is None:
+        with _logger_lock:
+            if _logger is None:
+                os.makedirs(os.path.dirname(SLOW_QUERY_LOG_PATH), exist_ok=True)
+                logger = logging.getLogger('habit_recoder.slow_queries')
+                logger.setLevel(logging.INFO)
+                logger.propagate = False
+                handler = RotatingFileHandler(
+                    SLOW_QUERY_LOG_PATH,
+                    maxBytes=SLOW_QUERY_LOG_MAX_BYTES,
+                    backupCount=SLOW_QUERY_LOG_BACKUPS,
+                    encoding='utf-8'
+                )
+                handler.setFormatter(logging.Formatter('%(message)s'))
+                logger.addHandler(handler)
+                _logger = logger
+    return _logger
+
+
+def _explain(raw_conn, dialect, sql, params):
+    """Capture the query plan for a statement without executing it"""
+    if not sql.lstrip().upper().startswith(_EXPLAINABLE):
+        return None
+
+    cursor = raw_conn.cursor()
+    try:
+        if dialect == 'postgres':
+            # A failed EXPLAIN would abort the caller's transaction, so fence it
+            cursor.execute('SAVEPOINT slow_query_explain')
+            try:
+                cursor.execute('EXPLAIN ' + sql, params)
+                plan = [row[0] for row in cursor.fetchall()]
+            except Exception:
+                cursor.execute('ROLLBACK TO SAVEPOINT slow_query_explain')
+                raise
+            cursor.execute('RELEASE SAVEPOINT slow_query_explain')
+            return plan
+
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return [row[-1] for row in cursor.fetchall()]
+    except Exception as e:
+        return [f"EXPLAIN failed: {e}"]
+    finally:
+        cursor.close()
+
+
+def record_statement(raw_conn, dialect, sql, params, duration_ms):
+    """Log a statement if it crossed the slow query threshold"""
+    if duration_ms < SLOW_QUERY_THRESHOLD_MS:
+        return
+
+    shape = normalize_sql(sql)
+    entry = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'dialect': dialect,
+        'duration_ms': round(duration_ms, 2),
+        'sql': shape,
+        'params': params_shape(params),
+        'caller': find_caller(),
+    }
+
+    with _explained_lock:
+        first_seen = shape not in _explained_shapes
+        _explained_shapes.add(shape)
+    if first_seen:
+        entry['plan'] = _explain(raw_conn, dialect, sql, params if params is not None else ())
+
+    try:
+        _get_logger().info(json.dumps(entry, default=str))
+    except Exception as e:
+        print(f"⚠️ Could not write slow query log: {e}")
+
+
+def read_slow_query_log(limit=200):
+    """Return the most recent slow query entries (newest first) across rotated files"""
+    entries = []
+    paths = [SLOW_QUERY_LOG_PATH] + [f"{SLOW_QUERY_LOG_PATH}.{i}" for i in range(1, SLOW_QUERY_LOG_BACKUPS + 1)]
+
+    for path in paths:
+        if len(entries) >= limit:
+            break
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding='utf-8') as f:
+            lines = f.readlines()
+        for line in reversed(lines):
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue
+            if len(entries) >= limit:
+                break
+
+    return entries
+
+
+class InstrumentedCursor:
+    """Cursor wrapper that times every statement and reports the slow ones"""
+
+    def __init__(self, cursor, connection):
+        self._cursor = cursor
+        self._connection = connection
+
+    def execute(self, sql, params=None):
+        start = time.perf_counter()
+        try:
+            if params is None:
+                return self._cursor.execute(sql)
+            return self._cursor.execute(sql, params)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            self._connection._record(sql, params, duration_ms)
+
+    def executemany(self, sql, seq_of_params):
+        start = time.perf_counter()
+        try:
+            return self._cursor.executemany(sql, seq_of_params)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            self._connection._record(sql, None, duration_ms)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._cursor.close()
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class InstrumentedConnection:
+    """Connection wrapper that hands out instrumented cursors"""
+
+    def __init__(self, conn, dialect):
+        self._conn = conn
+        self._dialect = dialect
+
+    def _record(self, sql, params, duration_ms):
+        if duration_ms >= SLOW_QUERY_THRESHOLD_MS:
+            record_statement(self._conn, self._dialect, sql, params, duration_ms)
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self._conn.cursor(*args, **kwargs), self)
+
+    def execute(self, sql, params=None):
+        """sqlite3 shortcut - conn.execute() returns a cursor"""
+        cursor = self.cursor()
+        cursor.execute(sql, params)
+        return cursor
+
+    @property
+    def raw(self):
+        return self._conn
+
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return self._conn.__exit__(exc_type, exc, tb)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name, value):
+        if name.startswith('_'):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._conn, name, value)
+
+
+def instrument(conn, dialect):
+    """Wrap a DB-API connection when slow query logging is enabled"""
+    if SLOW_QUERY_THRESHOLD_MS <= 0:
+        return conn
+    return InstrumentedConnection(conn, dialect)
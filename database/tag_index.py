@@ -0,0 +1,130 @@
+"""
+Per-user tag index for autocomplete and the journal tag list
+
+Journal tags are a comma-separated string per entry, so listing or matching
+them used to mean re-splitting every entry. The index keeps, per user, the
+distinct tags as a sorted array of (lowercase, tag) with a usage count per
+tag: a prefix lookup is two bisects, and the top matches by usage come from
+heapq.nlargest over that slice.
+
+Indexes live in process memory, built on first use. Each carries the user's
+change_log seq it reflects; a lookup compares it with the current MAX(seq)
+(an index-only read), so writes from other processes - or by sync and
+archive import - cause a rebuild, while journal saves in this process patch
+the index in place (apply_tag_changes).
+"""
+
+from database.db_helper import get_connection
+from config import TAG_INDEX_CACHE_SIZE
+from collections import Counter, OrderedDict
+import bisect
+import heapq
+import threading
+
+_lock = threading.Lock()
+_cache = OrderedDict()  # user_id -> _TagIndex, most recently used last
+
+def split_tags(tags):
+    """Tags of an entry's comma-separated tag string, without blanks"""
+    if not tags:
+        return []
+    return [tag for tag in (tag.strip() for tag in tags.split(',')) if tag]
+
+def tags_version(cursor, user_id):
+    """The user's latest change_log seq - changes whenever any of their data does"""
+    cursor.execute('SELECT MAX(seq) FROM change_log WHERE user_id = ?', (user_id,))
+    return cursor.fetchone()[0] or 0
+
+def write_versions(cursor, user_id):
+    """(version before, version after) the change just recorded in this transaction"""
+    after = tags_version(cursor, user_id)
+    cursor.execute('SELECT MAX(seq) FROM change_log WHERE user_id = ? AND seq < ?', (user_id, after))
+    return cursor.fetchone()[0] or 0, after
+
+class _TagIndex:
+    def __init__(self, counts, version):
+        self.counts = counts  # tag -> number of entries using it
+        self.keys = sorted((tag.lower(), tag) for tag in counts)
+        self.version = version
+
+    def add(self, tag, delta):
+        count = self.counts.get(tag, 0) + delta
+        if count > 0:
+            if tag not in self.counts:
+                bisect.insort(self.keys, (tag.lower(), tag))
+            self.counts[tag] = count
+        elif tag in self.counts:
+            del self.counts[tag]
+            del self.keys[bisect.bisect_left(self.keys, (tag.lower(), tag))]
+
+    def complete(self, prefix, limit):
+        """[(tag, count)] of tags starting with prefix (any case), most used first"""
+        prefix = prefix.lower()
+        start = bisect.bisect_left(self.keys, (prefix,))
+        end = bisect.bisect_left(self.keys, (prefix + '\U0010ffff',), start)
+        # nlargest is stable, so ties stay in alphabetical order
+        top = heapq.nlargest(limit, self.keys[start:end], key=lambda key: self.counts[key[1]])
+        return [(tag, self.counts[tag]) for _, tag in top]
+
+def _build(cursor, user_id, version):
+    cursor.execute('SELECT tags FROM journal_entries WHERE user_id = ? AND tags IS NOT NULL', (user_id,))
+    counts = Counter()
+    for row in cursor.fetchall():
+        counts.update(set(split_tags(row[0])))
+    return _TagIndex(dict(counts), version)
+
+def _get_index(user_id):
+    """The user's index, rebuilt if their data changed since it was built"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        version = tags_version(cursor, user_id)
+        with _lock:
+            index = _cache.get(user_id)
+            if index is not None and index.version == version:
+                _cache.move_to_end(user_id)
+                return index
+
+        index = _build(cursor, user_id, version)
+        if tags_version(cursor, user_id) != version:
+            index.version = None  # written to while reading - use it once, rebuild next time
+    finally:
+        conn.close()
+
+    with _lock:
+        _cache[user_id] = index
+        _cache.move_to_end(user_id)
+        while len(_cache) > TAG_INDEX_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return index
+
+def apply_tag_changes(user_id, old_tags, new_tags, versions):
+    """Patch the cached index after a journal write changed an entry's tags
+
+    versions is write_versions() read in the write's transaction; if the
+    cached index is not at the version before it, something else changed in
+    between and the index is left to rebuild.
+    """
+    version_before, version_after = versions
+    with _lock:
+        index = _cache.get(user_id)
+        if index is None or index.version != version_before:
+            return
+        old, new = set(split_tags(old_tags)), set(split_tags(new_tags))
+        for tag in old - new:
+            index.add(tag, -1)
+        for tag in new - old:
+            index.add(tag, 1)
+        index.version = version_after
+
+def complete_tags(user_id, prefix, limit):
+    """[(tag, count)] of the user's tags starting with prefix, most used first"""
+    index = _get_index(user_id)
+    with _lock:
+        return index.complete(prefix, limit)
+
+def list_tags(user_id):
+    """The user's distinct tags, sorted"""
+    index = _get_index(user_id)
+    with _lock:
+        return sorted(index.counts)
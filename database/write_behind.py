@@ -0,0 +1,157 @@
+"""
+Write-behind queue for habit completions (off unless WRITE_BEHIND_ENABLED)
+
+mark_habit_complete() normally pays a connect + INSERT + COMMIT per click,
+i.e. one fsync on SQLite or one round trip on PostgreSQL. With the queue on,
+completions are group-committed: a click adds its completion to the queue
+and then flushes it, and clicks that arrive while another flush is writing
+wait for it and go out together in the next transaction. Under a burst one
+commit covers many clicks; a lone click costs what a direct write does.
+
+A click only returns once its completion is committed, and reports whether
+it was actually written, so the page shown after it - served by any
+gunicorn worker - already includes it, and a worker killed at max_requests
+or on timeout loses nothing. pending() covers the moment between queueing
+and committing for readers in the same process.
+"""
+
+from database.db_helper import get_connection, current_shard, use_shard
+from config import WRITE_BEHIND_ENABLED
+import threading
+
+_enabled = WRITE_BEHIND_ENABLED
+
+_pending = {}  # (shard, habit_id, day) -> (mood, note); habit ids are only unique within a shard
+_condition = threading.Condition()
+_flush_lock = threading.Lock()  # one writer at a time
+_outcomes = {}  # key -> written? - left by whichever flush wrote it, for the click waiting on it
+_stats = {'completions': 0, 'commits': 0, 'dropped': 0}
+
+def configure_write_behind(enabled):
+    """Turn the queue on/off for this process (flushes anything pending first)"""
+    global _enabled
+    flush()
+    _enabled = enabled
+
+def is_enabled():
+    return _enabled
+
+def get_write_behind_stats():
+    """Counters for this process: completions written, commits, dropped duplicates, pending"""
+    with _condition:
+        return dict(_stats, pending=len(_pending))
+
+def enqueue_completion(habit_id, day, mood=None, note=None):
+    """Write a completion with whatever else is queued; returns whether it was written
+
+    Returns once the completion is committed. False when one is already
+    pending or stored for that day, or when its row could not be written
+    (e.g. the habit was deleted meanwhile).
+    """
+    with _condition:
+        key = (current_shard(), habit_id, day)
+        if key in _pending:
+            return False
+        _pending[key] = (mood, note)
+    # Waits while another flush is writing, then writes everything queued meanwhile
+    try:
+        flush()
+    except Exception:
+        # Not written - let the next click queue it again
+        with _condition:
+            if _pending.get(key) == (mood, note):
+                del _pending[key]
+            _outcomes.pop(key, None)
+        raise
+    with _condition:
+        return _outcomes.pop(key, False)
+
+def pending(habit_id):
+    """Dates with a not-yet-written completion for a habit"""
+    shard = current_shard()
+    with _condition:
+        return {day for pending_shard, pending_habit, day in _pending if pending_shard == shard and pending_habit == habit_id}
+
+def _write(cursor, habit_id, day, mood, note):
+    """INSERT one completion plus its rollup and change-log rows; False if it already existed"""
+    from database.daily_summary import record_completion
+    from database.change_log import record_log_change
+
+    cursor.execute(
+        'INSERT INTO logs (habit_id, completed_date, mood, note) VALUES (?, ?, ?, ?) '
+        'ON CONFLICT (habit_id, completed_date) DO NOTHING',
+        (habit_id, day, mood, note)
+    )
+    if not cursor.rowcount:
+        return False
+    record_completion(cursor, habit_id, day, mood)
+    record_log_change(cursor, habit_id, day)
+    return True
+
+def _write_batch(batch):
+    """Write one shard's completions in one transaction; returns (keys written, dropped, commits)"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    written = set()
+    dropped = commits = 0
+    try:
+        try:
+            for key, (mood, note) in batch:
+                if _write(cursor, key[1], key[2], mood, note):
+                    written.add(key)
+                else:
+                    dropped += 1
+            conn.commit()
+            commits = 1
+        except Exception as e:
+            # One bad row (e.g. its habit was deleted) must not sink the rest
+            conn.rollback()
+            print(f"⚠️ Write-behind batch failed ({e}), retrying one by one")
+            written = set()
+            dropped = 0
+            for key, (mood, note) in batch:
+                try:
+                    if _write(cursor, key[1], key[2], mood, note):
+                        written.add(key)
+                    else:
+                        dropped += 1
+                    conn.commit()
+                    commits += 1
+                except Exception:
+                    conn.rollback()
+                    dropped += 1
+    finally:
+        conn.close()
+    return written, dropped, commits
+
+def flush():
+    """Write every pending completion (one transaction per shard); returns how many were written"""
+    with _flush_lock:
+        with _condition:
+            if not _pending:
+                return 0
+            batch = list(_pending.items())
+
+        by_shard = {}
+        for key, value in batch:
+            by_shard.setdefault(key[0], []).append((key, value))
+
+        written = set()
+        dropped = commits = 0
+        for shard, shard_batch in by_shard.items():
+            with use_shard(shard):
+                shard_written, shard_dropped, shard_commits = _write_batch(shard_batch)
+            written |= shard_written
+            dropped += shard_dropped
+            commits += shard_commits
+
+        # Only now are the rows visible to readers, so only now leave the overlay
+        with _condition:
+            for key, value in batch:
+                if _pending.get(key) == value:
+                    del _pending[key]
+                    _outcomes[key] = key in written
+            _stats['completions'] += len(written)
+            _stats['commits'] += commits
+            _stats['dropped'] += dropped
+        return len(written)
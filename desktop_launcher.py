@@ -1,25 +1,81 @@
 """
 Habit Re:coder - Desktop Launcher
-Automatically opens the app in default browser
+Serves the app on an embedded multi-threaded WSGI server (waitress) and
+opens the default browser as soon as the server socket accepts connections
 """
 
-import webbrowser
 import time
-import threading
-import sys
+
+# Measured from here so launch-to-interactive includes the app import
+LAUNCH_STARTED = time.perf_counter()
+
 import os
+import socket
+import sys
+import threading
+import webbrowser
+
+from waitress.server import create_server
 
 # Import the app DIRECTLY (not as subprocess)
 from app_desktop import app
 
-def open_browser():
-    """Wait for server to start, then open browser"""
-    print("⏳ Waiting for server to start...")
-    time.sleep(2)
-    print("🌐 Opening browser...")
-    webbrowser.open('http://127.0.0.1:5000')
+HOST = '127.0.0.1'
+PREFERRED_PORT = int(os.environ.get('HABIT_RECODER_PORT', '5000'))
+SERVER_THREADS = int(os.environ.get('HABIT_RECODER_THREADS', '4'))
+OPEN_BROWSER = os.environ.get('HABIT_RECODER_NO_BROWSER') is None
+READY_TIMEOUT = 10
 
-if __name__ == '__main__':
+
+class FirstResponseTimer:
+    """WSGI middleware that reports launch-to-interactive on the first request"""
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+        self.reported = False
+
+    def __call__(self, environ, start_response):
+        result = self.wsgi_app(environ, start_response)
+        if not self.reported:
+            self.reported = True
+            elapsed_ms = (time.perf_counter() - LAUNCH_STARTED) * 1000
+            print(f"⚡ Interactive {elapsed_ms:.0f} ms after launch", flush=True)
+        return result
+
+
+def create_desktop_server():
+    """Bind the preferred port, or any free port if it is taken"""
+    wsgi_app = FirstResponseTimer(app)
+    try:
+        return create_server(wsgi_app, host=HOST, port=PREFERRED_PORT, threads=SERVER_THREADS)
+    except OSError:
+        print(f"ℹ️ Port {PREFERRED_PORT} is busy, picking a free port...")
+        return create_server(wsgi_app, host=HOST, port=0, threads=SERVER_THREADS)
+
+
+def wait_until_ready(port, timeout=READY_TIMEOUT):
+    """Block until the server socket accepts a connection"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((HOST, port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.01)
+    return False
+
+
+def open_browser(url, port):
+    """Open the browser the moment the server is accepting"""
+    if wait_until_ready(port):
+        elapsed_ms = (time.perf_counter() - LAUNCH_STARTED) * 1000
+        print(f"🌐 Server ready after {elapsed_ms:.0f} ms - opening browser...", flush=True)
+        webbrowser.open(url)
+    else:
+        print(f"⚠️ Server did not become ready - open {url} manually", flush=True)
+
+
+def main():
     print("=" * 60)
     print("🎯 HABIT RE:CODER - DESKTOP EDITION")
     print("=" * 60)
@@ -33,13 +89,23 @@ if __name__ == '__main__':
     print("  • Press Ctrl+C")
     print("=" * 60)
     print()
-    
-    # Open browser in separate thread
-    threading.Thread(target=open_browser, daemon=True).start()
-    
-    # Run Flask app
+
+    # The socket is bound and listening as soon as the server is created
+    server = create_desktop_server()
+    url = f"http://{HOST}:{server.effective_port}"
+    print(f"🚀 Serving on {url}", flush=True)
+
+    if OPEN_BROWSER:
+        threading.Thread(target=open_browser, args=(url, server.effective_port), daemon=True).start()
+
     try:
-        app.run(debug=False, use_reloader=False, port=5000, host='127.0.0.1')
+        server.run()
     except KeyboardInterrupt:
         print("\n\n👋 Habit Re:coder closed. Goodbye!")
-        sys.exit(0)
\ No newline at end of file
+    finally:
+        server.close()
+    sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
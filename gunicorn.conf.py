@@ -0,0 +1,90 @@
+"""
+Gunicorn settings for the web app (gunicorn -c gunicorn.conf.py app:app)
+
+Gunicorn also picks this file up by itself when started from the repo
+directory. Everything can be overridden with environment variables or on the
+command line:
+
+    GUNICORN_WORKER_CLASS   sync, gthread (default) or gevent (pip install gevent)
+    WEB_CONCURRENCY         worker processes (default: sized from the CPU count)
+    GUNICORN_MAX_WORKERS    cap for the automatic worker count (default 4 - each worker
+                            is a full copy of the app, and small instances are short on RAM)
+    GUNICORN_THREADS        threads per gthread worker (default 4)
+    GUNICORN_MAX_REQUESTS   recycle a worker after this many requests (default 1000, 0 = never)
+    GUNICORN_TIMEOUT        seconds a request may take before its worker is restarted (default 60)
+    GUNICORN_KEEPALIVE      seconds to hold an idle keep-alive connection (default 75)
+
+The app is loaded once in the master and the workers are forked from it:
+the schema check runs once instead of once per worker, pooled database
+connections are closed before forking and dropped in each worker after it
+(post_fork), and gc.freeze() keeps the loaded app's objects in memory pages
+that the workers share instead of copying.
+"""
+
+import gc
+import multiprocessing
+import os
+
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+
+_cpus = multiprocessing.cpu_count()
+if worker_class == 'sync':
+    # One request per process - the classic 2 x cores + 1
+    _workers = 2 * _cpus + 1
+else:
+    # Threads or greenlets handle the concurrency; a process per core uses the CPUs
+    _workers = _cpus + 1
+workers = int(os.environ.get('WEB_CONCURRENCY') or min(_workers, int(os.environ.get('GUNICORN_MAX_WORKERS', '4'))))
+threads = int(os.environ.get('GUNICORN_THREADS', '4')) if worker_class == 'gthread' else 1
+worker_connections = 1000  # gevent: concurrent greenlets per worker
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+# gevent patches the standard library when a worker starts, which is too late
+# for modules the master already imported - so gevent workers load the app themselves
+preload_app = worker_class != 'gevent'
+
+# Recycle workers to cap slow memory growth; the jitter keeps them from restarting together
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '1000'))
+max_requests_jitter = max_requests // 10
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '60'))
+graceful_timeout = 30
+# Longer than the proxy's idle timeout, so the proxy is the side that closes
+# idle connections (otherwise a request can arrive on a connection we just dropped)
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', '75'))
+
+# Worker heartbeats on tmpfs - a slow container disk cannot stall them into a timeout
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def when_ready(server):
+    """Master, app loaded: check the schema once for all workers"""
+    if not server.cfg.preload_app:
+        return
+    from database.db_helper import ensure_schema, close_pool
+    try:
+        ensure_schema()
+    except Exception as e:
+        # Not fatal - each worker retries on its first request
+        server.log.warning(f"Schema check failed in the master ({e}); workers will retry")
+    # Workers must not share the master's sockets
+    close_pool()
+    server.log.info(
+        f"Starting {server.cfg.workers} {server.cfg.worker_class_str} workers x {server.cfg.threads} threads"
+    )
+
+
+def pre_fork(server, worker):
+    # Everything allocated so far is left alone by the collector, so its
+    # pages stay shared with the workers instead of being copied on write
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from database.db_helper import reset_pool
+    reset_pool()
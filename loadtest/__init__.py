@@ -0,0 +1,25 @@
+"""
+Load testing - how many concurrent users one app instance can take
+
+Starts the web app under gunicorn (with gunicorn.conf.py, as deployed)
+against a throwaway SQLite data directory (or a PostgreSQL database given
+with --database-url), seeds synthetic users with a few months of history,
+then runs scripted sessions against it from many threads at once:
+
+    login -> dashboard -> complete a habit -> save a journal entry ->
+    search the journal -> tag autocomplete -> request and download a report
+
+Every request is timed. The run reports throughput, p50/p95/p99 latency and
+the error rate per route, and saves them as JSON under loadtest/results/ so
+a later run can be compared with --compare.
+
+Usage:
+    python -m loadtest [--users 50] [--concurrency 20] [--duration 60]
+                       [--workers N] [--threads N] [--worker-class gthread]
+                       [--database-url postgresql://...] [--target http://host:port]
+                       [--compare loadtest/results/<earlier run>.json]
+
+--target skips starting a server and seeding: point it at an app that
+already has the load test users (seeded by an earlier run against the same
+database, or with python -m loadtest.seed).
+"""
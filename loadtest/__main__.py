@@ -0,0 +1,105 @@
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import loadtest
+from loadtest.scenario import RequestFailed, VirtualUser, run_session
+from loadtest.server import start_gunicorn, stop
+from loadtest.stats import Recorder, print_comparison, print_summary, save_summary, summarize
+from loadtest.seed import seed_users, user_email
+
+
+def drive(target, emails, concurrency, duration, think_time, ramp_up):
+    """Run sessions from concurrency threads for duration seconds; returns (recorder, seconds)"""
+    recorder = Recorder()
+    stop_at = time.monotonic() + duration
+
+    def virtual_user(index):
+        rng = random.Random(index)
+        time.sleep(ramp_up * index / concurrency)
+        while time.monotonic() < stop_at:
+            user = VirtualUser(target, rng.choice(emails), recorder)
+            try:
+                run_session(user, rng)
+                failed = False
+            except RequestFailed:
+                failed = True
+            finally:
+                user.close()
+            recorder.session_done(failed)
+            if think_time:
+                time.sleep(rng.uniform(0, 2 * think_time))
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=virtual_user, args=(index,), daemon=True) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder, time.monotonic() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m loadtest', description=loadtest.__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=50, help='synthetic users to seed and log in as')
+    parser.add_argument('--concurrency', type=int, default=20, help='sessions running at once')
+    parser.add_argument('--duration', type=float, default=60, help='seconds to keep starting sessions')
+    parser.add_argument('--ramp-up', type=float, default=5, help='seconds over which sessions start')
+    parser.add_argument('--think-time', type=float, default=0, help='mean pause between sessions, in seconds')
+    # Default: whatever gunicorn.conf.py picks for this machine
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--threads', type=int)
+    parser.add_argument('--worker-class', choices=['sync', 'gthread', 'gevent'])
+    parser.add_argument('--database-url', help='PostgreSQL URL (default: a throwaway SQLite data directory)')
+    parser.add_argument('--target', help='an already running app - skips starting gunicorn and seeding')
+    parser.add_argument('--prefix', default='loadtest', help='email prefix of the synthetic users')
+    parser.add_argument('--output', help='where to save the results (default: loadtest/results/<start time>.json)')
+    parser.add_argument('--compare', help='an earlier results file to compare with')
+    args = parser.parse_args()
+
+    # No database URL in the results - it holds a password
+    settings = {key: value for key, value in vars(args).items() if key not in ('database_url', 'output', 'compare')}
+    settings['database'] = 'postgresql' if args.database_url else 'sqlite'
+    settings['started'] = datetime.now().isoformat(timespec='seconds')
+    emails = [user_email(args.prefix, index) for index in range(args.users)]
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        process = None
+        target = args.target
+        if target is None:
+            os.environ['HABIT_RECODER_DATA_DIR'] = data_dir
+            if args.database_url:
+                os.environ['DATABASE_URL'] = args.database_url
+            else:
+                os.environ.pop('DATABASE_URL', None)
+
+            started = time.perf_counter()
+            seed_users(args.users, args.prefix)
+            print(f"🌱 Seeded {args.users} users in {time.perf_counter() - started:.1f}s")
+
+            process, target = start_gunicorn(dict(os.environ), args.workers, args.threads, args.worker_class)
+            print(f"🚀 gunicorn at {target}")
+
+        try:
+            print(f"⏱️ {args.concurrency} concurrent sessions for {args.duration:g}s...")
+            recorder, seconds = drive(target, emails, args.concurrency, args.duration, args.think_time, args.ramp_up)
+        finally:
+            if process is not None:
+                stop(process)
+
+    summary = summarize(recorder, seconds, settings)
+    print()
+    print_summary(summary)
+    print(f"\n💾 Results saved to {save_summary(summary, args.output)}")
+    if args.compare:
+        print()
+        print_comparison(summary, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Scripted user sessions for load tests
+
+A VirtualUser is one browser: its own keep-alive connection and session
+cookie. run_session() walks it through a typical visit; every request is
+timed and recorded under a route name with the ids taken out, so
+/complete/17 and /complete/42 are one row in the results.
+"""
+
+import http.client
+import http.cookies
+import json
+import re
+import time
+import urllib.parse
+from datetime import date
+
+from loadtest.seed import PASSWORD, SEARCH_TERMS, journal_text
+
+_HABIT_LINK = re.compile(r'/complete/(\d+)')
+
+# How long a session waits for its report before giving up on it
+REPORT_TIMEOUT = 30
+
+
+class RequestFailed(Exception):
+    """A response that ends the session (server error, or a page that should not redirect did)"""
+
+
+class VirtualUser:
+    def __init__(self, target, email, recorder, timeout=30):
+        parsed = urllib.parse.urlsplit(target)
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.email = email
+        self.recorder = recorder
+        self.timeout = timeout
+        self.cookies = http.cookies.SimpleCookie()
+        self.connection = None
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def request(self, route, method, path, form=None, expect=(200,)):
+        """Send one request, record it under route; returns (status, headers, body)"""
+        if self.connection is None:
+            self.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        headers = {'Accept-Encoding': 'identity'}
+        body = None
+        if form is not None:
+            body = urllib.parse.urlencode(form)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f"{name}={morsel.value}" for name, morsel in self.cookies.items())
+
+        started = time.perf_counter()
+        try:
+            self.connection.request(method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException) as e:
+            self.recorder.record(route, time.perf_counter() - started, type(e).__name__)
+            self.close()
+            raise RequestFailed(f"{route}: {e}") from e
+        elapsed = time.perf_counter() - started
+
+        for header in response.headers.get_all('Set-Cookie') or []:
+            self.cookies.load(header)
+        error = None if response.status in expect else f"HTTP {response.status}"
+        self.recorder.record(route, elapsed, error)
+        if error:
+            raise RequestFailed(f"{route}: {error}")
+        return response.status, response.headers, data.decode('utf-8', 'replace')
+
+    def login(self):
+        self.cookies.clear()
+        self.request('GET /login', 'GET', '/login')
+        self.request('POST /login', 'POST', '/login', {'email': self.email, 'password': PASSWORD}, expect=(302,))
+
+
+def run_session(user, rng):
+    """One visit: log in, look around, complete a habit, write in the journal, get a report"""
+    user.login()
+    _, _, dashboard = user.request('GET /', 'GET', '/')
+
+    habit_ids = _HABIT_LINK.findall(dashboard)
+    if habit_ids:
+        habit_id = rng.choice(habit_ids)
+        user.request('GET /habit/<id>', 'GET', f'/habit/{habit_id}')
+        # Once a day per habit - later sessions get "already completed", still a full round trip
+        user.request('POST /complete/<id>', 'POST', f'/complete/{habit_id}', {'mood': rng.choice(['happy', 'neutral', 'stressed'])}, expect=(302,))
+
+    user.request('POST /journal/save', 'POST', '/journal/save', {
+        'entry_date': str(date.today()), 'content': journal_text(rng), 'tags': 'loadtest, mood'
+    }, expect=(302,))
+    user.request('GET /journal?search', 'GET', '/journal?' + urllib.parse.urlencode({'search': rng.choice(SEARCH_TERMS)}))
+    user.request('GET /api/tags/autocomplete', 'GET', '/api/tags/autocomplete?q=' + rng.choice('wfhsm'))
+
+    if rng.random() < 0.3:
+        _request_report(user)
+
+    user.request('GET /logout', 'GET', '/logout', expect=(302,))
+
+
+def _request_report(user):
+    _, _, body = user.request('POST /reports/jobs', 'POST', '/reports/jobs', {}, expect=(202,))
+    job = json.loads(body)
+    deadline = time.monotonic() + REPORT_TIMEOUT
+    while job['status'] not in ('done', 'failed'):
+        if time.monotonic() > deadline:
+            raise RequestFailed(f"report not ready after {REPORT_TIMEOUT}s")
+        time.sleep(0.2)
+        _, _, body = user.request('GET /reports/jobs/<id>', 'GET', job['status_url'])
+        job = json.loads(body)
+    if job['status'] == 'failed':
+        raise RequestFailed(f"report job failed: {job.get('error')}")
+    user.request('GET /reports/jobs/<id>/download', 'GET', job['download_url'])
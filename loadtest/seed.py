@@ -0,0 +1,125 @@
+"""
+Synthetic users for load tests
+
+Each user gets a handful of habits with about two months of completions
+and journal entries with tags, written through the controllers (journal
+compression, indexes and the daily rollup included) so the app sees the
+same data shape as in production. Everyone shares one password, hashed
+once - logging in still costs a bcrypt check per session, as it should.
+
+The database comes from the environment (HABIT_RECODER_DATA_DIR or
+DATABASE_URL), so set those before importing this module.
+
+Usage:
+    python -m loadtest.seed [--users 50] [--prefix loadtest]
+"""
+
+import argparse
+import random
+from datetime import date, timedelta
+
+PASSWORD = 'loadtest-password'
+
+HABITS = [
+    ('Morning run', 'Mon, Wed, Fri', '🏃'),
+    ('Read 20 pages', 'daily', '📚'),
+    ('Meditate', 'daily', '🧘'),
+    ('Gym', '3x per week', '🏋️'),
+    ('Call family', 'weekly', '📞'),
+    ('Drink water', 'daily', '💧'),
+]
+
+TAGS = ['work', 'health', 'family', 'sleep', 'mood', 'focus', 'gratitude', 'stress', 'reading', 'exercise']
+
+SENTENCES = [
+    "Today I felt a lot calmer than yesterday.",
+    "This morning I went for a run before work and it really helped.",
+    "I didn't sleep well, so the afternoon was hard.",
+    "Work was busy with the project deadline coming up on Friday.",
+    "I managed to read thirty pages before dinner.",
+    "I'm proud of myself for sticking with meditation this week.",
+    "Had coffee with a friend and talked about moving to a new city.",
+    "I want to spend less time on my phone in the evening.",
+    "Feeling stressed about money, but I made a plan for next month.",
+    "Grateful for a quiet weekend and a long walk in the park.",
+]
+
+# Words the sessions search the journal for
+SEARCH_TERMS = ['run', 'sleep', 'work', 'friend', 'weekend', 'meditation', 'money', 'read']
+
+
+def user_email(prefix, index):
+    return f"{prefix}-{index}@loadtest.example.com"
+
+
+def journal_text(rng):
+    return ' '.join(rng.choice(SENTENCES) for _ in range(rng.randint(2, 12)))
+
+
+def seed_users(count, prefix='loadtest', days=60, journal_entries=30, seed=7):
+    """Create count users (skipping ones that exist); returns their emails"""
+    from database.db_helper import ensure_schema, get_connection, get_main_connection, use_user
+    from database.daily_summary import rebuild_daily_summary
+    from controllers.user_controller import hash_password, get_user_by_email
+    from controllers.habit_controller import create_habit, get_all_habits
+    from controllers.journal_controller import create_or_update_journal_entry
+
+    ensure_schema()
+    rng = random.Random(seed)
+    password_hash = hash_password(PASSWORD)
+    today = date.today()
+    emails = []
+
+    for index in range(count):
+        email = user_email(prefix, index)
+        user = get_user_by_email(email)
+        if user is None:
+            conn = get_main_connection()
+            conn.cursor().execute('INSERT INTO users (email, password_hash) VALUES (?, ?)', (email, password_hash))
+            conn.commit()
+            conn.close()
+            user = get_user_by_email(email)
+
+            with use_user(user.id):
+                for name, frequency, icon in rng.sample(HABITS, rng.randint(3, len(HABITS))):
+                    create_habit(user.id, name, frequency, icon=icon)
+
+                # History is written directly - the controllers only complete "today"
+                conn = get_connection()
+                cursor = conn.cursor()
+                for habit in get_all_habits(user.id):
+                    diligence = rng.uniform(0.4, 0.95)
+                    for offset in range(1, days + 1):
+                        if rng.random() < diligence:
+                            cursor.execute(
+                                'INSERT INTO logs (habit_id, completed_date, mood) VALUES (?, ?, ?)',
+                                (habit.id, today - timedelta(days=offset), rng.choice(['happy', 'neutral', 'stressed']))
+                            )
+                cursor.execute(
+                    'UPDATE habits SET created_at = ? WHERE user_id = ?',
+                    (f"{today - timedelta(days=days + 1)} 08:00:00", user.id)
+                )
+                conn.commit()
+                conn.close()
+                rebuild_daily_summary(user.id)
+
+                for offset in rng.sample(range(1, days + 1), min(journal_entries, days)):
+                    create_or_update_journal_entry(
+                        user.id, str(today - timedelta(days=offset)), journal_text(rng), ', '.join(rng.sample(TAGS, 2))
+                    )
+        emails.append(email)
+    return emails
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--prefix', default='loadtest')
+    args = parser.parse_args()
+
+    emails = seed_users(args.users, args.prefix)
+    print(f"🌱 {len(emails)} load test users ready (password: {PASSWORD})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+The app under gunicorn for a load test
+"""
+
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(env, workers=None, threads=None, worker_class=None, port=None, startup_timeout=60):
+    """Start gunicorn app:app in the background; returns (process, base URL) once it answers
+
+    Settings not given come from gunicorn.conf.py, as in production.
+    """
+    port = port or free_port()
+    command = [sys.executable, '-m', 'gunicorn', 'app:app', '--config', 'gunicorn.conf.py',
+               '--bind', f'127.0.0.1:{port}', '--log-level', 'warning']
+    for flag, value in (('--workers', workers), ('--threads', threads), ('--worker-class', worker_class)):
+        if value is not None:
+            command += [flag, str(value)]
+    # The app prints to stdout; gunicorn's own warnings and errors go to stderr
+    process = subprocess.Popen(command, cwd=REPO_DIR, env=env, stdout=subprocess.DEVNULL)
+    target = f'http://127.0.0.1:{port}'
+
+    deadline = time.monotonic() + startup_timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with code {process.returncode}")
+        try:
+            urllib.request.urlopen(target + '/login', timeout=2).close()
+            return process, target
+        except OSError:
+            time.sleep(0.2)
+    stop(process)
+    raise RuntimeError(f"gunicorn did not answer within {startup_timeout}s")
+
+
+def stop(process):
+    process.terminate()
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
@@ -0,0 +1,118 @@
+"""
+Load test measurements - per-route latency percentiles, throughput and errors
+"""
+
+import json
+import math
+import os
+import threading
+from collections import defaultdict
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+class Recorder:
+    """Thread-safe sink for request timings"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)  # route -> [seconds]
+        self.errors = defaultdict(lambda: defaultdict(int))  # route -> {error: count}
+        self.sessions = 0
+        self.failed_sessions = 0
+
+    def record(self, route, seconds, error=None):
+        with self._lock:
+            self.latencies[route].append(seconds)
+            if error:
+                self.errors[route][error] += 1
+
+    def session_done(self, failed):
+        with self._lock:
+            self.sessions += 1
+            if failed:
+                self.failed_sessions += 1
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+def summarize(recorder, seconds, settings):
+    """The run as a JSON-ready dict"""
+    routes = {}
+    for route, latencies in sorted(recorder.latencies.items()):
+        latencies = sorted(latencies)
+        errors = sum(recorder.errors[route].values())
+        routes[route] = {
+            'requests': len(latencies),
+            'rps': round(len(latencies) / seconds, 2),
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 1),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 1),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 1),
+            'max_ms': round(latencies[-1] * 1000, 1),
+            'error_rate': round(errors / len(latencies), 4),
+            'errors': dict(recorder.errors[route])
+        }
+
+    all_latencies = sorted(value for latencies in recorder.latencies.values() for value in latencies)
+    total_errors = sum(sum(errors.values()) for errors in recorder.errors.values())
+    return {
+        'settings': settings,
+        'duration_s': round(seconds, 1),
+        'sessions': recorder.sessions,
+        'failed_sessions': recorder.failed_sessions,
+        'total': {
+            'requests': len(all_latencies),
+            'rps': round(len(all_latencies) / seconds, 2),
+            'p50_ms': round(percentile(all_latencies, 0.50) * 1000, 1),
+            'p95_ms': round(percentile(all_latencies, 0.95) * 1000, 1),
+            'p99_ms': round(percentile(all_latencies, 0.99) * 1000, 1),
+            'error_rate': round(total_errors / len(all_latencies), 4) if all_latencies else 0
+        },
+        'routes': routes
+    }
+
+
+def print_summary(summary):
+    total = summary['total']
+    print(f"{summary['sessions']} sessions ({summary['failed_sessions']} failed) in {summary['duration_s']}s")
+    print(f"{'route':<34}{'requests':>9}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+    for route, row in summary['routes'].items():
+        print(f"{route:<34}{row['requests']:>9}{row['rps']:>8.1f}{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}"
+              f"{row['p99_ms']:>9.1f}{row['error_rate']:>8.1%}")
+    print(f"{'all':<34}{total['requests']:>9}{total['rps']:>8.1f}{total['p50_ms']:>9.1f}{total['p95_ms']:>9.1f}"
+          f"{total['p99_ms']:>9.1f}{total['error_rate']:>8.1%}")
+    for route, row in summary['routes'].items():
+        for error, count in row['errors'].items():
+            print(f"⚠️ {route}: {error} x{count}")
+
+
+def save_summary(summary, path=None):
+    """Write the summary as JSON (default: loadtest/results/<timestamp>.json); returns the path"""
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{summary['settings']['started'].replace(':', '-')}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2)
+    return path
+
+
+def print_comparison(summary, baseline_path):
+    """Throughput and p95 per route against an earlier run"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    def change(new, old):
+        return f"{(new - old) / old:+.0%}" if old else 'n/a'
+
+    print(f"Compared with {os.path.basename(baseline_path)}:")
+    print(f"{'route':<34}{'req/s':>16}{'p95 ms':>22}")
+    rows = [('all', summary['total'], baseline['total'])]
+    rows += [(route, row, baseline['routes'][route]) for route, row in summary['routes'].items() if route in baseline['routes']]
+    for route, new, old in rows:
+        print(f"{route:<34}{old['rps']:>6.1f} -> {new['rps']:<6.1f}{change(new['rps'], old['rps']):>5}"
+              f"{old['p95_ms']:>8.1f} -> {new['p95_ms']:<7.1f}{change(new['p95_ms'], old['p95_ms']):>5}")
@@ -1,8 +1,9 @@
 from datetime import datetime
+from models.schedule import Schedule, compile_frequency
 
 class Habit:
     def __init__(self, id, name, frequency, target_time=None, icon=None, 
-                 motivation=None, challenges=None, ai_notes=None, created_at=None):
+                 motivation=None, challenges=None, ai_notes=None, created_at=None, schedule=None):
         self.id = id
         self.name = name
         self.frequency = frequency
@@ -12,6 +13,19 @@ class Habit:
         self.challenges = challenges
         self.ai_notes = ai_notes  # NEW: Additional notes for AI
         self.created_at = created_at or datetime.now()
+        self.schedule = schedule or compile_frequency(frequency)  # compiled frequency, see models/schedule.py
+        self._schedule = None
+    
+    def get_schedule(self):
+        """The habit's Schedule, anchored on the day it was created"""
+        if self._schedule is None:
+            created_at = self.created_at
+            if isinstance(created_at, datetime):
+                created_at = created_at.date()
+            elif not hasattr(created_at, 'year'):
+                created_at = datetime.strptime(str(created_at)[:10], '%Y-%m-%d').date()
+            self._schedule = Schedule.parse(self.schedule, created_at)
+        return self._schedule
     
     def to_dict(self):
         return {
@@ -23,5 +37,6 @@ class Habit:
             'motivation': self.motivation,
             'challenges': self.challenges,
             'ai_notes': self.ai_notes,
-            'created_at': self.created_at
-        }
\ No newline at end of file
+            'created_at': self.created_at,
+            'schedule': self.schedule
+        }
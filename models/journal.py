@@ -1,4 +1,59 @@
+from config import JOURNAL_COMPRESS_THRESHOLD
 from datetime import datetime
+import zlib
+
+# Long entries are stored zlib-compressed in content_compressed (content is
+# then ''). The first byte names the codec so old rows stay readable if the
+# dictionary changes: 1 = plain zlib, 2 = zlib with _ZDICT_V1.
+_CODEC_ZLIB = 1
+_CODEC_ZDICT_V1 = 2
+
+# Preset dictionary - text that journal entries tend to share, so even the
+# first sentences of an entry compress. zlib favours matches near the end,
+# so the most common words come last. Never edit it: add _ZDICT_V2 instead.
+_ZDICT_V1 = (
+    "habit routine progress goal tomorrow yesterday morning evening weekend "
+    "meditation exercise workout running walking reading writing sleep water "
+    "coffee breakfast lunch dinner family friends work meeting project deadline "
+    "anxious stressed tired happy grateful calm focused motivated overwhelmed "
+    "I want to I need to I have to I feel like I'm not sure I think I should "
+    "I am grateful for I'm proud of myself It was a good day It was a hard day "
+    "I didn't I couldn't I wasn't I managed to I tried to I decided to "
+    "Today I felt Today I Today was Tonight I This morning I This week "
+    "because but and then so that with the for the in the of the to the on the at the "
+    "really very still just also again more than about after before today "
+    ". I . It . The . Today , and "
+).encode('utf-8')
+
+def compress_content(text, threshold=JOURNAL_COMPRESS_THRESHOLD, use_dictionary=True):
+    """(content, content_compressed) to store for an entry's text
+
+    Short text - and text that would not get smaller - is stored as is.
+    """
+    data = text.encode('utf-8')
+    if not threshold or len(data) < threshold:
+        return text, None
+    if use_dictionary:
+        compressor = zlib.compressobj(9, zlib.DEFLATED, zlib.MAX_WBITS, 9, zlib.Z_DEFAULT_STRATEGY, _ZDICT_V1)
+        packed = bytes([_CODEC_ZDICT_V1]) + compressor.compress(data) + compressor.flush()
+    else:
+        packed = bytes([_CODEC_ZLIB]) + zlib.compress(data, 9)
+    if len(packed) >= len(data):
+        return text, None
+    return '', packed
+
+def decompress_content(content, content_compressed):
+    """The text of an entry from its stored columns"""
+    if content_compressed is None:
+        return content
+    packed = bytes(content_compressed)  # memoryview on PostgreSQL
+    codec, body = packed[0], packed[1:]
+    if codec == _CODEC_ZDICT_V1:
+        decompressor = zlib.decompressobj(zlib.MAX_WBITS, _ZDICT_V1)
+        return (decompressor.decompress(body) + decompressor.flush()).decode('utf-8')
+    if codec == _CODEC_ZLIB:
+        return zlib.decompress(body).decode('utf-8')
+    raise ValueError(f"Unknown journal codec {codec}")
 
 class JournalEntry:
     def __init__(self, id, entry_date, content, tags=None, created_at=None, updated_at=None):
@@ -8,13 +63,25 @@ class JournalEntry:
         self.tags = tags  # Comma-separated tags
         self.created_at = created_at or datetime.now()
         self.updated_at = updated_at or datetime.now()
-    
+
+    @classmethod
+    def from_row(cls, row):
+        """Build an entry from a journal_entries row, decompressing its content"""
+        return cls(
+            id=row['id'],
+            entry_date=row['entry_date'],
+            content=decompress_content(row['content'], row['content_compressed']),
+            tags=row['tags'],
+            created_at=row['created_at'],
+            updated_at=row['updated_at']
+        )
+
     def get_tags_list(self):
         """Convert comma-separated tags to list"""
         if self.tags:
             return [tag.strip() for tag in self.tags.split(',')]
         return []
-    
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -24,4 +91,4 @@ class JournalEntry:
             'tags_list': self.get_tags_list(),
             'created_at': self.created_at,
             'updated_at': self.updated_at
-        }
\ No newline at end of file
+        }
@@ -0,0 +1,264 @@
+"""
+Habit schedules - when a habit is due, compiled from its free-text frequency
+
+A habit's frequency is whatever the user typed or picked ("daily", "3x per
+week", "Mon, Wed, Fri", "every 2 days"). compile_frequency() turns it into a
+short canonical string stored in habits.schedule:
+
+    daily          every day
+    days:0,2,4     on these weekdays (Monday = 0)
+    every:3        every 3rd day, counted from the day the habit was created
+                   ("every 2 weeks" is every:14)
+    weekly:3       3 times per week, any days (weeks start on Monday)
+
+Schedule answers the questions stats and reports ask - occurrences expected
+in a date range, the same split by weekday, the current streak - with
+arithmetic on the range ends instead of a loop over its days. Anything that
+cannot be understood compiles to daily, which is what the app assumed for
+every habit before schedules existed - so do monthly and yearly frequencies,
+which no schedule kind expresses yet. Days ruled out ("daily except
+Sunday", "not on weekends") are left out of the schedule; a negation that
+names no days compiles to daily.
+"""
+
+from collections import Counter
+from datetime import timedelta
+from math import gcd
+import re
+
+_DAY_NAMES = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+# Day names and their usual abbreviations only - "month" is not Monday
+_DAY_PATTERN = re.compile(
+    r'\b(mon(?:day)?|tue(?:s(?:day)?)?|wed(?:nesday)?|thu(?:r(?:s(?:day)?)?)?|fri(?:day)?|sat(?:urday)?|sun(?:day)?)s?\b'
+)
+_NUMBER_WORDS = {
+    'once': 1, 'one': 1, 'twice': 2, 'two': 2, 'three': 3, 'four': 4,
+    'five': 5, 'six': 6, 'seven': 7, 'other': 2, 'second': 2, 'third': 3
+}
+_PER_WEEK = re.compile(r'(\d+|once|twice|one|two|three|four|five|six)\s*(?:x|times?)?\s*(?:a|per|each|/|every)?\s*week')
+_EVERY_N_WEEKS = re.compile(r'every\s+(\d+|other|second|third|two|three|four|five|six)\s*(?:nd|rd|th)?\s*weeks?')
+_DAY_RANGE = re.compile(_DAY_PATTERN.pattern + r'\s*(?:-|to|through)\s*' + _DAY_PATTERN.pattern)
+_NEGATION = re.compile(r'\b(except|but|not|no|without|excluding|skip|skipping|besides)\b')
+_MONTHLY = re.compile(r'\b(month|monthly|months|year|yearly|years|annual|annually)\b')
+_EVERY_N_DAYS = re.compile(r'every\s+(\d+|other|second|third|two|three|four|five|six)\s*(?:nd|rd|th)?\s*days?')
+
+def _number(word):
+    return int(word) if word.isdigit() else _NUMBER_WORDS[word]
+
+def _weekdays(text):
+    """Weekdays named in text - day names, ranges like mon-fri, weekends and weekdays"""
+    days = {_DAY_NAMES.index(name[:3].capitalize()) for name in _DAY_PATTERN.findall(text)}
+    for first, last in _DAY_RANGE.findall(text):
+        first, last = _DAY_NAMES.index(first[:3].capitalize()), _DAY_NAMES.index(last[:3].capitalize())
+        days |= {(first + offset) % 7 for offset in range((last - first) % 7 + 1)}
+    if re.search(r'\bweekends?\b', text):
+        days |= {5, 6}
+    if re.search(r'\b(weekdays|workdays)\b', text):
+        days |= {0, 1, 2, 3, 4}
+    return days
+
+def _compile_negated(text, match):
+    """'daily except sunday' -> the schedule before the negation minus the days named after it
+
+    Daily when no days are ruled out, or when the part before the negation
+    is not a set of days ("twice a week, not Monday" has no schedule kind).
+    """
+    base = compile_frequency(text[:match.start()])
+    if base == 'daily':
+        included = set(range(7))
+    elif base.startswith('days:'):
+        included = {int(day) for day in base[len('days:'):].split(',')}
+    else:
+        return 'daily'
+    excluded = _weekdays(text[match.end():])
+    days = sorted(included - excluded)
+    if not excluded or not days or len(days) == 7:
+        return 'daily'
+    return 'days:' + ','.join(str(day) for day in days)
+
+def compile_frequency(frequency):
+    """Canonical schedule string for a free-text frequency (daily if not understood)"""
+    text = (frequency or '').strip().lower()
+    if text in ('weekdays', 'workdays', 'mon-fri', 'monday-friday', 'monday to friday'):
+        return 'days:0,1,2,3,4'
+    if text in ('weekends', 'weekend', 'sat-sun'):
+        return 'days:5,6'
+    if text in ('weekly', 'once a week', 'every week'):
+        return 'weekly:1'
+
+    match = _NEGATION.search(text)
+    if match:
+        # Never schedule the days the user ruled out
+        return _compile_negated(text, match)
+
+    if _MONTHLY.search(text):
+        # No calendar-month schedules (yet) - "twice a month" is not a weekday
+        return 'daily'
+
+    match = _EVERY_N_DAYS.search(text)
+    if match:
+        days = _number(match.group(1))
+        return f'every:{days}' if days > 1 else 'daily'
+
+    # Before _PER_WEEK, which would read "every 2 weeks" as twice a week
+    match = _EVERY_N_WEEKS.search(text)
+    if match:
+        weeks = _number(match.group(1))
+        return f'every:{7 * weeks}' if weeks > 1 else 'weekly:1'
+
+    match = _PER_WEEK.search(text)
+    if match:
+        times = _number(match.group(1))
+        return f'weekly:{times}' if 0 < times < 7 else 'daily'
+
+    weekdays = sorted(_weekdays(text))
+    if weekdays and len(weekdays) < 7:
+        return 'days:' + ','.join(str(day) for day in weekdays)
+    return 'daily'
+
+def _weekday_count(start, end, weekday):
+    """How many times weekday (Monday = 0) falls in [start, end]"""
+    first = start + timedelta(days=(weekday - start.weekday()) % 7)
+    return (end - first).days // 7 + 1 if first <= end else 0
+
+def _week_start(day):
+    return day - timedelta(days=day.weekday())
+
+class Schedule:
+    def __init__(self, kind='daily', count=1, weekdays=(), anchor=None):
+        self.kind = kind  # 'daily', 'days', 'every' or 'weekly'
+        self.count = count  # every:N days, weekly:N times
+        self.weekdays = tuple(weekdays)  # days:
+        self.anchor = anchor  # every: first due day
+
+    @classmethod
+    def parse(cls, schedule, anchor=None):
+        """Schedule from a compiled string; anchor is the habit's creation date"""
+        kind, _, value = (schedule or 'daily').partition(':')
+        if kind == 'days':
+            return cls('days', weekdays=sorted(int(day) for day in value.split(',')))
+        if kind == 'every':
+            return cls('every', count=int(value), anchor=anchor)
+        if kind == 'weekly':
+            return cls('weekly', count=int(value))
+        return cls()
+
+    def __str__(self):
+        if self.kind == 'days':
+            return 'days:' + ','.join(str(day) for day in self.weekdays)
+        if self.kind in ('every', 'weekly'):
+            return f'{self.kind}:{self.count}'
+        return 'daily'
+
+    def describe(self):
+        """Human-readable form, e.g. "Mon, Wed, Fri" or "3x per week\""""
+        if self.kind == 'days':
+            return ', '.join(_DAY_NAMES[day] for day in self.weekdays)
+        if self.kind == 'every':
+            return f'Every {self.count} days'
+        if self.kind == 'weekly':
+            return 'Weekly' if self.count == 1 else f'{self.count}x per week'
+        return 'Daily'
+
+    @property
+    def streak_unit(self):
+        """What a streak counts: scheduled days, or weeks that met a weekly target"""
+        return 'week' if self.kind == 'weekly' else 'day'
+
+    def _every_range(self, start, end):
+        """First and last occurrence index k (due on anchor + k * count) in [start, end]"""
+        offset_start = max((start - self.anchor).days, 0)
+        first = -(-offset_start // self.count)
+        last = (end - self.anchor).days // self.count
+        return first, last
+
+    def expected_between(self, start, end):
+        """Occurrences due in [start, end] - fractional for weekly targets over part of a week"""
+        if end < start:
+            return 0
+        days = (end - start).days + 1
+        if self.kind == 'days':
+            return sum(_weekday_count(start, end, day) for day in self.weekdays)
+        if self.kind == 'every':
+            if self.anchor is None or end < self.anchor:
+                return 0
+            first, last = self._every_range(start, end)
+            return max(last - first + 1, 0)
+        if self.kind == 'weekly':
+            return round(self.count * days / 7, 2)
+        return days
+
+    def weekday_counts(self, start, end):
+        """expected_between split by weekday: a list of 7 (Monday first)"""
+        if end < start:
+            return [0] * 7
+        if self.kind == 'days':
+            return [_weekday_count(start, end, day) if day in self.weekdays else 0 for day in range(7)]
+        if self.kind == 'every':
+            counts = [0] * 7
+            if self.anchor is None or end < self.anchor:
+                return counts
+            first, last = self._every_range(start, end)
+            # Occurrence k falls on weekday (anchor + k * count) % 7, which repeats every `period` occurrences
+            period = 7 // gcd(self.count, 7)
+            for residue in range(period):
+                k = first + (residue - first) % period
+                if k <= last:
+                    counts[(self.anchor.weekday() + residue * self.count) % 7] += (last - k) // period + 1
+            return counts
+        counts = [_weekday_count(start, end, day) for day in range(7)]
+        if self.kind == 'weekly':
+            return [round(count * self.count / 7, 2) for count in counts]
+        return counts
+
+    def is_due(self, day):
+        if self.kind == 'days':
+            return day.weekday() in self.weekdays
+        if self.kind == 'every':
+            return self.anchor is not None and day >= self.anchor and (day - self.anchor).days % self.count == 0
+        return True
+
+    def last_due(self, day):
+        """The latest due day on or before day (None if there is none)"""
+        if self.kind == 'days':
+            if not self.weekdays:
+                return None
+            return day - timedelta(days=min((day.weekday() - weekday) % 7 for weekday in self.weekdays))
+        if self.kind == 'every':
+            if self.anchor is None or day < self.anchor:
+                return None
+            return day - timedelta(days=(day - self.anchor).days % self.count)
+        return day
+
+    def streak(self, dates, today):
+        """Current streak from completion dates (newest first)
+
+        Returns (streak, stop) where stop is the first due day - or, for weekly
+        targets, the start of the first week - that was missed; None if the
+        streak reaches back to the start of the schedule. A due day (or week)
+        that is still in progress today does not break the streak for weekly
+        targets; for day schedules, as before, today must be completed.
+        """
+        if self.kind == 'weekly':
+            weeks = Counter(_week_start(day) for day in dates)
+            week = _week_start(today)
+            if weeks[week] < self.count:
+                week -= timedelta(days=7)  # this week is not over yet
+            streak = 0
+            while weeks[week] >= self.count:
+                streak += 1
+                week -= timedelta(days=7)
+            return streak, week
+
+        streak = 0
+        expected = self.last_due(today)
+        for day in dates:
+            if expected is None:
+                break
+            if day > expected:
+                continue  # a completion on a day it was not due
+            if day != expected:
+                break
+            streak += 1
+            expected = self.last_due(day - timedelta(days=1))
+        return streak, expected